@@ -0,0 +1,100 @@
+"""Benchmark da entrega ao portal: sequencial sem pool vs. pool concorrente vs. lotes
+
+Uso:
+    python benchmarks/bench_portal_delivery.py [--jobs 200] [--latency 0.05] [--workers 1 4 8 16]
+                                               [--batch-sizes 10 50] [--auto-approve]
+
+Sobe o portal falso (benchmarks/mock_portal.py) localmente e mede vagas/s,
+latência p50/p95/p99 e número de chamadas HTTP ao portal.
+"""
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_portal import start_mock_portal
+from src.metrics import LatencyHistogram
+
+def make_jobs(count: int) -> list:
+    return [{
+        'title': f'Desenvolvedor Python {i}',
+        'company': 'Empresa Benchmark',
+        'location': 'São Paulo, SP',
+        'source': 'Benchmark',
+        'link': f'https://example.com/vaga/{i}',
+        'description': 'Trabalho remoto, CLT, salário R$ 6.000'
+    } for i in range(count)]
+
+def legacy_delivery(portal, jobs: list, auto_approve: bool) -> tuple:
+    """Implementação anterior: requests.post por vaga, uma conexão nova a cada chamada"""
+    histogram = LatencyHistogram()
+    calls = 0
+    headers = {'Authorization': f'Bearer {portal.portal_admin_token}', 'Content-Type': 'application/json'}
+    sent = 0
+    for job in jobs:
+        start = time.perf_counter()
+        response = requests.post(f"{portal.portal_api_url}/jobs", json=portal._format_job_for_portal(job),
+                                 headers=headers, timeout=30)
+        histogram.observe(time.perf_counter() - start)
+        calls += 1
+        if response.status_code == 201:
+            sent += 1
+            if auto_approve:
+                requests.post(f"{portal.portal_api_url}/admin/jobs/{response.json()['id']}/approve",
+                              headers=headers, timeout=30)
+                calls += 1
+    return sent, histogram.snapshot(), calls
+
+def pooled_delivery(portal, jobs: list, auto_approve: bool) -> tuple:
+    result = portal.send_jobs_to_portal(jobs, auto_approve)
+    stats = portal.get_delivery_stats()
+    calls = sum(operation['count'] for operation in stats.values())
+    operation = 'batch' if stats['batch']['count'] else 'create'
+    return result['sent'], stats[operation], calls
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help='latência simulada do portal (s)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--auto-approve', action='store_true')
+    args = parser.parse_args()
+
+    server = start_mock_portal(latency=args.latency)
+    os.environ['PORTAL_API_URL'] = f"http://127.0.0.1:{server.server_address[1]}/api"
+
+    # Importado depois de apontar PORTAL_API_URL para o mock
+    from src.portal_integration import PortalIntegration
+
+    jobs = make_jobs(args.jobs)
+    print(f"{'modo':>16} | {'vagas/s':>8} | {'p50':>6} | {'p95':>6} | {'p99':>6} | {'chamadas':>8} | enviadas")
+    print('-' * 77)
+
+    max_workers = max(args.workers)
+    runs = [('sequencial', None, 1, legacy_delivery)] + [
+        (f'pool x{workers}', workers, 1, pooled_delivery) for workers in args.workers
+    ] + [
+        (f'lote {size} x{max_workers}', max_workers, size, pooled_delivery) for size in args.batch_sizes
+    ]
+    for label, workers, batch_size, deliver in runs:
+        if workers:
+            os.environ['PORTAL_MAX_WORKERS'] = str(workers)
+        os.environ['PORTAL_BATCH_SIZE'] = str(batch_size)
+        portal = PortalIntegration()
+
+        start = time.perf_counter()
+        sent, stats, calls = deliver(portal, [dict(job) for job in jobs], args.auto_approve)
+        elapsed = time.perf_counter() - start
+
+        print(f"{label:>16} | {sent / elapsed:>8,.1f} | {stats['p50']:>6} | {stats['p95']:>6} | {stats['p99']:>6} | "
+              f"{calls:>8} | {sent}")
+
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark do scoring de qualidade: laço por vaga vs. lote vetorizado
+
+Uso:
+    python benchmarks/bench_quality_scoring.py [--sizes 1000 100000 1000000] [--unique-ratio 0.1]
+
+--unique-ratio controla a fração de vagas com descrição totalmente distinta
+(o restante repete títulos/descrições/empresas, como nas bases reais).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_filter import AIJobFilter
+
+TITLES = [
+    'Desenvolvedor Python Pleno', 'Programador Java Senior', 'Analista de Sistemas Junior',
+    'Vendedor Externo', 'Assistente Administrativo', 'Estagio em TI', 'Especialista Cloud',
+    'Dev Frontend React', 'Consultor de Vendas', 'Auxiliar de Produção'
+]
+DESCRIPTIONS = [
+    'Trabalho remoto com beneficios e PLR', 'Modelo hibrido, horário flexivel, convenio',
+    'Presencial obrigatorio, sem beneficios', 'Salário R$ 5.000 + vale refeicao',
+    'Home office, salário até 8000', 'Remuneração de 12k', ''
+]
+COMPANIES = ['Nubank', 'Empresa Terceirizada LTDA', 'iFood', 'Padaria Central', 'Stone', 'Agencia de Emprego X', '']
+LOCATIONS = ['São Paulo, SP', 'Rio de Janeiro, RJ', 'Remoto', 'Belo Horizonte, MG', '']
+FILTERS = {'location': 'são paulo', 'min_salary': 2000}
+
+def make_jobs(count: int, unique_ratio: float = 0.1, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    return [{
+        'title': rng.choice(TITLES),
+        'description': rng.choice(DESCRIPTIONS) + (f' ref {i}' if rng.random() < unique_ratio else ''),
+        'company': rng.choice(COMPANIES),
+        'location': rng.choice(LOCATIONS),
+        'link': f'https://example.com/vaga/{i}',
+        'source': 'Benchmark'
+    } for i in range(count)]
+
+def scalar_pass(ai_filter: AIJobFilter, jobs: list) -> list:
+    """Implementação anterior: filtros e score vaga a vaga"""
+    filtered = []
+    for job in jobs:
+        if ai_filter._passes_filters(job, FILTERS):
+            job['quality_score'] = ai_filter._calculate_quality_score(job)
+            filtered.append(job)
+    return sorted(filtered, key=lambda x: x.get('quality_score', 0), reverse=True)
+
+def timed(func, *args) -> tuple:
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--unique-ratio', type=float, default=0.1)
+    parser.add_argument('--skip-scalar-above', type=int, default=100_000,
+                        help='não roda o laço escalar acima deste tamanho')
+    args = parser.parse_args()
+    
+    ai_filter = AIJobFilter()
+    print(f"{'vagas':>10} | {'escalar (vagas/s)':>18} | {'lote (vagas/s)':>15} | {'ganho':>6}")
+    print('-' * 60)
+    
+    for size in args.sizes:
+        jobs = make_jobs(size, args.unique_ratio)
+        batch_jobs = [dict(job) for job in jobs]
+        
+        batch_result, batch_time = timed(ai_filter.filter_jobs, batch_jobs, FILTERS)
+        batch_rate = size / batch_time
+        
+        if size <= args.skip_scalar_above:
+            scalar_result, scalar_time = timed(scalar_pass, ai_filter, jobs)
+            scalar_rate = size / scalar_time
+            assert [j['link'] for j in scalar_result] == [j['link'] for j in batch_result], \
+                'resultado do lote diverge do laço escalar'
+            print(f"{size:>10,} | {scalar_rate:>18,.0f} | {batch_rate:>15,.0f} | {batch_rate / scalar_rate:>5.1f}x")
+        else:
+            print(f"{size:>10,} | {'-':>18} | {batch_rate:>15,.0f} | {'-':>6}")
+
+if __name__ == '__main__':
+    main()
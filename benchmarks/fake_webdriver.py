@@ -0,0 +1,390 @@
+"""Hub WebDriver falso para testes de carga: serve páginas gravadas aos scrapers
+
+Uso:
+    python benchmarks/fake_webdriver.py [--port 4444] [--pages benchmarks/pages] [--sessions 3]
+                                        [--page-latency 1.0] [--fresh 0.3]
+
+Fala o suficiente do protocolo W3C WebDriver (o que o Selenium Remote usa
+nos scrapers) para rodar InfoJobs, LinkedIn e Catho sem navegador:
+    POST   /session                          -> nova sessão (espera vaga se --sessions estiver cheio)
+    DELETE /session/{id}                     -> encerra
+    POST   /session/{id}/url                 -> "carrega" a página gravada do site da URL
+    POST   /session/{id}/element(s)          -> busca por seletor CSS (subconjunto: tag, .classe,
+    POST   /session/{id}/element/{e}/element(s)   #id, [attr], [attr=v], [attr*=v], [attr^=v],
+                                                   [attr$=v] e descendência)
+    GET    /session/{id}/element/{e}/text    -> texto do elemento
+    POST   /session/{id}/execute/sync        -> getAttribute, scrollHeight, tamanho do HTML
+    GET    /_stats                           -> contadores do hub (usado por loadtest.py)
+
+As páginas vêm de --pages/<site>.html (infojobs, linkedin, catho), gravadas
+do navegador ("Salvar como... HTML") ou as de exemplo deste diretório.
+--page-latency simula o carregamento (segundos, com ±25% de variação).
+--fresh é a fração dos links que muda a cada navegação, para que parte das
+vagas seja nova e a gravação no banco tenha trabalho (o resto é duplicada).
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from html.parser import HTMLParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ELEMENT_KEY = 'element-6066-11e4-a52e-4f735466cecf'
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+SITES = ('infojobs', 'linkedin', 'catho')
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+PAGE_HEIGHT = 4000
+
+SESSION_PATH = re.compile(r'^/session/([^/]+)(/.*)?$')
+ELEMENT_PATH = re.compile(r'^/element/([^/]+)(/.*)?$')
+
+class Node:
+    def __init__(self, tag: str, attrs: dict, parent=None):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []  # Node ou str
+
+    def text(self) -> str:
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            elif node.tag not in ('script', 'style'):
+                stack.extend(reversed(node.children))
+        return ' '.join(''.join(parts).split())
+
+    def descendants(self):
+        for child in self.children:
+            if isinstance(child, Node):
+                yield child
+                yield from child.descendants()
+
+class Document(HTMLParser):
+    """Árvore mínima do HTML gravado"""
+
+    def __init__(self, html: str):
+        super().__init__(convert_charrefs=True)
+        self.root = Node('#document', {})
+        self._current = self.root
+        self.feed(html)
+        self.close()
+        self.size = len(html.encode('utf-8'))
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {name: value or '' for name, value in attrs}, self._current)
+        self._current.children.append(node)
+        if tag not in VOID_TAGS:
+            self._current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self._current.children.append(Node(tag, {name: value or '' for name, value in attrs}, self._current))
+
+    def handle_endtag(self, tag):
+        node = self._current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self._current = node.parent
+
+    def handle_data(self, data):
+        self._current.children.append(data)
+
+# Seletor composto: tag, #id, .classe e [atributo op "valor"]
+COMPOUND = re.compile(r'^([a-zA-Z][\w-]*|\*)?((?:#[\w-]+|\.[\w-]+|\[[^\]]+\])*)$')
+PART = re.compile(r'#([\w-]+)|\.([\w-]+)|\[\s*([\w-]+)\s*(?:([*^$]?=)\s*(?:"([^"]*)"|\'([^\']*)\'|([^\]\s]*)))?\s*\]')
+
+def parse_selector(selector: str) -> list:
+    """'div.card a[href*="vaga"]' -> [(tag, [condições]), ...] (só o combinador de descendência)"""
+    compounds = []
+    for token in re.findall(r'(?:[^\s\[]+|\[[^\]]*\])+', selector.strip()):
+        match = COMPOUND.match(token)
+        if not match:
+            raise ValueError(f"seletor não suportado: {selector}")
+        conditions = []
+        for element_id, class_name, attr, op, *values in PART.findall(match.group(2)):
+            if element_id:
+                conditions.append(('id', '=', element_id))
+            elif class_name:
+                conditions.append(('class', '~=', class_name))
+            else:
+                conditions.append((attr, op or None, next((v for v in values if v), '')))
+        tag = match.group(1)
+        compounds.append((None if tag in (None, '*') else tag.lower(), conditions))
+    return compounds
+
+def _matches(node: Node, compound: tuple) -> bool:
+    tag, conditions = compound
+    if tag and node.tag != tag:
+        return False
+    for attr, op, value in conditions:
+        actual = node.attrs.get(attr)
+        if actual is None:
+            return False
+        if (op == '=' and actual != value) or (op == '~=' and value not in actual.split()) or \
+                (op == '*=' and value not in actual) or (op == '^=' and not actual.startswith(value)) or \
+                (op == '$=' and not actual.endswith(value)):
+            return False
+    return True
+
+def select(scope: Node, selector: str) -> list:
+    compounds = parse_selector(selector)
+    found = []
+    for node in scope.descendants():
+        if not _matches(node, compounds[-1]):
+            continue
+        # Demais compostos, da direita para a esquerda, entre os ancestrais (dentro do escopo)
+        remaining = len(compounds) - 2
+        ancestor = node.parent
+        while remaining >= 0 and ancestor is not None and ancestor is not scope.parent:
+            if _matches(ancestor, compounds[remaining]):
+                remaining -= 1
+            ancestor = ancestor.parent
+        if remaining < 0:
+            found.append(node)
+    return found
+
+class WebDriverError(Exception):
+    def __init__(self, status: int, error: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.error = error
+
+class Session:
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.url = 'about:blank'
+        self.document = None
+        self.navigation = 0
+        self.elements = {}
+        self.element_ids = {}
+        self.fresh = {}
+
+    def reference(self, node: Node) -> dict:
+        element_id = self.element_ids.get(id(node))
+        if element_id is None:
+            element_id = self.element_ids[id(node)] = str(len(self.elements) + 1)
+            self.elements[element_id] = node
+        return {ELEMENT_KEY: element_id}
+
+    def element(self, element_id: str) -> Node:
+        node = self.elements.get(element_id)
+        if node is None:
+            raise WebDriverError(404, 'stale element reference', f"elemento {element_id} não existe nesta página")
+        return node
+
+class FakeWebDriverHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method: str):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+        path = self.path.split('?')[0]
+        if path.startswith('/wd/hub'):
+            path = path[len('/wd/hub'):]
+
+        try:
+            if path == '/_stats':
+                return self._reply(200, self.server.get_stats(), wrap=False)
+            if path == '/status':
+                return self._reply(200, {'ready': True, 'message': 'fake hub'})
+            if path == '/session' and method == 'POST':
+                return self._reply(200, self.server.create_session())
+            match = SESSION_PATH.match(path)
+            if not match:
+                raise WebDriverError(404, 'unknown command', f"{method} {path}")
+            self.server.count_command()
+            session_id, command = match.group(1), match.group(2) or ''
+            if method == 'DELETE' and not command:
+                self.server.delete_session(session_id)
+                return self._reply(200, None)
+            session = self.server.get_session(session_id)
+            self._reply(200, self.server.execute(session, method, command, body))
+        except WebDriverError as e:
+            self._reply(e.status, {'error': e.error, 'message': str(e), 'stacktrace': ''})
+
+    def _reply(self, status: int, value, wrap: bool = True):
+        data = json.dumps({'value': value} if wrap else value).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeWebDriverServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, pages_dir: str = PAGES_DIR, max_sessions: int = 3, page_latency: float = 1.0,
+                 fresh: float = 0.3, session_timeout: float = 300.0):
+        super().__init__(address, FakeWebDriverHandler)
+        self.page_latency = page_latency
+        self.fresh = fresh
+        self.session_timeout = session_timeout
+        self.pages = {}
+        for site in SITES:
+            path = os.path.join(pages_dir, f'{site}.html')
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    self.pages[site] = Document(f.read())
+        self._slots = threading.BoundedSemaphore(max_sessions)
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._navigations = itertools.count(1)
+        self.stats = {'sessions': 0, 'active': 0, 'peak_active': 0, 'session_wait_seconds': 0.0,
+                      'rejected': 0, 'navigations': 0, 'commands': 0}
+
+    def create_session(self) -> dict:
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.session_timeout):
+            with self._lock:
+                self.stats['rejected'] += 1
+            raise WebDriverError(500, 'session not created', 'nenhuma sessão livre no hub')
+        session = Session(uuid.uuid4().hex)
+        with self._lock:
+            self._sessions[session.id] = session
+            self.stats['sessions'] += 1
+            self.stats['active'] += 1
+            self.stats['peak_active'] = max(self.stats['peak_active'], self.stats['active'])
+            self.stats['session_wait_seconds'] += time.perf_counter() - started
+        return {'sessionId': session.id,
+                'capabilities': {'browserName': 'fake-chrome', 'browserVersion': '0.0', 'platformName': 'linux'}}
+
+    def delete_session(self, session_id: str):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session:
+                self.stats['active'] -= 1
+        if session:
+            self._slots.release()
+
+    def get_session(self, session_id: str) -> Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise WebDriverError(404, 'invalid session id', f"sessão {session_id} não existe")
+        return session
+
+    def count_command(self):
+        with self._lock:
+            self.stats['commands'] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['session_wait_seconds'] = round(stats['session_wait_seconds'], 3)
+        return stats
+
+    def execute(self, session: Session, method: str, command: str, body: dict):
+        if command == '/url':
+            if method == 'GET':
+                return session.url
+            return self._navigate(session, body['url'])
+        if command in ('/element', '/elements'):
+            return self._find(session, session.document.root if session.document else None, body, command)
+        if command == '/execute/sync':
+            return self._script(session, body.get('script', ''), body.get('args', []))
+        if command == '/timeouts' or command == '/window':
+            return None
+
+        match = ELEMENT_PATH.match(command)
+        if match:
+            node = session.element(match.group(1))
+            action = match.group(2) or ''
+            if action in ('/element', '/elements'):
+                return self._find(session, node, body, action)
+            if action == '/text':
+                return node.text()
+            if action.startswith('/attribute/') or action.startswith('/property/'):
+                return self._attribute(session, node, action.rsplit('/', 1)[1])
+        raise WebDriverError(404, 'unknown command', f"{method} {command}")
+
+    def _navigate(self, session: Session, url: str):
+        time.sleep(max(0.0, random.uniform(0.75, 1.25) * self.page_latency))
+        site = next((site for site in SITES if site in url), None)
+        session.url = url
+        session.document = self.pages.get(site)
+        session.navigation = next(self._navigations)
+        session.elements, session.element_ids, session.fresh = {}, {}, {}
+        with self._lock:
+            self.stats['navigations'] += 1
+        return None
+
+    def _find(self, session: Session, scope, body: dict, command: str):
+        if body.get('using') != 'css selector':
+            raise WebDriverError(400, 'invalid argument', f"estratégia não suportada: {body.get('using')}")
+        try:
+            nodes = select(scope, body['value']) if scope is not None else []
+        except ValueError as e:
+            raise WebDriverError(400, 'invalid selector', str(e))
+        if command == '/elements':
+            return [session.reference(node) for node in nodes]
+        if not nodes:
+            raise WebDriverError(404, 'no such element', f"nenhum elemento para {body['value']}")
+        return session.reference(nodes[0])
+
+    def _attribute(self, session: Session, node: Node, name: str):
+        if name in ('textContent', 'innerText'):
+            return node.text()
+        value = node.attrs.get(name)
+        if name == 'href' and value is not None:
+            # Parte dos links muda a cada navegação (vagas "novas")
+            fresh = session.fresh.get(id(node))
+            if fresh is None:
+                fresh = session.fresh[id(node)] = random.random() < self.fresh
+            if fresh:
+                value = f"{value}#lt-{session.navigation}"
+        return value
+
+    def _script(self, session: Session, script: str, args: list):
+        if '/* getAttribute */' in script:
+            return self._attribute(session, session.element(args[0][ELEMENT_KEY]), args[1])
+        if 'Blob' in script:
+            return session.document.size if session.document else 0
+        if script.startswith('return') and 'scrollHeight' in script:
+            return PAGE_HEIGHT
+        return None
+
+def start_fake_webdriver(port: int = 0, **options) -> FakeWebDriverServer:
+    """Sobe o hub falso numa thread; retorna o servidor (porta em server_address)"""
+    server = FakeWebDriverServer(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=4444)
+    parser.add_argument('--pages', default=PAGES_DIR, help='diretório com <site>.html gravados')
+    parser.add_argument('--sessions', type=int, default=3, help='sessões simultâneas (como SE_NODE_MAX_SESSIONS)')
+    parser.add_argument('--page-latency', type=float, default=1.0)
+    parser.add_argument('--fresh', type=float, default=0.3)
+    args = parser.parse_args()
+
+    server = FakeWebDriverServer(('127.0.0.1', args.port), args.pages, args.sessions, args.page_latency, args.fresh)
+    print(f"Hub WebDriver falso em http://127.0.0.1:{args.port}/wd/hub "
+          f"({args.sessions} sessões, páginas: {', '.join(server.pages) or 'nenhuma'})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Orçamento de tempo de import da API
+
+Uso:
+    python benchmarks/import_budget.py [--runs 5] [--budget 1.2] [--top 15]
+
+Cada rodada é um processo novo (cache de módulos frio, bytecode já
+compilado) que mede `import src.api` e um `create_app()` extra. Falha
+(código 1) se a mediana passar de --budget segundos (ou IMPORT_BUDGET_SECONDS)
+ou se o import carregar alguma dependência que deveria ficar para o primeiro
+uso (Selenium, python-telegram-bot, openpyxl, pyarrow, numpy, requests,
+APScheduler).
+Com --top, mostra os módulos mais caros segundo `python -X importtime`.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Só devem ser importados quando o componente que os usa é criado
+DEFERRED_MODULES = ('selenium', 'telegram', 'openpyxl', 'pyarrow', 'numpy', 'requests', 'apscheduler')
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import src.api
+imported = time.perf_counter()
+src.api.create_app()
+print(json.dumps({
+    'import_s': imported - started,
+    'create_app_s': time.perf_counter() - imported,
+    'loaded': [name for name in %r if name in sys.modules]
+}))
+""" % (DEFERRED_MODULES,)
+
+def probe() -> dict:
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def top_imports(limit: int) -> list:
+    """(módulo, ms cumulativos) dos imports mais caros de src.api"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import src.api'], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((name.rstrip(), int(cumulative) / 1000))
+    return sorted(rows, key=lambda row: row[1], reverse=True)[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=float(os.getenv('IMPORT_BUDGET_SECONDS', '1.2')))
+    parser.add_argument('--top', type=int, default=0)
+    args = parser.parse_args()
+
+    probe()  # aquece o bytecode (.pyc) para não contar compilação
+    results = [probe() for _ in range(args.runs)]
+    import_s = statistics.median(result['import_s'] for result in results)
+    create_app_s = statistics.median(result['create_app_s'] for result in results)
+    loaded = sorted({name for result in results for name in result['loaded']})
+
+    print(f"import src.api: mediana {import_s:.3f}s (min {min(r['import_s'] for r in results):.3f}s, "
+          f"{args.runs} rodadas); create_app(): {create_app_s * 1000:.1f}ms; orçamento {args.budget:.2f}s")
+    if args.top:
+        print("\nImports mais caros (cumulativo):")
+        for name, ms in top_imports(args.top):
+            print(f"  {ms:8.1f}ms  {name}")
+
+    failures = []
+    if import_s > args.budget:
+        failures.append(f"import acima do orçamento ({import_s:.3f}s > {args.budget:.2f}s)")
+    if loaded:
+        failures.append(f"dependências carregadas no import: {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FALHOU: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+"""Teste de carga ponta a ponta: API + scheduler + scrapers contra dublês locais
+
+Uso:
+    python benchmarks/loadtest.py [--duration 300] [--scrapes-per-minute 6] [--readers 2]
+                                  [--batches 1] [--batch-every 600] [--sessions 3]
+                                  [--page-latency 1.5] [--fresh 0.3] [--scraping-delay 2] [--digest-window 60]
+                                  [--execution thread|queue] [--workers 2]
+                                  [--database-url URL] [--pages DIR] [--output report.json]
+
+Sobe, cada um no seu processo:
+    hub WebDriver falso (benchmarks/fake_webdriver.py) com as páginas gravadas,
+    Telegram falso (benchmarks/mock_telegram.py), portal falso (benchmarks/mock_portal.py),
+    a API (uvicorn src.api:app) e, com --execution queue, N workers (worker.py).
+
+Durante --duration segundos a carga segue um dia "de pico":
+    - buscas sob demanda: POST /api/scrape (chegadas Poisson, --scrapes-per-minute),
+      acompanhadas até concluir (latência ponta a ponta);
+    - lotes do scheduler: POST /api/auto-searches/execute-now (matriz de alta
+      prioridade, despachada pelo scheduling_service) --batches vezes;
+    - leitores do dashboard: GET /, /api/runs, /api/jobs, /api/approval/stats, /admin/analytics;
+    - no fim, aprovação das pendentes e entrega ao portal.
+
+Relata buscas/hora, percentis de latência por operação, as fases mais lentas
+(dos traces das execuções) e CPU/RSS de cada componente (lidos de /proc).
+Com SQLite (padrão) as escritas concorrentes serializam; para medir o banco
+de produção use --database-url postgresql://...
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.join(ROOT, 'benchmarks')
+
+KEYWORDS = ['desenvolvedor python', 'desenvolvedor java', 'analista de dados', 'react developer',
+            'engenheiro de software', 'devops', 'analista de qa', 'cientista de dados']
+SITES = ['infojobs', 'linkedin', 'catho']
+DASHBOARD_ROUTES = ['/', '/api/runs', '/api/jobs?limit=50', '/api/approval/stats', '/admin/analytics']
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def summarize(values: list) -> dict:
+    """count, média e percentis (s) de uma lista de latências"""
+    if not values:
+        return {'count': 0}
+    data = np.asarray(values)
+    return {
+        'count': int(data.size),
+        'avg': round(float(data.mean()), 3),
+        'p50': round(float(np.percentile(data, 50)), 3),
+        'p95': round(float(np.percentile(data, 95)), 3),
+        'p99': round(float(np.percentile(data, 99)), 3),
+        'max': round(float(data.max()), 3)
+    }
+
+class Component:
+    """Processo de um componente e o uso de recursos dele (CPU e RSS via /proc)"""
+
+    def __init__(self, name: str, args: list, env: dict, log_dir: str):
+        self.name = name
+        self.log = open(os.path.join(log_dir, f'{name}.log'), 'w')
+        self.process = subprocess.Popen(args, cwd=ROOT, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+        self.started = time.monotonic()
+        self.cpu_start = None
+        self.rss_samples = []
+
+    def sample(self):
+        """Lê CPU acumulada e RSS atual; a primeira leitura vira a base da CPU"""
+        try:
+            with open(f'/proc/{self.process.pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            cpu = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS  # utime + stime
+            with open(f'/proc/{self.process.pid}/status') as f:
+                rss = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:')) / 1024
+        except (OSError, StopIteration, IndexError):
+            return
+        if self.cpu_start is None:
+            self.cpu_start = cpu
+            self.sampled_from = time.monotonic()
+        self.cpu_last = cpu
+        self.sampled_to = time.monotonic()
+        self.rss_samples.append(rss)
+
+    def resources(self) -> dict:
+        if not self.rss_samples:
+            return {'cpu_seconds': None, 'cpu_percent': None, 'rss_avg_mb': None, 'rss_peak_mb': None}
+        cpu = self.cpu_last - self.cpu_start
+        elapsed = max(self.sampled_to - self.sampled_from, 1e-9)
+        return {
+            'cpu_seconds': round(cpu, 1),
+            'cpu_percent': round(cpu / elapsed * 100, 1),
+            'rss_avg_mb': round(sum(self.rss_samples) / len(self.rss_samples), 1),
+            'rss_peak_mb': round(max(self.rss_samples), 1)
+        }
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.log.close()
+
+def wait_ready(url: str, component: Component, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if component.process.poll() is not None:
+            raise RuntimeError(f"{component.name} saiu com código {component.process.returncode} "
+                               f"(veja {component.log.name})")
+        try:
+            if requests.get(url, timeout=2).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{component.name} não respondeu em {timeout}s ({url})")
+
+class LoadTest:
+    def __init__(self, args, api_url: str):
+        self.args = args
+        self.api_url = api_url
+        self.stop_at = time.monotonic() + args.duration
+        self.latencies = defaultdict(list)
+        self.counters = defaultdict(int)
+        self.pending_runs = {}  # run_id -> instante do POST
+        self._lock = threading.Lock()
+
+    def running(self) -> bool:
+        return time.monotonic() < self.stop_at
+
+    def timed(self, operation: str, session: requests.Session, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, self.api_url + path, timeout=kwargs.pop('timeout', 60), **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self.counters[f'{operation}_errors'] += 1
+            return None
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies[operation].append(elapsed)
+            if response.status_code >= 400:
+                self.counters[f'{operation}_errors'] += 1
+        return response
+
+    def on_demand(self):
+        """Buscas sob demanda com chegadas Poisson"""
+        session = requests.Session()
+        rate = self.args.scrapes_per_minute / 60
+        while self.running() and rate > 0:
+            time.sleep(random.expovariate(rate))
+            if not self.running():
+                break
+            body = {'keywords': [random.choice(KEYWORDS)], 'sites': [random.choice(SITES)], 'send_telegram': True}
+            response = self.timed('api_scrape_submit', session, 'POST', '/api/scrape', json=body)
+            if response is not None and response.status_code == 202:
+                with self._lock:
+                    self.pending_runs[response.json()['run_id']] = time.monotonic()
+
+    def follow_runs(self, drain_until: float):
+        """Acompanha as execuções sob demanda até concluírem (latência ponta a ponta)"""
+        session = requests.Session()
+        while self.running() or (self.pending_runs and time.monotonic() < drain_until):
+            with self._lock:
+                pending = list(self.pending_runs.items())
+            for run_id, submitted in pending:
+                response = self.timed('api_scrape_status', session, 'GET', f'/api/scrape/{run_id}')
+                if response is None or response.status_code != 200:
+                    continue
+                status = response.json()['status']
+                if status in ('completed', 'failed'):
+                    with self._lock:
+                        self.pending_runs.pop(run_id, None)
+                        self.counters[f'on_demand_{status}'] += 1
+                        self.latencies['on_demand_run_end_to_end'].append(time.monotonic() - submitted)
+            time.sleep(1)
+
+    def scheduled_batches(self):
+        """Lotes da matriz de alta prioridade pelo scheduler (a chamada só volta no fim do lote)"""
+        session = requests.Session()
+        for index in range(self.args.batches):
+            if index:
+                next_at = time.monotonic() + self.args.batch_every
+                while self.running() and time.monotonic() < next_at:
+                    time.sleep(1)
+            if not self.running():
+                break
+            response = self.timed('scheduler_batch', session, 'POST', '/api/auto-searches/execute-now',
+                                  timeout=self.args.duration + self.args.drain)
+            if response is not None and response.status_code == 200:
+                with self._lock:
+                    self.counters['scheduler_searches'] += response.json()['executed_searches']
+
+    def dashboard_reader(self):
+        session = requests.Session()
+        while self.running():
+            route = random.choice(DASHBOARD_ROUTES)
+            self.timed(f"dashboard {route.split('?')[0]}", session, 'GET', route)
+            time.sleep(random.uniform(0.5, 1.5))
+
+    def deliver_to_portal(self):
+        """Aprova as pendentes e entrega ao portal falso"""
+        session = requests.Session()
+        while True:
+            response = self.timed('approval_pending', session, 'GET', '/api/approval/pending?limit=200')
+            ids = [job['id'] for job in response.json()] if response is not None and response.ok else []
+            if not ids:
+                break
+            self.timed('approval_approve', session, 'POST', '/api/approval/approve', json=ids)
+            self.counters['approved'] += len(ids)
+        response = self.timed('portal_send', session, 'POST', '/api/portal-integration/send-jobs', json=[],
+                              timeout=300)
+        if response is not None and response.ok:
+            self.counters['portal_sent'] += response.json().get('sent', 0)
+
+def fetch(url: str, default=None):
+    try:
+        response = requests.get(url, timeout=30)
+        return response.json() if response.ok else default
+    except (requests.RequestException, ValueError):
+        return default
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=int, default=300, help='segundos gerando carga')
+    parser.add_argument('--drain', type=int, default=180, help='segundos esperando as execuções em andamento')
+    parser.add_argument('--scrapes-per-minute', type=float, default=6)
+    parser.add_argument('--readers', type=int, default=2, help='leitores simultâneos do dashboard')
+    parser.add_argument('--batches', type=int, default=1, help='lotes execute-now (0 desativa)')
+    parser.add_argument('--batch-every', type=int, default=600, help='segundos entre lotes')
+    parser.add_argument('--sessions', type=int, default=3, help='sessões do hub (GRID_MAX_SESSIONS)')
+    parser.add_argument('--page-latency', type=float, default=1.5, help='carregamento simulado da página (s)')
+    parser.add_argument('--fresh', type=float, default=0.3, help='fração de links novos por navegação')
+    parser.add_argument('--scraping-delay', type=int, default=2, help='SCRAPING_DELAY dos scrapers (s)')
+    parser.add_argument('--digest-window', type=int, default=60,
+                        help='TELEGRAM_DIGEST_WINDOW (s); o padrão de produção (900) passaria do teste')
+    parser.add_argument('--portal-latency', type=float, default=0.05)
+    parser.add_argument('--telegram-latency', type=float, default=0.05)
+    parser.add_argument('--execution', choices=['thread', 'queue'], default='thread')
+    parser.add_argument('--workers', type=int, default=2, help='processos worker.py (com --execution queue)')
+    parser.add_argument('--database-url', help='padrão: SQLite num diretório temporário')
+    parser.add_argument('--pages', default=os.path.join(BENCHMARKS, 'pages'))
+    parser.add_argument('--output', help='grava o relatório completo em JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    ports = {name: free_port() for name in ('hub', 'telegram', 'portal', 'api')}
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        SELENIUM_HUB_URL=f"http://127.0.0.1:{ports['hub']}/wd/hub",
+        TELEGRAM_API_BASE_URL=f"http://127.0.0.1:{ports['telegram']}/bot",
+        TELEGRAM_BOT_TOKEN='123456:loadtest',
+        TELEGRAM_CHAT_ID='1',
+        PORTAL_API_URL=f"http://127.0.0.1:{ports['portal']}/api",
+        PORTAL_ADMIN_TOKEN='loadtest',
+        GRID_MAX_SESSIONS=str(args.sessions),
+        SCRAPE_EXECUTION=args.execution,
+        SCRAPE_JOB_WORKERS=str(args.sessions),
+        SCRAPING_DELAY=str(args.scraping_delay),
+        TELEGRAM_DIGEST_WINDOW=str(args.digest_window),
+        ARCHIVE_PATH=os.path.join(workdir, 'archive'),
+        PROFILE_PATH=os.path.join(workdir, 'profiles'),
+        PYTHONUNBUFFERED='1'
+    )
+    env.pop('METRICS_PORT', None)
+
+    python = sys.executable
+    components = []
+    try:
+        hub = Component('webdriver_hub', [python, 'benchmarks/fake_webdriver.py', '--port', str(ports['hub']),
+                                          '--pages', args.pages, '--sessions', str(args.sessions),
+                                          '--page-latency', str(args.page_latency), '--fresh', str(args.fresh)],
+                        env, workdir)
+        telegram = Component('telegram', [python, 'benchmarks/mock_telegram.py', '--port', str(ports['telegram']),
+                                          '--latency', str(args.telegram_latency)], env, workdir)
+        portal = Component('portal', [python, 'benchmarks/mock_portal.py', '--port', str(ports['portal']),
+                                      '--latency', str(args.portal_latency)], env, workdir)
+        components += [hub, telegram, portal]
+        for component, port in ((hub, ports['hub']), (telegram, ports['telegram']), (portal, ports['portal'])):
+            wait_ready(f"http://127.0.0.1:{port}/_stats", component)
+
+        api = Component('api', [python, '-m', 'uvicorn', 'src.api:app', '--host', '127.0.0.1',
+                                '--port', str(ports['api']), '--log-level', 'warning'], env, workdir)
+        components.append(api)
+        api_url = f"http://127.0.0.1:{ports['api']}"
+        wait_ready(f"{api_url}/health", api)
+        if args.execution == 'queue':
+            for index in range(args.workers):
+                components.append(Component(f'worker_{index + 1}', [python, 'worker.py'], env, workdir))
+
+        print(f"Componentes no ar (logs em {workdir}); gerando carga por {args.duration}s...", flush=True)
+        test = LoadTest(args, api_url)
+        started = time.monotonic()
+        drain_until = test.stop_at + args.drain
+
+        sampler_stop = threading.Event()
+
+        def sample_resources():
+            while not sampler_stop.wait(1):
+                for component in components:
+                    component.sample()
+
+        threads = [threading.Thread(target=sample_resources, daemon=True),
+                   threading.Thread(target=test.on_demand, daemon=True),
+                   threading.Thread(target=test.follow_runs, args=(drain_until,), daemon=True),
+                   threading.Thread(target=test.scheduled_batches, daemon=True)]
+        threads += [threading.Thread(target=test.dashboard_reader, daemon=True) for _ in range(args.readers)]
+        for component in components:
+            component.sample()
+        for thread in threads:
+            thread.start()
+        for thread in threads[1:]:
+            thread.join(timeout=max(0.0, drain_until - time.monotonic()) + args.duration)
+
+        test.deliver_to_portal()
+        elapsed = time.monotonic() - started
+        sampler_stop.set()
+        for component in components:
+            component.sample()
+
+        report = build_report(args, test, elapsed, components, api_url, ports)
+    finally:
+        for component in reversed(components):
+            component.stop()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\nRelatório completo em {args.output}")
+
+def build_report(args, test: LoadTest, elapsed: float, components: list, api_url: str, ports: dict) -> dict:
+    searches = test.counters['on_demand_completed'] + test.counters['on_demand_failed'] + \
+        test.counters['scheduler_searches'] * len(SITES)
+    slow = fetch(f"{api_url}/admin/slow-phases?hours=24&limit=15", {})
+    return {
+        'config': vars(args),
+        'elapsed_seconds': round(elapsed, 1),
+        'throughput': {
+            'searches': searches,
+            'searches_per_hour': round(searches / elapsed * 3600, 1),
+            'runs_traced': slow.get('runs'),
+            'on_demand_completed': test.counters['on_demand_completed'],
+            'on_demand_failed': test.counters['on_demand_failed'],
+            'on_demand_unfinished': len(test.pending_runs),
+            'scheduler_searches': test.counters['scheduler_searches'],
+            'approved': test.counters['approved'],
+            'portal_sent': test.counters['portal_sent']
+        },
+        'latency_seconds': {operation: summarize(values) for operation, values in sorted(test.latencies.items())},
+        'errors': {name: count for name, count in test.counters.items() if name.endswith('_errors')},
+        'slowest_phases': slow.get('phases', []),
+        'resources': {component.name: component.resources() for component in components},
+        'components': {
+            'webdriver_hub': fetch(f"http://127.0.0.1:{ports['hub']}/_stats"),
+            'telegram': fetch(f"http://127.0.0.1:{ports['telegram']}/_stats"),
+            'portal': fetch(f"http://127.0.0.1:{ports['portal']}/_stats"),
+            'work_queue': fetch(f"{api_url}/api/work-queue") if args.execution == 'queue' else None,
+            'telegram_queue': fetch(f"{api_url}/admin/system-health", {}).get('telegram_queue')
+        }
+    }
+
+def print_report(report: dict):
+    throughput = report['throughput']
+    print(f"\n== Vazão ({report['elapsed_seconds']}s) ==")
+    print(f"buscas: {throughput['searches']}  |  buscas/hora: {throughput['searches_per_hour']:,.1f}  |  "
+          f"sob demanda: {throughput['on_demand_completed']} ok, {throughput['on_demand_failed']} falhas, "
+          f"{throughput['on_demand_unfinished']} sem concluir  |  scheduler: {throughput['scheduler_searches']}  |  "
+          f"portal: {throughput['portal_sent']} enviadas")
+
+    print("\n== Latência (s) ==")
+    print(f"{'operação':>34} | {'n':>5} | {'p50':>7} | {'p95':>7} | {'p99':>7} | {'máx':>7}")
+    print('-' * 82)
+    for operation, stats in report['latency_seconds'].items():
+        if stats['count']:
+            print(f"{operation:>34} | {stats['count']:>5} | {stats['p50']:>7} | {stats['p95']:>7} | "
+                  f"{stats['p99']:>7} | {stats['max']:>7}")
+    if report['errors']:
+        print(f"erros: {report['errors']}")
+
+    print("\n== Fases mais lentas (traces) ==")
+    print(f"{'site':>10} | {'fase':>10} | {'n':>5} | {'média ms':>9} | {'p95 ms':>8} | {'máx ms':>8}")
+    print('-' * 66)
+    for phase in report['slowest_phases']:
+        print(f"{phase['site'] or '-':>10} | {phase['phase']:>10} | {phase['count']:>5} | {phase['avg_ms']:>9} | "
+              f"{phase['p95_ms']:>8} | {phase['max_ms']:>8}")
+
+    print("\n== Recursos por componente ==")
+    print(f"{'componente':>14} | {'CPU s':>7} | {'CPU %':>6} | {'RSS méd MB':>10} | {'RSS pico MB':>11}")
+    print('-' * 62)
+    for name, resources in report['resources'].items():
+        if resources['cpu_seconds'] is None:
+            print(f"{name:>14} | {'n/d':>7} | {'n/d':>6} | {'n/d':>10} | {'n/d':>11}")
+            continue
+        print(f"{name:>14} | {resources['cpu_seconds']:>7} | {resources['cpu_percent']:>6} | "
+              f"{resources['rss_avg_mb']:>10} | {resources['rss_peak_mb']:>11}")
+    print(f"\nhub: {report['components']['webdriver_hub']}")
+    print(f"telegram: {report['components']['telegram']}")
+    print(f"portal: {report['components']['portal']}")
+
+if __name__ == '__main__':
+    main()
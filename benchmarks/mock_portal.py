@@ -0,0 +1,132 @@
+"""Portal falso para benchmarks e testes manuais da integração
+
+Uso:
+    python benchmarks/mock_portal.py [--port 8090] [--latency 0.05] [--no-batch]
+
+Responde como a API do portal principal:
+    POST /api/jobs                       -> 201 {"id": N}
+    POST /api/jobs/batch                 -> 207 {"results": [{"index", "id", "approved", "error"}]}
+    POST /api/admin/jobs/{id}/approve    -> 200 {"status": "approved"}
+    GET  /_stats                         -> vagas criadas e requisições por rota (usado por loadtest.py)
+
+--latency simula o tempo de resposta do portal (segundos por requisição).
+--no-batch responde 404 em /api/jobs/batch (portal antigo).
+Vagas sem título são recusadas, para exercitar falhas parciais. Chaves de
+idempotência (header Idempotency-Key ou campo idempotencyKey no lote)
+repetidas devolvem a vaga já criada em vez de duplicá-la.
+"""
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APPROVE_PATH = re.compile(r'^/api/admin/jobs/(\d+)/approve$')
+
+class MockPortalHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True  # headers e corpo saem em writes separados
+
+    def do_GET(self):
+        if self.path == '/_stats':
+            return self._reply(200, self.server.get_stats())
+        self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        time.sleep(self.server.latency)
+        self.server.count_request('approve' if APPROVE_PATH.match(self.path) else self.path)
+
+        if self.path == '/api/jobs':
+            try:
+                json.loads(body or b'{}')
+            except ValueError:
+                return self._reply(400, {'error': 'invalid json'})
+            job_id, created = self.server.create_job(self.headers.get('Idempotency-Key'))
+            return self._reply(201 if created else 200, {'id': job_id})
+
+        if self.path == '/api/jobs/batch' and self.server.batch:
+            payload = json.loads(body or b'{}')
+            approve = bool(payload.get('approve'))
+            results = []
+            for index, job in enumerate(payload.get('jobs', [])):
+                if not job.get('title'):
+                    results.append({'index': index, 'error': 'title is required'})
+                else:
+                    job_id, _ = self.server.create_job(job.get('idempotencyKey'))
+                    results.append({'index': index, 'id': job_id, 'approved': approve})
+            return self._reply(207, {'results': results})
+
+        if APPROVE_PATH.match(self.path):
+            return self._reply(200, {'status': 'approved'})
+
+        self._reply(404, {'error': 'not found'})
+
+    def _reply(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class MockPortalServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, batch: bool = True):
+        super().__init__(address, MockPortalHandler)
+        self.latency = latency
+        self.batch = batch
+        self._ids = itertools.count(1)
+        self._ids_lock = threading.Lock()
+        self.idempotency_keys = {}
+        self.created = 0
+        self.requests = {}
+
+    def create_job(self, idempotency_key: str = None) -> tuple:
+        """Retorna (id, criada); chave repetida devolve a vaga existente"""
+        with self._ids_lock:
+            if idempotency_key and idempotency_key in self.idempotency_keys:
+                return self.idempotency_keys[idempotency_key], False
+            job_id = next(self._ids)
+            self.created += 1
+            if idempotency_key:
+                self.idempotency_keys[idempotency_key] = job_id
+            return job_id, True
+
+    def count_request(self, route: str):
+        with self._ids_lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def get_stats(self) -> dict:
+        with self._ids_lock:
+            return {'jobs_created': self.created, 'requests': dict(self.requests)}
+
+def start_mock_portal(port: int = 0, latency: float = 0.0, batch: bool = True) -> MockPortalServer:
+    """Sobe o portal falso numa thread; retorna o servidor (porta em server_address)"""
+    server = MockPortalServer(('127.0.0.1', port), latency, batch)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--no-batch', action='store_true')
+    args = parser.parse_args()
+
+    server = MockPortalServer(('127.0.0.1', args.port), args.latency, batch=not args.no_batch)
+    print(f"Mock portal em http://127.0.0.1:{args.port}/api (latência {args.latency}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
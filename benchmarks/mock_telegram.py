@@ -0,0 +1,137 @@
+"""Bot API do Telegram falsa para testes de carga
+
+Uso:
+    python benchmarks/mock_telegram.py [--port 8091] [--latency 0.05] [--chat-rate 1]
+
+Aponte TELEGRAM_API_BASE_URL=http://127.0.0.1:8091/bot para a fila de
+entrega (src/telegram_queue.py) falar com este servidor:
+    POST /bot{token}/sendMessage -> 200 {"ok": true, "result": {mensagem}}
+    POST /bot{token}/getMe       -> 200 {"ok": true, "result": {bot}}
+    GET  /_stats                 -> mensagens recebidas, 429 devolvidos, bytes
+
+--latency simula o tempo de resposta da API (segundos por chamada).
+--chat-rate é o limite de mensagens/s por chat; acima dele a resposta é
+429 com retry_after, como o Telegram real faz (0 desativa).
+"""
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+METHOD_PATH = re.compile(r'^/bot([^/]+)/(\w+)$')
+
+class MockTelegramHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path == '/_stats':
+            return self._reply(200, self.server.get_stats())
+        self._reply(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        time.sleep(self.server.latency)
+
+        match = METHOD_PATH.match(self.path.split('?')[0])
+        if not match:
+            return self._reply(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+        method = match.group(2)
+        if 'json' in (self.headers.get('Content-Type') or ''):
+            params = json.loads(body or b'{}')
+        else:
+            params = dict(parse_qsl(body.decode('utf-8')))
+
+        if method == 'getMe':
+            return self._reply(200, {'ok': True, 'result': {
+                'id': 1, 'is_bot': True, 'first_name': 'Load Test', 'username': 'loadtest_bot'
+            }})
+        if method == 'sendMessage':
+            chat_id = str(params.get('chat_id'))
+            retry_after = self.server.throttle(chat_id)
+            if retry_after:
+                return self._reply(429, {'ok': False, 'error_code': 429,
+                                         'description': f'Too Many Requests: retry after {retry_after}',
+                                         'parameters': {'retry_after': retry_after}})
+            text = params.get('text', '')
+            return self._reply(200, {'ok': True, 'result': {
+                'message_id': self.server.record_message(len(text.encode('utf-8'))),
+                'date': int(time.time()),
+                'chat': {'id': int(chat_id) if chat_id.lstrip('-').isdigit() else 0, 'type': 'private'},
+                'text': text
+            }})
+        self._reply(400, {'ok': False, 'error_code': 400, 'description': f'method {method} not mocked'})
+
+    def _reply(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class MockTelegramServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, chat_rate: float = 1.0):
+        super().__init__(address, MockTelegramHandler)
+        self.latency = latency
+        self.chat_rate = chat_rate
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._last_message = {}  # chat -> instante da última mensagem aceita
+        self.stats = {'messages': 0, 'throttled': 0, 'bytes': 0}
+
+    def throttle(self, chat_id: str) -> int:
+        """Segundos de espera se o chat passou do limite; 0 se a mensagem pode ser aceita"""
+        if self.chat_rate <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            wait = self._last_message.get(chat_id, 0) + 1 / self.chat_rate - now
+            if wait > 0:
+                self.stats['throttled'] += 1
+                return max(1, round(wait))
+            self._last_message[chat_id] = now
+            return 0
+
+    def record_message(self, size: int) -> int:
+        with self._lock:
+            self.stats['messages'] += 1
+            self.stats['bytes'] += size
+        return next(self._ids)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+def start_mock_telegram(port: int = 0, latency: float = 0.0, chat_rate: float = 1.0) -> MockTelegramServer:
+    """Sobe o Telegram falso numa thread; retorna o servidor (porta em server_address)"""
+    server = MockTelegramServer(('127.0.0.1', port), latency, chat_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8091)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--chat-rate', type=float, default=1.0)
+    args = parser.parse_args()
+
+    server = MockTelegramServer(('127.0.0.1', args.port), args.latency, args.chat_rate)
+    print(f"Telegram falso em http://127.0.0.1:{args.port}/bot (latência {args.latency}s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
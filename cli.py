@@ -0,0 +1,215 @@
+"""Scraping em lote pela linha de comando, sem a API
+
+Uso:
+    python cli.py [specs.txt | -] [--sites infojobs,linkedin] [--regions "São Paulo,Remoto"]
+                  [--parallel 3] [--days-back 1] [--output vagas.ndjson] [--no-db] [--notify]
+
+Cada linha da entrada (arquivo ou stdin) é uma especificação:
+    desenvolvedor java                       só a palavra-chave
+    desenvolvedor java;São Paulo;linkedin    palavra-chave;região;site (campos vazios = padrão)
+    {"keyword": "python", "regions": ["Remoto"], "sites": ["catho"], "filters": {"remote_only": true}}
+Linhas vazias e iniciadas por # são ignoradas. Sem região/site na linha,
+vale o produto cartesiano com --regions e --sites.
+
+As buscas rodam em --parallel threads (padrão GRID_MAX_SESSIONS) com o
+JobScraper. As vagas saem em NDJSON (uma por linha, com keyword, region e
+site) no stdout ou em --output, à medida que cada busca termina. Os logs
+vão para o stderr. Por padrão cada busca é registrada como ScrapingRun,
+com o trace das fases, e as vagas novas (por link) vão para o banco e para
+a fila de aprovação, como nas buscas agendadas; o campo "new" indica
+quais eram inéditas. --no-db só coleta. --notify envia as vagas novas ao
+resumo do Telegram (desligado por padrão para não inundar o canal num
+lote grande). No fim, o resumo de vazão vai para o stderr.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.scheduling_service import scheduling_service, DEFAULT_SITES
+from src.database import SessionLocal, ScrapingRun, init_db
+from src import tracing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from loguru import logger
+import argparse
+import json
+import sys
+import time
+
+def parse_specs(lines, regions: list, sites: list) -> list:
+    """Expande as linhas de entrada em unidades (keyword, region, site, filters)"""
+    units = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        
+        if line.startswith('{'):
+            spec = json.loads(line)
+            keyword = spec.get('keyword')
+            spec_regions = spec.get('regions') or ([spec['region']] if spec.get('region') else regions)
+            spec_sites = spec.get('sites') or ([spec['site']] if spec.get('site') else sites)
+            filters = spec.get('filters')
+        else:
+            fields = [field.strip() for field in line.split(';')] + ['', '']
+            keyword = fields[0]
+            spec_regions = [fields[1]] if fields[1] else regions
+            spec_sites = [fields[2]] if fields[2] else sites
+            filters = None
+        
+        if not keyword:
+            raise ValueError(f"linha {number}: palavra-chave vazia")
+        unknown = [site for site in spec_sites if site not in DEFAULT_SITES]
+        if unknown:
+            raise ValueError(f"linha {number}: site(s) não suportado(s) {unknown} (use {DEFAULT_SITES})")
+        
+        for region in spec_regions:
+            for site in spec_sites:
+                units.append({'keyword': keyword, 'region': region or None, 'site': site, 'filters': filters})
+    return units
+
+class BatchRunner:
+    """Executa as unidades com o JobScraper compartilhado do serviço de agendamento"""
+    
+    def __init__(self, days_back: int = 1, use_db: bool = True, notify: bool = False):
+        self.days_back = days_back
+        self.use_db = use_db
+        self.notify = notify
+    
+    def run(self, unit: dict) -> dict:
+        """Coleta uma unidade; retorna as vagas, os links novos, a duração e o erro (se houver)"""
+        started = time.perf_counter()
+        result = {'unit': unit, 'jobs': [], 'new_links': None, 'error': None}
+        with tracing.tracing() as trace:
+            run, db = None, None
+            if self.use_db:
+                db = SessionLocal()
+                run = ScrapingRun(keyword=unit['keyword'], source=unit['site'], region=unit['region'], status="running")
+                db.add(run)
+                db.commit()
+            try:
+                scrape = getattr(scheduling_service.scraper, f"scrape_{unit['site']}")
+                jobs = scrape(unit['keyword'], days_back=self.days_back, location=unit['region'] or "",
+                              filters=unit['filters'])
+                result['jobs'] = jobs
+                
+                if run is not None:
+                    new_jobs = scheduling_service.store_new_jobs(jobs, db)
+                    result['new_links'] = {job['link'] for job in new_jobs}
+                    if self.notify and new_jobs:
+                        with tracing.span('notify', unit['site'], jobs=len(new_jobs)):
+                            scheduling_service.notifier.send_jobs(new_jobs, unit['keyword'])
+                    run.jobs_found = len(new_jobs)
+                    run.status = "completed"
+            except Exception as e:
+                result['error'] = str(e)
+                logger.error(f"Falha em '{unit['keyword']}' ({unit['site']}, {unit['region'] or '-'}): {e}")
+                if run is not None:
+                    db.rollback()
+                    run.status = "failed"
+                    run.error_message = str(e)
+            finally:
+                if run is not None:
+                    run.completed_at = datetime.utcnow()
+                    run.trace = trace.to_json()
+                    db.commit()
+                    db.close()
+        result['seconds'] = time.perf_counter() - started
+        return result
+
+def write_jobs(output, result: dict) -> int:
+    """Grava as vagas da unidade como NDJSON; retorna quantas linhas foram escritas"""
+    unit, new_links = result['unit'], result['new_links']
+    for job in result['jobs']:
+        record = {'keyword': unit['keyword'], 'region': unit['region'], 'site': unit['site'], **job}
+        if new_links is not None:
+            record['new'] = job['link'] in new_links
+        output.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+    output.flush()
+    return len(result['jobs'])
+
+def print_summary(results: list, total_units: int, elapsed: float, use_db: bool, interrupted: bool = False):
+    """Vazão do lote e duração por site, no stderr"""
+    failed = sum(1 for result in results if result['error'])
+    jobs = sum(len(result['jobs']) for result in results)
+    minutes = elapsed / 60 or 1
+    
+    lines = [
+        f"{'Interrompido' if interrupted else 'Concluído'}: {len(results)}/{total_units} buscas "
+        f"({failed} com falha) em {elapsed:.1f}s",
+        f"  {len(results) / minutes:.1f} buscas/min, {jobs} vagas ({jobs / (elapsed or 1):.2f} vagas/s)"
+    ]
+    if use_db:
+        new = sum(len(result['new_links'] or ()) for result in results)
+        lines.append(f"  {new} vagas novas gravadas no banco")
+    
+    by_site = {}
+    for result in results:
+        by_site.setdefault(result['unit']['site'], []).append(result)
+    for site, site_results in sorted(by_site.items()):
+        durations = sorted(result['seconds'] for result in site_results)
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        lines.append(
+            f"  {site}: {len(site_results)} buscas, {sum(len(r['jobs']) for r in site_results)} vagas, "
+            f"média {sum(durations) / len(durations):.1f}s, p95 {p95:.1f}s"
+        )
+    print('\n'.join(lines), file=sys.stderr)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('specs', nargs='?', default='-', help="arquivo de especificações (padrão: stdin)")
+    parser.add_argument('--sites', default='infojobs', help="sites padrão, separados por vírgula")
+    parser.add_argument('--regions', default='', help="regiões padrão, separadas por vírgula (vazio: sem região)")
+    parser.add_argument('--parallel', type=int, default=scheduling_service.max_sessions,
+                        help="buscas simultâneas (padrão: GRID_MAX_SESSIONS)")
+    parser.add_argument('--days-back', type=int, default=1)
+    parser.add_argument('--output', default='-', help="arquivo NDJSON (padrão: stdout)")
+    parser.add_argument('--no-db', action='store_true', help="não grava execuções nem vagas no banco")
+    parser.add_argument('--notify', action='store_true', help="envia as vagas novas ao resumo do Telegram")
+    args = parser.parse_args(argv)
+    
+    if args.no_db and args.notify:
+        parser.error("--notify depende do banco (só vagas novas são notificadas)")
+    
+    sites = [site.strip() for site in args.sites.split(',') if site.strip()]
+    regions = [region.strip() for region in args.regions.split(',')] if args.regions else ['']
+    source = sys.stdin if args.specs == '-' else open(args.specs, encoding='utf-8')
+    try:
+        units = parse_specs(source, regions, sites)
+    except (ValueError, json.JSONDecodeError) as e:
+        parser.error(str(e))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    if not units:
+        parser.error("nenhuma especificação na entrada")
+    
+    if not args.no_db:
+        init_db()
+    runner = BatchRunner(days_back=args.days_back, use_db=not args.no_db, notify=args.notify)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    logger.info(f"{len(units)} buscas, {args.parallel} em paralelo")
+    
+    results = []
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=max(1, args.parallel), thread_name_prefix='batch')
+    try:
+        futures = [executor.submit(runner.run, unit) for unit in units]
+        for future in as_completed(futures):
+            result = future.result()
+            write_jobs(output, result)
+            results.append(result)
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        print_summary(results, len(units), time.perf_counter() - started, runner.use_db, interrupted=True)
+        return 130
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    executor.shutdown()
+    
+    print_summary(results, len(units), time.perf_counter() - started, runner.use_db)
+    return 1 if any(result['error'] for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,86 +1,38 @@
-from apscheduler.schedulers.blocking import BlockingScheduler
-from src.scraper import JobScraper
-from src.telegram_bot import TelegramNotifier
-from src.database import SessionLocal, ScrapingRun, ScrapedJob, init_db
-from datetime import datetime
+from src.scheduling_service import scheduling_service
+from src.archive import schedule_archive
+from src.database import init_db
+from src.metrics import start_metrics_server
 from loguru import logger
-import os
+import asyncio
 
-def scheduled_scrape():
-    """Execução agendada de scraping"""
-    logger.info("Starting scheduled scrape")
-    
-    scraper = JobScraper()
-    notifier = TelegramNotifier()
-    db = SessionLocal()
-    
-    keywords = ["desenvolvedor java", "python developer", "react developer"]
-    
-    try:
-        for keyword in keywords:
-            run = ScrapingRun(
-                keyword=keyword,
-                source="infojobs",
-                status="running"
-            )
-            db.add(run)
-            db.commit()
-            db.refresh(run)
-            
-            try:
-                jobs = scraper.scrape_infojobs(keyword, days_back=1)
-                
-                new_jobs = []
-                for job in jobs:
-                    existing = db.query(ScrapedJob).filter(ScrapedJob.link == job['link']).first()
-                    if not existing:
-                        scraped_job = ScrapedJob(
-                            title=job['title'],
-                            link=job['link'],
-                            source=job['source']
-                        )
-                        db.add(scraped_job)
-                        new_jobs.append(job)
-                
-                db.commit()
-                
-                run.jobs_found = len(new_jobs)
-                run.status = "completed"
-                run.completed_at = datetime.utcnow()
-                db.commit()
-                
-                if new_jobs:
-                    notifier.send_jobs(new_jobs, keyword)
-                    logger.info(f"Found {len(new_jobs)} new jobs for '{keyword}'")
-                
-            except Exception as e:
-                run.status = "failed"
-                run.error_message = str(e)
-                run.completed_at = datetime.utcnow()
-                db.commit()
-                logger.error(f"Scraping failed for '{keyword}': {e}")
-                
-    finally:
-        db.close()
+# Busca diária padrão (antes um BlockingScheduler próprio deste container)
+DAILY_KEYWORDS = ["desenvolvedor java", "python developer", "react developer"]
 
-if __name__ == "__main__":
+async def main():
+    """Réplica do serviço de agendamento: dispara jobs só enquanto for líder"""
     init_db()
+    start_metrics_server()
     
-    scheduler = BlockingScheduler()
+    scheduling_service.start()
     
     # Executar todos os dias às 9h
-    scheduler.add_job(
-        scheduled_scrape,
-        'cron',
-        hour=9,
-        minute=0,
-        id='daily_scrape'
+    scheduling_service.add_recurring_scrape(
+        'daily_scrape',
+        DAILY_KEYWORDS,
+        '0 9 * * *',
+        sites=['infojobs']
     )
+    schedule_archive(scheduling_service)
     
     logger.info("Scheduler started - Daily scraping at 9:00 AM")
     
     try:
-        scheduler.start()
-    except KeyboardInterrupt:
-        logger.info("Scheduler stopped")
-        scheduler.shutdown()
\ No newline at end of file
+        await asyncio.Event().wait()
+    finally:
+        await scheduling_service.shutdown()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, SystemExit):
+        pass
@@ -0,0 +1,211 @@
+from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import func
+from .database import SessionLocal, ScrapingRun
+from .scheduling_service import scheduling_service, DEFAULT_SITES, DEFAULT_SITE_DURATION
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from loguru import logger
+import asyncio
+import math
+import os
+
+ADAPTIVE_TICK_JOB_ID = 'adaptive_tick'
+
+def cron_runs_per_day(schedule: str, days: int = 7) -> float:
+    """Média de disparos por dia de uma expressão cron (amostra de `days` dias)"""
+    trigger = CronTrigger.from_crontab(schedule)
+    now = datetime.now(trigger.timezone)
+    end = now + timedelta(days=days)
+    fire, count = trigger.get_next_fire_time(None, now), 0
+    while fire is not None and fire < end:
+        count += 1
+        fire = trigger.get_next_fire_time(fire, fire + timedelta(seconds=1))
+    return count / days
+
+class AdaptiveScheduler:
+    """Frequência de cada combinação (palavra-chave, região, site) pelo rendimento
+    
+    O rendimento é a taxa de vagas novas por hora vista em scraping_runs,
+    suavizada pela frequência do perfil (combinações sem histórico começam no
+    horário do perfil). O intervalo é o tempo esperado para acumular
+    ADAPTIVE_TARGET_NEW_JOBS vagas novas, dentro dos limites configurados; se o
+    plano passar do orçamento diário de minutos de navegador, as combinações
+    com menos vagas por minuto de navegador são espaçadas primeiro.
+    """
+    
+    def __init__(self):
+        self.enabled = os.getenv('ADAPTIVE_SCHEDULING', 'false').lower() == 'true'  # opt-in: substitui os crons dos perfis
+        self.min_interval = float(os.getenv('ADAPTIVE_MIN_INTERVAL', '60')) * 60  # minutos
+        self.max_interval = float(os.getenv('ADAPTIVE_MAX_INTERVAL', '2880')) * 60  # minutos
+        self.target_new_jobs = float(os.getenv('ADAPTIVE_TARGET_NEW_JOBS', '3'))
+        self.lookback_days = int(os.getenv('ADAPTIVE_LOOKBACK_DAYS', '14'))
+        self.budget_minutes = float(os.getenv('BROWSER_MINUTES_BUDGET', '600'))  # por dia
+        self.tick_seconds = int(os.getenv('ADAPTIVE_TICK_SECONDS', '300'))
+        self.service = scheduling_service
+        self.last_tick_at: Optional[datetime] = None
+        self._in_flight = set()
+        self._tasks = set()
+    
+    def plan(self, searches: List[Dict]) -> List[Dict]:
+        """Intervalo aprendido e próxima execução de cada combinação da matriz"""
+        history = self._load_history()
+        now = datetime.utcnow()
+        runs_per_day: Dict[str, float] = {}
+        
+        combinations = []
+        for search in searches:
+            schedule = search['schedule']
+            if schedule not in runs_per_day:
+                runs_per_day[schedule] = cron_runs_per_day(schedule)
+            base_interval = 86400 / max(runs_per_day[schedule], 1 / 7)
+            
+            for site in search.get('sites') or DEFAULT_SITES:
+                key = (search['keyword'], search.get('region'), site)
+                runs, new_jobs, first_run, last_run = history.get(key, (0, 0, None, None))
+                
+                # A primeira execução traz o acumulado de ~um intervalo do perfil antes dela;
+                # o prior é mais um intervalo do perfil rendendo exatamente a meta
+                observed = (now - first_run).total_seconds() + base_interval if first_run else 0.0
+                rate = (new_jobs + self.target_new_jobs) / ((observed + base_interval) / 3600)
+                interval = min(self.max_interval, max(self.min_interval, self.target_new_jobs / rate * 3600))
+                
+                combinations.append({
+                    'keyword': key[0],
+                    'region': key[1],
+                    'site': site,
+                    'priority': search.get('priority', 3),
+                    'runs': runs,
+                    'new_jobs': new_jobs,
+                    'yield_per_day': round(rate * 24, 2),
+                    'base_interval_minutes': round(base_interval / 60, 1),
+                    'interval': interval,
+                    'last_run': last_run
+                })
+        
+        self._apply_budget(combinations)
+        for combination in combinations:
+            interval = combination.pop('interval')
+            last_run = combination['last_run']
+            combination['interval_minutes'] = round(interval / 60, 1)
+            combination['browser_minutes_per_day'] = round(self._daily_cost(combination['site'], interval), 2)
+            combination['next_run'] = last_run + timedelta(seconds=interval) if last_run else now
+            combination['overdue'] = (now - combination['next_run']).total_seconds() / interval
+        return combinations
+    
+    def get_schedule(self, searches: List[Dict]) -> Dict:
+        """Plano aprendido para a API, ordenado pela próxima execução"""
+        combinations = sorted(self.plan(searches), key=lambda c: c['next_run'])
+        planned = sum(c['browser_minutes_per_day'] for c in combinations)
+        for combination in combinations:
+            del combination['overdue']
+        return {
+            'enabled': self.enabled,
+            'budget_minutes_per_day': self.budget_minutes,
+            'planned_minutes_per_day': round(planned, 1),
+            'over_budget': planned > self.budget_minutes + 0.5,
+            'last_tick_at': self.last_tick_at,
+            'in_flight': len(self._in_flight),
+            'combinations': combinations
+        }
+    
+    async def tick(self, searches: List[Dict]):
+        """Despacha as combinações vencidas, sem esperar o lote terminar"""
+        self.last_tick_at = datetime.utcnow()
+        combinations = await asyncio.to_thread(self.plan, searches)
+        due = [c for c in combinations
+               if c['overdue'] >= 0 and (c['keyword'], c['region'], c['site']) not in self._in_flight]
+        if not due:
+            return
+        
+        # Limite por tick: dobro da fatia do orçamento (ao habilitar, tudo vence de uma vez)
+        share = self.budget_minutes * self.tick_seconds / 86400
+        limit = max(self.service.max_sessions, math.ceil(2 * share * 60 / DEFAULT_SITE_DURATION))
+        due.sort(key=lambda c: (c['overdue'], c['priority']), reverse=True)
+        due = due[:limit]
+        
+        keys = {(c['keyword'], c['region'], c['site']) for c in due}
+        self._in_flight |= keys
+        task = asyncio.create_task(self._dispatch(due, keys))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _dispatch(self, due: List[Dict], keys: set):
+        try:
+            await self.service.dispatch([{
+                'keyword': c['keyword'],
+                'region': c['region'],
+                'sites': [c['site']],
+                'priority': c['priority']
+            } for c in due])
+        except Exception as e:
+            logger.error(f"Erro no despacho adaptativo: {e}")
+        finally:
+            self._in_flight -= keys
+    
+    def _daily_cost(self, site: str, interval: float) -> float:
+        """Minutos de navegador por dia de uma combinação"""
+        return self.service.expected_duration(site) / 60 * 86400 / interval
+    
+    def _apply_budget(self, combinations: List[Dict]):
+        """Espaça primeiro quem rende menos por minuto de navegador até caber no orçamento
+        
+        Cada intervalo passa a ser no mínimo `limiar / densidade` (densidade =
+        vagas por minuto de navegador); o limiar é achado por bisseção, então
+        combinações de mesmo rendimento são espaçadas por igual.
+        """
+        def stretched(threshold: float) -> List[float]:
+            return [min(self.max_interval, max(c['interval'], threshold / density))
+                    for c, density in zip(combinations, densities)]
+        
+        def total_cost(intervals: List[float]) -> float:
+            return sum(self._daily_cost(c['site'], interval) for c, interval in zip(combinations, intervals))
+        
+        if total_cost([c['interval'] for c in combinations]) <= self.budget_minutes:
+            return
+        
+        densities = [c['yield_per_day'] / self.service.expected_duration(c['site']) for c in combinations]
+        low, high = 0.0, self.max_interval * max(densities)
+        if total_cost(stretched(high)) > self.budget_minutes:
+            logger.warning(f"Orçamento de {self.budget_minutes:.0f} min/dia insuficiente mesmo no intervalo máximo")
+        else:
+            for _ in range(40):
+                middle = (low + high) / 2
+                if total_cost(stretched(middle)) > self.budget_minutes:
+                    low = middle
+                else:
+                    high = middle
+        
+        for combination, interval in zip(combinations, stretched(high)):
+            combination['interval'] = interval
+    
+    def _load_history(self) -> Dict[Tuple, Tuple]:
+        """(execuções concluídas, vagas novas, primeira, última) por combinação na janela de observação"""
+        since = datetime.utcnow() - timedelta(days=self.lookback_days)
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                ScrapingRun.keyword,
+                ScrapingRun.region,
+                ScrapingRun.source,
+                func.count(ScrapingRun.id),
+                func.coalesce(func.sum(ScrapingRun.jobs_found), 0),
+                func.min(ScrapingRun.created_at),
+                func.max(ScrapingRun.created_at)
+            ).filter(
+                ScrapingRun.created_at >= since,
+                ScrapingRun.status == "completed"  # falha ou em andamento não é rendimento zero
+            ).group_by(
+                ScrapingRun.keyword, ScrapingRun.region, ScrapingRun.source
+            ).all()
+        finally:
+            db.close()
+        return {(keyword, region, source): (runs, new_jobs, first_run, last_run)
+                for keyword, region, source, runs, new_jobs, first_run, last_run in rows}
+
+# Instância global
+adaptive_scheduler = AdaptiveScheduler()
+
+# Função referenciada textualmente pelo job store
+
+async def run_adaptive_tick(searches: List[Dict]):
+    await adaptive_scheduler.tick(searches)
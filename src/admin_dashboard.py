@@ -1,16 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from .database import get_db, ScrapingRun, ScrapedJob
-from .scheduler_manager import SchedulerManager
-from .ai_filter import AIJobFilter
+from .components import Components, get_components
+from .cache import job_cache, feature_cache
+from .telegram_queue import telegram_queue
+from .notification_digest import notification_digest
+from .tracing import slowest_phases
+from .profiling import profiler
 from datetime import datetime, timedelta
+import asyncio
 import json
 
+# Leitura (analytics, arquivo, traces, perfis, saúde): sempre montadas pela API
 router = APIRouter(prefix="/admin", tags=["admin"])
-scheduler = SchedulerManager()
-ai_filter = AIJobFilter()
+# Ações que alteram estado (agendamentos, blacklist, profiler, arquivo): só com ADMIN_ACTIONS_ENABLED=true
+actions_router = APIRouter(prefix="/admin", tags=["admin"])
 
 class ScheduleJobRequest(BaseModel):
     keywords: List[str]
@@ -21,11 +29,15 @@ class ScheduleJobRequest(BaseModel):
 class BlacklistRequest(BaseModel):
     terms: List[str]
 
-@router.post("/schedule-job")
-async def schedule_recurring_job(request: ScheduleJobRequest):
+class ProfilingRequest(BaseModel):
+    sample_rate: Optional[float] = None  # fração de execuções/requisições perfiladas
+    next: Optional[int] = None  # perfila as próximas N execuções/requisições
+
+@actions_router.post("/schedule-job")
+async def schedule_recurring_job(request: ScheduleJobRequest, components: Components = Depends(get_components)):
     """Agendar scraping recorrente"""
     try:
-        job_id = scheduler.add_recurring_job(
+        job_id = components.scheduler_manager.add_recurring_job(
             keywords=request.keywords,
             schedule=request.schedule,
             sites=request.sites
@@ -35,60 +47,68 @@ async def schedule_recurring_job(request: ScheduleJobRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/scheduled-jobs")
-async def get_scheduled_jobs():
+async def get_scheduled_jobs(components: Components = Depends(get_components)):
     """Listar jobs agendados"""
-    return scheduler.get_active_jobs()
+    return components.scheduler_manager.get_active_jobs()
 
-@router.delete("/scheduled-jobs/{job_id}")
-async def remove_scheduled_job(job_id: str):
+@actions_router.delete("/scheduled-jobs/{job_id}")
+async def remove_scheduled_job(job_id: str, components: Components = Depends(get_components)):
     """Remover job agendado"""
-    success = scheduler.remove_job(job_id)
+    success = components.scheduler_manager.remove_job(job_id)
     if success:
         return {"status": "removed"}
     raise HTTPException(status_code=404, detail="Job not found")
 
-@router.post("/blacklist")
-async def add_to_blacklist(request: BlacklistRequest):
+@actions_router.post("/blacklist")
+async def add_to_blacklist(request: BlacklistRequest, components: Components = Depends(get_components)):
     """Adicionar termos à blacklist"""
-    for term in request.terms:
-        ai_filter.blacklist_companies.add(term.lower())
+    components.ai_filter.add_blacklist_terms(request.terms)
     return {"status": "added", "terms": request.terms}
 
 @router.get("/blacklist")
-async def get_blacklist():
+async def get_blacklist(components: Components = Depends(get_components)):
     """Ver blacklist atual"""
-    return {"blacklist": list(ai_filter.blacklist_companies)}
+    return {"blacklist": list(components.ai_filter.blacklist_companies)}
 
 @router.get("/analytics")
-async def get_analytics(db: Session = Depends(get_db)):
-    """Analytics avançadas para admin"""
+async def get_analytics(db: Session = Depends(get_db), components: Components = Depends(get_components)):
+    """Analytics avançadas para admin
     
+    Vêm do arquivo Parquet (atualizado a cada ARCHIVE_INTERVAL_MINUTES); o
+    banco só é consultado enquanto o arquivo ainda está vazio.
+    """
+    if await asyncio.to_thread(components.analytics.available):
+        result = await asyncio.to_thread(components.analytics.overview)
+        return {**result, "data_source": "archive", "archived_until": components.archive.archived_until()}
+    return {**_live_analytics(db), "data_source": "database"}
+
+def _live_analytics(db: Session) -> Dict:
     # Estatísticas dos últimos 30 dias
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
     
     # Jobs por site
-    jobs_by_source = db.query(ScrapedJob.source, db.func.count(ScrapedJob.id)).filter(
+    jobs_by_source = db.query(ScrapedJob.source, func.count(ScrapedJob.id)).filter(
         ScrapedJob.scraped_at >= thirty_days_ago
     ).group_by(ScrapedJob.source).all()
     
     # Jobs por dia (últimos 7 dias)
     seven_days_ago = datetime.utcnow() - timedelta(days=7)
     jobs_by_day = db.query(
-        db.func.date(ScrapedJob.scraped_at).label('date'),
-        db.func.count(ScrapedJob.id).label('count')
+        func.date(ScrapedJob.scraped_at).label('date'),
+        func.count(ScrapedJob.id).label('count')
     ).filter(
         ScrapedJob.scraped_at >= seven_days_ago
-    ).group_by(db.func.date(ScrapedJob.scraped_at)).all()
+    ).group_by(func.date(ScrapedJob.scraped_at)).all()
     
     # Palavras-chave mais buscadas
     popular_keywords = db.query(
         ScrapingRun.keyword,
-        db.func.count(ScrapingRun.id).label('searches'),
-        db.func.sum(ScrapingRun.jobs_found).label('total_jobs')
+        func.count(ScrapingRun.id).label('searches'),
+        func.sum(ScrapingRun.jobs_found).label('total_jobs')
     ).filter(
         ScrapingRun.created_at >= thirty_days_ago
     ).group_by(ScrapingRun.keyword).order_by(
-        db.func.count(ScrapingRun.id).desc()
+        func.count(ScrapingRun.id).desc()
     ).limit(10).all()
     
     # Taxa de sucesso
@@ -112,62 +132,96 @@ async def get_analytics(db: Session = Depends(get_db)):
         "successful_runs": successful_runs
     }
 
+@router.get("/analytics/keyword-trends")
+async def get_keyword_trends(keywords: Optional[str] = None, months: int = 12, period: str = "month", components: Components = Depends(get_components)):
+    """Buscas e vagas novas por palavra-chave ao longo do tempo (arquivo Parquet)"""
+    from .analytics import PERIOD_FORMATS
+    if period not in PERIOD_FORMATS:
+        raise HTTPException(status_code=400, detail=f"period deve ser um de {list(PERIOD_FORMATS)}")
+    selected = [kw.strip() for kw in keywords.split(',') if kw.strip()] if keywords else None
+    trends = await asyncio.to_thread(components.analytics.keyword_trends, selected, months, period)
+    return {"period": period, "months": months, "trends": trends}
+
+@router.get("/analytics/source-share")
+async def get_source_share(months: int = 12, period: str = "month", components: Components = Depends(get_components)):
+    """Participação de cada fonte nas vagas coletadas por período (arquivo Parquet)"""
+    from .analytics import PERIOD_FORMATS
+    if period not in PERIOD_FORMATS:
+        raise HTTPException(status_code=400, detail=f"period deve ser um de {list(PERIOD_FORMATS)}")
+    share = await asyncio.to_thread(components.analytics.source_share, months, period)
+    return {"period": period, "months": months, "share": share}
+
+@router.get("/slow-phases")
+async def get_slow_phases(hours: int = 24, limit: int = 10):
+    """Fases mais lentas (p95 por site e fase) nos traces das execuções recentes"""
+    return await asyncio.to_thread(slowest_phases, hours, limit)
+
+@router.get("/profiling")
+async def get_profiling():
+    """Configuração do profiler e perfis gravados (mais recentes primeiro)"""
+    return {"config": profiler.get_stats(), "profiles": await asyncio.to_thread(profiler.list_profiles)}
+
+@actions_router.post("/profiling")
+async def configure_profiling(request: ProfilingRequest):
+    """Liga/desliga o profiler neste processo (sample_rate) ou arma as próximas N"""
+    if request.sample_rate is not None and not 0 <= request.sample_rate <= 1:
+        raise HTTPException(status_code=400, detail="sample_rate deve estar entre 0 e 1")
+    return profiler.configure(request.sample_rate, request.next)
+
+@router.get("/profiling/{name}")
+async def download_profile(name: str):
+    """Arquivo de pilhas dobradas, pronto para flamegraph.pl ou speedscope"""
+    path = profiler.get_profile_path(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return FileResponse(path, media_type="text/plain", filename=name)
+
+@router.get("/archive")
+async def get_archive_status(components: Components = Depends(get_components)):
+    """Estado do arquivo Parquet"""
+    return await asyncio.to_thread(components.archive.get_stats)
+
+@actions_router.post("/archive/run")
+async def run_archive_now(components: Components = Depends(get_components)):
+    """Roda uma passada do arquivo agora"""
+    return await asyncio.to_thread(components.archive.run)
+
 @router.get("/quality-report")
-async def get_quality_report(db: Session = Depends(get_db)):
+async def get_quality_report(db: Session = Depends(get_db), components: Components = Depends(get_components)):
     """Relatório de qualidade das vagas"""
     
-    # Últimas 100 vagas para análise
-    recent_jobs = db.query(ScrapedJob).order_by(
-        ScrapedJob.scraped_at.desc()
-    ).limit(100).all()
-    
-    # Simular scores de qualidade
-    quality_scores = []
-    for job in recent_jobs:
-        score = ai_filter._calculate_quality_score({
-            'title': job.title,
-            'company': '',
-            'description': ''
-        })
-        quality_scores.append({
-            'job_id': job.id,
-            'title': job.title,
-            'source': job.source,
-            'quality_score': score,
-            'scraped_at': job.scraped_at
-        })
+    # Últimas 100 vagas para análise (do arquivo, se já houver)
+    if await asyncio.to_thread(components.analytics.available):
+        recent_jobs = await asyncio.to_thread(components.analytics.recent_jobs, 100)
+        titles = [job['title'] for job in recent_jobs]
+    else:
+        titles = [title for title, in db.query(ScrapedJob.title).order_by(
+            ScrapedJob.scraped_at.desc()
+        ).limit(100).all()]
     
-    # Estatísticas de qualidade
-    scores = [q['quality_score'] for q in quality_scores]
-    avg_score = sum(scores) / len(scores) if scores else 0
-    high_quality = len([s for s in scores if s >= 5])
-    low_quality = len([s for s in scores if s <= 2])
-    
-    return {
-        "average_quality_score": round(avg_score, 2),
-        "high_quality_jobs": high_quality,
-        "low_quality_jobs": low_quality,
-        "total_analyzed": len(quality_scores),
-        "quality_distribution": {
-            "excellent": len([s for s in scores if s >= 8]),
-            "good": len([s for s in scores if 5 <= s < 8]),
-            "average": len([s for s in scores if 3 <= s < 5]),
-            "poor": len([s for s in scores if s < 3])
-        }
-    }
+    # Scores de qualidade (memoizados por conteúdo da vaga); o NumPy vem com o AIJobFilter
+    return components.ai_filter.quality_report([{'title': title} for title in titles])
 
-@router.post("/preset-schedules")
-async def setup_preset_schedules():
+@actions_router.post("/preset-schedules")
+async def setup_preset_schedules(components: Components = Depends(get_components)):
     """Configurar agendamentos pré-definidos para ONGs"""
-    scheduler.add_preset_schedules()
+    components.scheduler_manager.add_preset_schedules()
     return {"status": "preset schedules added"}
 
 @router.get("/system-health")
-async def get_system_health():
+async def get_system_health(components: Components = Depends(get_components)):
     """Status de saúde do sistema"""
     return {
-        "scheduler_running": scheduler.scheduler.running,
-        "active_jobs": len(scheduler.get_active_jobs()),
-        "cache_stats": ai_filter.blacklist_companies.__len__(),
+        "scheduler_running": components.scheduler_manager.scheduler.running,
+        "active_jobs": len(components.scheduler_manager.get_active_jobs()),
+        "cache_stats": {
+            **job_cache.get_cache_stats(),
+            "blacklist_companies": len(components.ai_filter.blacklist_companies),
+            "feature_cache": feature_cache.get_stats()
+        },
+        "telegram_queue": telegram_queue.get_stats(),
+        "notification_digest": notification_digest.get_stats(),
+        "archive": components.archive.get_stats(),
+        "components": components.created(),
         "timestamp": datetime.utcnow()
     }
\ No newline at end of file
@@ -1,12 +1,39 @@
 import re
-from typing import List, Dict
+import hashlib
+import itertools
+import operator
+from typing import List, Dict, Sequence, Union
 from loguru import logger
+import numpy as np
+from .cache import feature_cache
+
+# Padrões de salário pré-compilados (ordem de prioridade, multiplicador, literal obrigatório)
+SALARY_PATTERNS = [
+    (re.compile(r'r\$\s*(\d+\.?\d*)'), 1, 'r$'),
+    (re.compile(r'(\d+)k'), 1000, 'k'),
+    (re.compile(r'salário.*?(\d+\.?\d*)'), 1, 'salário'),
+    (re.compile(r'até.*?(\d+\.?\d*)'), 1, 'até')
+]
+
+# Códigos das features categóricas
+SENIORITY_LEVELS = ['junior', 'pleno', 'senior', 'especialista']  # código = índice + 1 (0 = não informado)
+WORK_MODES = ['presencial', 'hibrido', 'remoto']  # código = índice
+
+# Classificações usadas pelo portal (código = índice)
+PORTAL_WORK_TYPES = ['ON_SITE', 'HYBRID', 'REMOTE']
+PORTAL_CONTRACT_TYPES = ['CLT', 'INTERNSHIP', 'FREELANCE']
+PORTAL_SENIORITY_LEVELS = ['MID_LEVEL', 'JUNIOR', 'SENIOR']
+
+QUALITY_WEIGHTS = {'high': 3, 'medium': 2, 'low': -1}
+KNOWN_COMPANY_BONUS = 5
+
+JobBatch = Union[List[Dict], Dict[str, Sequence[str]]]
 
 class AIJobFilter:
     def __init__(self):
         self.salary_patterns = {
             'junior': (2000, 4000),
-            'pleno': (4000, 8000), 
+            'pleno': (4000, 8000),
             'senior': (8000, 15000),
             'especialista': (10000, 20000)
         }
@@ -21,21 +48,218 @@ class AIJobFilter:
             'medium': ['hibrido', 'flexivel', 'convenio'],
             'low': ['presencial obrigatorio', 'sem beneficios']
         }
+        
+        self.known_companies = ['google', 'microsoft', 'amazon', 'nubank', 'stone', 'ifood']
     
     def filter_jobs(self, jobs: List[Dict], filters: Dict = None) -> List[Dict]:
         """Filtra vagas usando IA básica"""
-        if not filters:
+        if not filters or not jobs:
             return jobs
-            
+        
+        # Predicados baratos (localização, título) antes de extrair features completas
+        columns = self._to_columns(jobs)
+        candidates = np.flatnonzero(self._column_mask(columns, filters))
+        
+        if len(candidates) <= feature_cache.max_size:
+            records = self.derive_features([jobs[i] for i in candidates])
+            scores = np.fromiter(map(operator.itemgetter('quality_score'), records), dtype=np.int64, count=len(records))
+            salary = np.fromiter(map(operator.itemgetter('salary'), records), dtype=np.int64, count=len(records))
+            blacklisted = np.fromiter(map(operator.itemgetter('blacklisted'), records), dtype=bool, count=len(records))
+        else:
+            # Lotes maiores que o cache só causariam thrashing: calcula direto
+            features = self.extract_features({field: [values[i] for i in candidates] for field, values in columns.items()})
+            scores, salary, blacklisted = features['quality_score'], features['salary'], features['blacklisted']
+        
+        mask = ~blacklisted & self._salary_mask(salary, filters)
+        
+        # Ordenar por qualidade (estável, como sorted(reverse=True))
+        passing = np.flatnonzero(mask)
+        order = passing[np.argsort(-scores[passing], kind='stable')]
+        
         filtered = []
+        for index in order:
+            job = jobs[candidates[index]]
+            job['quality_score'] = int(scores[index])
+            filtered.append(job)
+        
+        return filtered
+    
+    def derive_features(self, jobs: List[Dict]) -> List[Dict]:
+        """Registro completo de features por vaga, memoizado pelo hash do conteúdo"""
+        return feature_cache.get_many(jobs, self.rules_version(), self._compute_records)
+    
+    def quality_report(self, jobs: List[Dict]) -> Dict:
+        """Média e distribuição dos scores de qualidade de um lote de vagas"""
+        records = self.derive_features(jobs)
+        scores = np.array([record['quality_score'] for record in records], dtype=float)
+        return {
+            "average_quality_score": round(float(scores.mean()), 2) if scores.size else 0,
+            "high_quality_jobs": int((scores >= 5).sum()),
+            "low_quality_jobs": int((scores <= 2).sum()),
+            "total_analyzed": int(scores.size),
+            "quality_distribution": {
+                "excellent": int((scores >= 8).sum()),
+                "good": int(((scores >= 5) & (scores < 8)).sum()),
+                "average": int(((scores >= 3) & (scores < 5)).sum()),
+                "poor": int((scores < 3).sum())
+            }
+        }
+    
+    def rules_version(self) -> str:
+        """Versão das regras de scoring/classificação (muda quando blacklist ou palavras-chave mudam)"""
+        rules = repr((
+            sorted(self.blacklist_companies),
+            sorted((quality, tuple(keywords)) for quality, keywords in self.quality_keywords.items()),
+            sorted(self.salary_patterns.items()),
+            tuple(self.known_companies)
+        ))
+        return hashlib.blake2b(rules.encode(), digest_size=8).hexdigest()
+    
+    def add_blacklist_terms(self, terms: List[str]):
+        """Adiciona termos à blacklist de empresas e invalida features em cache"""
+        self.blacklist_companies.update(term.lower() for term in terms)
+        feature_cache.invalidate()
+    
+    def extract_features(self, jobs: JobBatch) -> Dict[str, np.ndarray]:
+        """Extrai features de um lote de vagas (lista de dicts ou colunas) em arrays NumPy
+        
+        Cada coluna é codificada por dicionário: os padrões rodam uma vez por
+        valor distinto e o resultado é expandido para as linhas por indexação.
+        """
+        columns = self._to_columns(jobs)
+        text_codes, text_values = self._factorize(zip(columns['title'], columns['description']))
+        company_codes, company_values = self._factorize(columns['company'])
+        title_codes, title_values = self._factorize(columns['title'])
+        location_codes, location_values = self._factorize(columns['location'])
+        
+        texts = [f"{title} {description}".lower() for title, description in text_values]
+        companies = [company.lower() for company in company_values]
+        
+        # Senioridade: primeiro nível presente no texto
+        level_matrix = np.stack([self._contains(texts, level) for level in SENIORITY_LEVELS]) \
+            if texts else np.zeros((len(SENIORITY_LEVELS), 0), dtype=bool)
+        has_level = level_matrix.any(axis=0)
+        seniority = np.where(has_level, level_matrix.argmax(axis=0) + 1, 0).astype(np.int8)
+        
+        # Modalidade de trabalho
+        remote = self._contains(texts, 'remoto') | self._contains(texts, 'home office')
+        hybrid = self._contains(texts, 'hibrido')
+        work_mode = np.where(remote, 2, np.where(hybrid, 1, 0)).astype(np.int8)
+        
+        # Pontos por palavras-chave de qualidade
+        text_score = np.zeros(len(texts), dtype=np.int64)
+        for quality, keywords in self.quality_keywords.items():
+            weight = QUALITY_WEIGHTS.get(quality, -1)
+            for keyword in keywords:
+                text_score += weight * self._contains(texts, keyword)
         
-        for job in jobs:
-            if self._passes_filters(job, filters):
-                job['quality_score'] = self._calculate_quality_score(job)
-                filtered.append(job)
+        # Bonus por empresa conhecida
+        company_bonus = KNOWN_COMPANY_BONUS * self._contains_any(companies, self.known_companies)
+        score = np.maximum(text_score[text_codes] + company_bonus[company_codes], 0)
         
-        # Ordenar por qualidade
-        return sorted(filtered, key=lambda x: x.get('quality_score', 0), reverse=True)
+        return {
+            'salary': self._extract_salaries(texts, seniority)[text_codes],
+            'seniority': seniority[text_codes],
+            'work_mode': work_mode[text_codes],
+            'quality_score': score,
+            'blacklisted': self._contains_any(companies, self.blacklist_companies)[company_codes],
+            'title_codes': title_codes,
+            'title_values': [title.lower() for title in title_values],
+            'location_codes': location_codes,
+            'location_values': [location.lower() for location in location_values]
+        }
+    
+    def score_jobs(self, jobs: JobBatch) -> np.ndarray:
+        """Calcula scores de qualidade de um lote de vagas"""
+        return self.extract_features(jobs)['quality_score']
+    
+    def filter_mask(self, features: Dict[str, np.ndarray], filters: Dict) -> np.ndarray:
+        """Máscara booleana das vagas que passam nos filtros"""
+        mask = ~features['blacklisted'] & self._salary_mask(features['salary'], filters)
+        return mask & self._column_mask(features, filters)
+    
+    def extract_portal_features(self, jobs: JobBatch) -> Dict[str, np.ndarray]:
+        """Classificações do portal (modalidade, contrato, senioridade) em lote"""
+        columns = self._to_columns(jobs)
+        title_codes, title_values = self._factorize(columns['title'])
+        pair_codes, pair_values = self._factorize(zip(columns['title'], columns['location']))
+        titles = [title.lower() for title in title_values]
+        title_locations = [f"{title} {location}".lower() for title, location in pair_values]
+        
+        remote = self._contains_any(title_locations, ['remoto', 'home office'])
+        hybrid = self._contains(title_locations, 'hibrido')
+        work_type = np.where(remote, 2, np.where(hybrid, 1, 0)).astype(np.int8)
+        
+        internship = self._contains(titles, 'estagio')
+        freelance = self._contains_any(titles, ['freelancer', 'autonomo'])
+        contract_type = np.where(internship, 1, np.where(freelance, 2, 0)).astype(np.int8)
+        
+        junior = self._contains_any(titles, ['junior', 'jr', 'estagio'])
+        senior = self._contains_any(titles, ['senior', 'sr'])
+        seniority_level = np.where(junior, 1, np.where(senior, 2, 0)).astype(np.int8)
+        
+        return {
+            'work_type': work_type[pair_codes],
+            'contract_type': contract_type[title_codes],
+            'seniority_level': seniority_level[title_codes]
+        }
+    
+    def _compute_records(self, jobs: List[Dict]) -> List[Dict]:
+        """Calcula em lote os registros de features das vagas fora do cache"""
+        features = self.extract_features(jobs)
+        portal = self.extract_portal_features(jobs)
+        seniority_names = [None] + SENIORITY_LEVELS
+        
+        return [{
+            'quality_score': score,
+            'salary': salary,
+            'seniority': seniority_names[seniority],
+            'work_mode': WORK_MODES[work_mode],
+            'blacklisted': blacklisted,
+            'work_type': PORTAL_WORK_TYPES[work_type],
+            'contract_type': PORTAL_CONTRACT_TYPES[contract_type],
+            'seniority_level': PORTAL_SENIORITY_LEVELS[seniority_level]
+        } for score, salary, seniority, work_mode, blacklisted, work_type, contract_type, seniority_level in zip(
+            features['quality_score'].tolist(),
+            features['salary'].tolist(),
+            features['seniority'].tolist(),
+            features['work_mode'].tolist(),
+            features['blacklisted'].tolist(),
+            portal['work_type'].tolist(),
+            portal['contract_type'].tolist(),
+            portal['seniority_level'].tolist()
+        )]
+    
+    def _salary_mask(self, salary: np.ndarray, filters: Dict) -> np.ndarray:
+        """Filtro de salário: descarta vagas com salário conhecido abaixo do mínimo"""
+        if not filters.get('min_salary'):
+            return np.ones(len(salary), dtype=bool)
+        return ~((salary > 0) & (salary < int(filters['min_salary'])))
+    
+    def _column_mask(self, columns: Dict, filters: Dict) -> np.ndarray:
+        """Filtros de localização e senioridade (só dependem de colunas curtas)"""
+        mask = np.ones(len(columns['title_codes'] if 'title_codes' in columns else columns['title']), dtype=bool)
+        
+        # Filtro de localização
+        if filters.get('location'):
+            location_filter = filters['location'].lower()
+            if location_filter != 'remoto':
+                mask &= self._column_contains(columns, 'location', location_filter)
+        
+        # Filtro de senioridade
+        if filters.get('seniority'):
+            mask &= self._column_contains(columns, 'title', filters['seniority'].lower())
+        
+        return mask
+    
+    def _column_contains(self, columns: Dict, field: str, term: str) -> np.ndarray:
+        """Presença do termo por linha, aceitando colunas brutas ou já codificadas"""
+        if f'{field}_codes' in columns:
+            codes, values = columns[f'{field}_codes'], columns[f'{field}_values']
+        else:
+            codes, values = self._factorize(columns[field])
+            values = [value.lower() for value in values]
+        return self._contains(values, term)[codes]
     
     def _passes_filters(self, job: Dict, filters: Dict) -> bool:
         """Verifica se vaga passa nos filtros"""
@@ -63,36 +287,49 @@ class AIJobFilter:
         company = job.get('company', '').lower()
         if any(blocked in company for blocked in self.blacklist_companies):
             return False
-            
+        
         return True
     
     def _extract_salary(self, text: str) -> int:
         """Extrai salário do texto"""
         text = text.lower()
         
-        # Padrões de salário
-        patterns = [
-            r'r\$\s*(\d+\.?\d*)',
-            r'(\d+)k',
-            r'salário.*?(\d+\.?\d*)',
-            r'até.*?(\d+\.?\d*)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
+        for pattern, multiplier, _ in SALARY_PATTERNS:
+            match = pattern.search(text)
             if match:
-                value = float(match.group(1).replace('.', ''))
-                if 'k' in pattern:
-                    value *= 1000
-                return int(value)
+                return int(float(match.group(1).replace('.', '')) * multiplier)
         
         # Inferir por senioridade
         for level, (min_sal, max_sal) in self.salary_patterns.items():
             if level in text:
                 return min_sal
-                
+        
         return 0
     
+    def _extract_salaries(self, texts: List[str], seniority: np.ndarray) -> np.ndarray:
+        """Extrai salários de um lote de textos já normalizados"""
+        salary = np.zeros(len(texts), dtype=np.int64)
+        unresolved = np.ones(len(texts), dtype=bool)
+        
+        for pattern, multiplier, anchor in SALARY_PATTERNS:
+            # O regex só roda nos textos que contêm o literal obrigatório do padrão
+            candidates = np.flatnonzero(unresolved & self._contains(texts, anchor)).tolist()
+            if not candidates:
+                continue
+            matches = list(map(pattern.search, [texts[i] for i in candidates]))
+            found = np.fromiter(map(operator.is_not, matches, itertools.repeat(None)), dtype=bool, count=len(matches))
+            rows = np.asarray(candidates, dtype=np.intp)[found]
+            salary[rows] = [
+                int(float(match.group(1).replace('.', '')) * multiplier)
+                for match in itertools.compress(matches, found)
+            ]
+            unresolved[rows] = False
+        
+        # Inferir por senioridade
+        level_min = np.array([0] + [self.salary_patterns[level][0] for level in SENIORITY_LEVELS], dtype=np.int64)
+        salary[unresolved] = level_min[seniority[unresolved]]
+        return salary
+    
     def _calculate_quality_score(self, job: Dict) -> int:
         """Calcula score de qualidade da vaga"""
         score = 0
@@ -102,17 +339,46 @@ class AIJobFilter:
         for quality, keywords in self.quality_keywords.items():
             for keyword in keywords:
                 if keyword in text:
-                    if quality == 'high':
-                        score += 3
-                    elif quality == 'medium':
-                        score += 2
-                    else:
-                        score -= 1
+                    score += QUALITY_WEIGHTS.get(quality, -1)
         
         # Bonus por empresa conhecida
         company = job.get('company', '').lower()
-        known_companies = ['google', 'microsoft', 'amazon', 'nubank', 'stone', 'ifood']
-        if any(comp in company for comp in known_companies):
-            score += 5
-            
-        return max(0, score)
\ No newline at end of file
+        if any(comp in company for comp in self.known_companies):
+            score += KNOWN_COMPANY_BONUS
+        
+        return max(0, score)
+    
+    def _to_columns(self, jobs: JobBatch) -> Dict[str, List[str]]:
+        """Normaliza lote (lista de dicts ou colunas) para colunas de texto"""
+        fields = ('title', 'description', 'company', 'location')
+        
+        if isinstance(jobs, dict):
+            count = len(jobs['title'])
+            return {
+                field: [value or '' for value in jobs[field]] if field in jobs else [''] * count
+                for field in fields
+            }
+        
+        return {field: [job.get(field) or '' for job in jobs] for field in fields}
+    
+    def _factorize(self, values) -> tuple:
+        """Codificação por dicionário: (códigos por linha, valores distintos)"""
+        values = list(values)
+        uniques = list(dict.fromkeys(values))
+        lookup = {value: code for code, value in enumerate(uniques)}
+        codes = np.fromiter(map(lookup.__getitem__, values), dtype=np.intp, count=len(values))
+        return codes, uniques
+    
+    def _contains(self, texts: List[str], term: str) -> np.ndarray:
+        """Presença de um termo em cada texto (laço em C via map)"""
+        return np.fromiter(
+            map(operator.contains, texts, itertools.repeat(term)),
+            dtype=bool,
+            count=len(texts)
+        )
+    
+    def _contains_any(self, texts: List[str], terms) -> np.ndarray:
+        mask = np.zeros(len(texts), dtype=bool)
+        for term in terms:
+            mask |= self._contains(texts, term)
+        return mask
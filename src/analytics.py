@@ -0,0 +1,135 @@
+from .archive import parquet_archive, ParquetArchive
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+# período -> formato do rótulo (semana ISO: 2025-W34)
+PERIOD_FORMATS = {'day': '%Y-%m-%d', 'week': '%G-W%V', 'month': '%Y-%m'}
+
+class ArchiveAnalytics:
+    """Consultas analíticas sobre o arquivo Parquet, sem tocar no banco
+    
+    Lê só as colunas e as partições de data necessárias e agrega com os
+    kernels do Arrow (group_by/compute), o que permite horizontes longos
+    (tendências de 12 meses) sem carregar objetos ORM.
+    """
+    
+    def __init__(self, archive: ParquetArchive = None):
+        self.archive = archive or parquet_archive
+    
+    def available(self) -> bool:
+        return self.archive.dataset('jobs') is not None
+    
+    def overview(self, days: int = 30, daily_days: int = 7) -> Dict:
+        """Mesmo formato de /admin/analytics, a partir do arquivo"""
+        since = datetime.utcnow() - timedelta(days=days)
+        jobs = self._table('jobs', ['source', 'date'], 'scraped_at', since)
+        runs = self._table('runs', ['keyword', 'status', 'jobs_found'], 'created_at', since)
+        
+        by_source = jobs.group_by('source').aggregate([([], 'count_all')])
+        
+        daily_since = (datetime.utcnow() - timedelta(days=daily_days)).strftime('%Y-%m-%d')
+        recent = jobs.filter(pc.greater_equal(jobs['date'], daily_since))
+        by_day = recent.group_by('date').aggregate([([], 'count_all')]).sort_by('date')
+        
+        keywords = runs.group_by('keyword').aggregate([([], 'count_all'), ('jobs_found', 'sum')]).sort_by(
+            [('count_all', 'descending'), ('keyword', 'ascending')]
+        ).slice(0, 10)
+        
+        total_runs = runs.num_rows
+        successful_runs = pc.sum(pc.equal(runs['status'], 'completed')).as_py() or 0
+        
+        return {
+            "jobs_by_source": dict(zip(by_source['source'].to_pylist(), by_source['count_all'].to_pylist())),
+            "jobs_by_day": [
+                {"date": date, "count": count}
+                for date, count in zip(by_day['date'].to_pylist(), by_day['count_all'].to_pylist())
+            ],
+            "popular_keywords": [
+                {"keyword": kw, "searches": searches, "total_jobs": total_jobs}
+                for kw, searches, total_jobs in zip(keywords['keyword'].to_pylist(),
+                                                    keywords['count_all'].to_pylist(),
+                                                    keywords['jobs_found_sum'].to_pylist())
+            ],
+            "success_rate": round(successful_runs / total_runs * 100, 2) if total_runs else 0,
+            "total_runs": total_runs,
+            "successful_runs": successful_runs
+        }
+    
+    def recent_jobs(self, limit: int = 100, lookback_days: int = 7) -> List[Dict]:
+        """Vagas mais recentes do arquivo
+        
+        Começa pelas partições da última semana e quadruplica a janela (7, 28,
+        112... dias) até juntar `limit` vagas ou alcançar a partição mais
+        antiga, em vez de ler o dataset inteiro.
+        """
+        oldest = self.archive.oldest_date('jobs')
+        if oldest is None:
+            return []
+        
+        days = lookback_days
+        while True:
+            since = datetime.utcnow() - timedelta(days=days)
+            table = self._table('jobs', ['title', 'source', 'scraped_at'], 'scraped_at', since)
+            if table.num_rows >= limit or since.strftime('%Y-%m-%d') <= oldest:
+                break
+            days *= 4
+        return table.sort_by([('scraped_at', 'descending')]).slice(0, limit).to_pylist()
+    
+    def keyword_trends(self, keywords: List[str] = None, months: int = 12, period: str = 'month') -> List[Dict]:
+        """Buscas e vagas novas por palavra-chave e período"""
+        since = datetime.utcnow() - timedelta(days=30 * months)
+        runs = self._table('runs', ['keyword', 'jobs_found', 'created_at'], 'created_at', since)
+        if keywords:
+            runs = runs.filter(pc.is_in(runs['keyword'], value_set=pa.array(keywords)))
+        
+        runs = runs.append_column('period', pc.strftime(runs['created_at'], format=PERIOD_FORMATS[period]))
+        grouped = runs.group_by(['period', 'keyword']).aggregate([([], 'count_all'), ('jobs_found', 'sum')]).sort_by(
+            [('period', 'ascending'), ('jobs_found_sum', 'descending')]
+        )
+        return [
+            {"period": row['period'], "keyword": row['keyword'], "searches": row['count_all'],
+             "new_jobs": row['jobs_found_sum'] or 0}
+            for row in grouped.to_pylist()
+        ]
+    
+    def source_share(self, months: int = 12, period: str = 'month') -> List[Dict]:
+        """Vagas por fonte e período, com a participação de cada fonte no período"""
+        since = datetime.utcnow() - timedelta(days=30 * months)
+        jobs = self._table('jobs', ['source', 'scraped_at'], 'scraped_at', since)
+        jobs = jobs.append_column('period', pc.strftime(jobs['scraped_at'], format=PERIOD_FORMATS[period]))
+        
+        by_source = jobs.group_by(['period', 'source']).aggregate([([], 'count_all')])
+        totals = by_source.group_by('period').aggregate([('count_all', 'sum')])
+        joined = by_source.join(totals, 'period').sort_by([('period', 'ascending'), ('count_all', 'descending')])
+        share = pc.round(pc.multiply(pc.divide(pc.cast(joined['count_all'], pa.float64()),
+                                               pc.cast(joined['count_all_sum'], pa.float64())), 100), 2)
+        
+        return [
+            {"period": period_label, "source": source, "jobs": count, "share": pct}
+            for period_label, source, count, pct in zip(joined['period'].to_pylist(), joined['source'].to_pylist(),
+                                                        joined['count_all'].to_pylist(), share.to_pylist())
+        ]
+    
+    def _table(self, name: str, columns: List[str], timestamp_column: str = None,
+               since: Optional[datetime] = None) -> pa.Table:
+        """Colunas de um dataset; com `since`, poda as partições de data antes de ler"""
+        dataset = self.archive.dataset(name)
+        if dataset is None:
+            return self._schema(name, columns).empty_table()
+        
+        expression = None
+        if since:
+            expression = (ds.field('date') >= since.strftime('%Y-%m-%d')) & (
+                ds.field(timestamp_column) >= pa.scalar(since, type=pa.timestamp('us'))
+            )
+        return dataset.to_table(columns=columns, filter=expression)
+    
+    def _schema(self, name: str, columns: List[str]) -> pa.Schema:
+        schema = self.archive.schema(name)
+        return pa.schema([schema.field(column) for column in columns])
+
+# Instância global
+archive_analytics = ArchiveAnalytics()
@@ -1,27 +1,35 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse, Response
+from starlette.background import BackgroundTask
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from pydantic import BaseModel
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from .scraper import JobScraper
-from .telegram_bot import TelegramNotifier
 from .database import get_db, ScrapingRun, ScrapedJob, init_db
 from .web import add_web_routes
-from .smart_scheduler import SmartScheduler
-from .auto_search_manager import AutoSearchManager
-from .portal_integration import PortalIntegration
-from .approval_system import ApprovalSystem, PendingJob
+from .admin_dashboard import router as admin_router, actions_router as admin_actions_router
+from .components import Components, get_components
+from .work_queue import work_queue
+from .batch_checkpoint import batch_checkpoint
+# Modelos que os componentes (criados depois) definem: precisam estar no Base antes do init_db
+from .auto_search_manager import StoredSearchProfile
+from .portal_outbox import PortalOutboxEntry
+from .events import broadcaster
+from .scrape_jobs import scrape_job_runner, SUPPORTED_SITES
+from .tracing import load_trace
+from .profiling import profiler, PROFILE_HEADER
+from .metrics import HTTP_REQUEST_SECONDS, WORK_QUEUE_TASKS, WORK_QUEUE_OLDEST_SECONDS
+from contextlib import ExitStack
+from dataclasses import asdict
 from datetime import datetime
 from loguru import logger
+import asyncio
 import os
+import re
+import time
+import uuid
 
-app = FastAPI(title="Portal Vagas Scraper API", version="1.0.0")
-add_web_routes(app)
-
-# Inicializar componentes inteligentes
-smart_scheduler = SmartScheduler()
-search_manager = AutoSearchManager()
-portal_integration = PortalIntegration()
-approval_system = ApprovalSystem()
+router = APIRouter()
 
 class ScrapeRequest(BaseModel):
     sites: List[str] = ["infojobs"]
@@ -31,156 +39,262 @@ class ScrapeRequest(BaseModel):
 
 class ScrapeResponse(BaseModel):
     run_id: int
-    jobs_found: int
+    run_ids: List[int]
     status: str
+    status_url: str
+    events_url: str
+
+class SearchProfileUpdate(BaseModel):
+    keywords: Optional[List[str]] = None
+    regions: Optional[List[str]] = None
+    schedule: Optional[str] = None
+    priority: Optional[int] = None
+    active: Optional[bool] = None
+
+async def observe_request_latency(request: Request, call_next):
+    """Latência por rota (o template do path, não a URL, para não explodir as séries)"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get('route')
+        HTTP_REQUEST_SECONDS.labels(
+            request.method, route.path if route else 'unmatched', str(status)
+        ).observe(time.perf_counter() - started)
+
+# Rotas que o profiler não amostra por sorteio: scrape do Prometheus, health e streams SSE
+UNPROFILED_PATHS = ('/metrics', '/health')
+
+# X-Request-ID do cliente vira parte do nome do arquivo de perfil e volta num header
+REQUEST_ID_PATTERN = re.compile(r'[\w.-]{1,64}', re.ASCII)
 
-@app.on_event("startup")
-async def startup_event():
-    init_db()
-    smart_scheduler.start()  # Iniciar buscas automatizadas
-    logger.info("API started with automated searches")
-
-@app.post("/api/scrape", response_model=ScrapeResponse)
-async def scrape_jobs(request: ScrapeRequest, db: Session = Depends(get_db)):
-    scraper = JobScraper()
-    notifier = TelegramNotifier()
-    all_jobs = []
+async def profile_request(request: Request, call_next):
+    """Perfila a requisição com X-Profile: 1 (se PROFILE_ALLOW_HEADER) ou quando sorteada (PROFILE_SAMPLE_RATE)
     
-    for keyword in request.keywords:
-        # Create run record
-        run = ScrapingRun(
-            keyword=keyword,
-            source=",".join(request.sites),
-            status="running"
-        )
-        db.add(run)
-        db.commit()
-        db.refresh(run)
-        
+    O perfil vai até o fim do corpo da resposta, não só até `call_next`:
+    rotas com StreamingResponse (/export/*) geram o corpo depois. O arquivo
+    cobre o processo inteiro enquanto a requisição está aberta (todas as
+    threads ocupadas, com o nome da thread na raiz de cada pilha), inclusive
+    outras requisições e o pool de scraping sob demanda.
+    """
+    path = request.url.path
+    forced = profiler.requested(request.headers)
+    if not forced and (path in UNPROFILED_PATHS or path.endswith('/events')):
+        return await call_next(request)
+    
+    request_id = request.headers.get('X-Request-ID', '')
+    if not REQUEST_ID_PATTERN.fullmatch(request_id):
+        request_id = uuid.uuid4().hex[:12]
+    
+    stack = ExitStack()
+    profile = stack.enter_context(profiler.profile('request', request_id, force=forced, all_threads=True))
+    if profile is None:
+        stack.close()
+        return await call_next(request)
+    try:
+        response = await call_next(request)
+    except BaseException:
+        stack.close()
+        raise
+    
+    body = response.body_iterator
+    
+    async def profiled_body():
         try:
-            jobs = []
-            if "infojobs" in request.sites:
-                jobs.extend(scraper.scrape_infojobs(keyword, request.days_back))
-            
-            # Save jobs to database and approval system
-            new_jobs = []
-            for job in jobs:
-                existing = db.query(ScrapedJob).filter(ScrapedJob.link == job['link']).first()
-                if not existing:
-                    scraped_job = ScrapedJob(
-                        title=job['title'],
-                        link=job['link'],
-                        source=job['source']
-                    )
-                    db.add(scraped_job)
-                    new_jobs.append(job)
-            
-            db.commit()
-            
-            # Adicionar para sistema de aprovação
-            if new_jobs:
-                approval_result = approval_system.add_jobs_for_review(new_jobs, db)
-                logger.info(f"Aprovação: {approval_result}")
-            
-            all_jobs.extend(new_jobs)
-            
-            # Update run status
-            run.jobs_found = len(new_jobs)
-            run.status = "completed"
-            run.completed_at = datetime.utcnow()
-            db.commit()
-            
-            # Send to Telegram
-            if request.send_telegram and new_jobs:
-                notifier.send_jobs(new_jobs, keyword)
-                
-        except Exception as e:
-            run.status = "failed"
-            run.error_message = str(e)
-            run.completed_at = datetime.utcnow()
-            db.commit()
-            logger.error(f"Scraping failed: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
+            async for chunk in body:
+                yield chunk
+        finally:
+            stack.close()  # grava o perfil (só se houve amostras)
+    
+    response.body_iterator = profiled_body()
+    response.background = BackgroundTask(stack.close)  # corpo abandonado (cliente desconectou)
+    response.headers['X-Request-ID'] = request_id
+    response.headers[PROFILE_HEADER] = profile.filename
+    return response
+
+@router.post("/api/scrape", response_model=ScrapeResponse, status_code=202)
+async def scrape_jobs(request: ScrapeRequest, http_request: Request):
+    """Enfileira uma execução por palavra-chave e retorna na hora (202)
+    
+    O progresso sai em GET /api/scrape/{run_id} e no SSE /api/scrape/{run_id}/events.
+    Com X-Profile: 1, as execuções criadas também são perfiladas.
+    """
+    profile = profiler.requested(http_request.headers)
+    sites = [site for site in request.sites if site in SUPPORTED_SITES]
+    if not sites:
+        raise HTTPException(status_code=400, detail=f"Nenhum site suportado em {request.sites}")
+    
+    run_ids = []
+    for keyword in request.keywords:
+        run_ids.append(await asyncio.to_thread(
+            scrape_job_runner.submit, keyword, sites, request.days_back, request.send_telegram, profile
+        ))
     
     return ScrapeResponse(
-        run_id=run.id,
-        jobs_found=len(all_jobs),
-        status="completed"
+        run_id=run_ids[0],
+        run_ids=run_ids,
+        status="queued",
+        status_url=f"/api/scrape/{run_ids[0]}",
+        events_url=f"/api/scrape/{run_ids[0]}/events"
     )
 
-@app.get("/api/runs")
+@router.get("/api/scrape/{run_id}")
+async def get_scrape_status(run_id: int):
+    """Status e progresso de uma execução"""
+    state = await asyncio.to_thread(scrape_job_runner.get_status, run_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Execução não encontrada")
+    return state
+
+@router.get("/api/scrape/{run_id}/events")
+async def stream_scrape_progress(run_id: int, request: Request):
+    """Progresso da execução em tempo real (SSE); o stream fecha quando ela termina"""
+    if not await asyncio.to_thread(scrape_job_runner.get_status, run_id):
+        raise HTTPException(status_code=404, detail="Execução não encontrada")
+    return StreamingResponse(
+        scrape_job_runner.stream(run_id, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/api/runs")
 async def get_runs(db: Session = Depends(get_db)):
     runs = db.query(ScrapingRun).order_by(ScrapingRun.created_at.desc()).limit(50).all()
     return runs
 
-@app.get("/api/jobs")
+@router.get("/api/runs/{run_id}/trace")
+async def get_run_trace(run_id: int, db: Session = Depends(get_db)):
+    """Spans da execução: duração de cada fase, contagens, bytes e engine do navegador"""
+    run = db.query(ScrapingRun).filter(ScrapingRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Execução não encontrada")
+    return {"run_id": run.id, "keyword": run.keyword, "status": run.status, "trace": load_trace(run),
+            "profile": f"/admin/profiling/{run.profile}" if run.profile else None}
+
+@router.get("/api/jobs")
 async def get_jobs(limit: int = 50, db: Session = Depends(get_db)):
     jobs = db.query(ScrapedJob).order_by(ScrapedJob.scraped_at.desc()).limit(limit).all()
     return jobs
 
-@app.get("/health")
+@router.get("/api/events")
+async def stream_events(request: Request):
+    """Feed em tempo real (SSE) de novas vagas, aprovações e execuções"""
+    return StreamingResponse(
+        broadcaster.stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(components: Components = Depends(get_components)):
+    """Métricas Prometheus deste processo"""
+    if components.scheduling_service.execution == 'queue':
+        stats = await asyncio.to_thread(work_queue.get_stats)
+        for status in ('queued', 'leased', 'done', 'failed'):
+            WORK_QUEUE_TASKS.labels(status).set(stats.get(status, 0))
+        WORK_QUEUE_OLDEST_SECONDS.set(stats.get('oldest_queued_seconds') or 0)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@router.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
-@app.get("/api/auto-searches")
-async def get_automated_searches():
+@router.get("/api/auto-searches")
+async def get_automated_searches(components: Components = Depends(get_components)):
     """Ver matriz de buscas automatizadas"""
     return {
-        "search_matrix": search_manager.get_search_matrix(),
-        "regional_stats": search_manager.get_regional_stats(),
-        "next_executions": smart_scheduler.get_next_searches()
+        "search_matrix": await asyncio.to_thread(components.search_manager.get_search_matrix),
+        "regional_stats": await asyncio.to_thread(components.search_manager.get_regional_stats),
+        "next_executions": await asyncio.to_thread(components.smart_scheduler.get_next_searches),
+        "dispatch": components.scheduling_service.get_dispatch_stats(),
+        "batches": await asyncio.to_thread(batch_checkpoint.get_recent),
+        "adaptive_schedule": await asyncio.to_thread(components.smart_scheduler.get_learned_schedule)
     }
 
-@app.post("/api/auto-searches/add")
-async def add_custom_search(keywords: List[str], regions: List[str], schedule: str, priority: int = 3):
+@router.post("/api/auto-searches/add")
+async def add_custom_search(keywords: List[str], regions: List[str], schedule: str, priority: int = 3, components: Components = Depends(get_components)):
     """Adicionar busca personalizada"""
-    profile_id = search_manager.add_custom_profile(keywords, regions, schedule, priority)
-    smart_scheduler.setup_automated_searches()  # Reconfigurar
-    return {"profile_id": profile_id, "status": "added"}
+    _validate_schedule(schedule)
+    profile_id = await asyncio.to_thread(components.search_manager.add_custom_profile, keywords, regions, schedule, priority)
+    changes = await asyncio.to_thread(components.smart_scheduler.reconcile)  # Só o perfil novo é agendado
+    return {"profile_id": profile_id, "status": "added", "changes": changes}
+
+@router.get("/api/auto-searches/profiles")
+async def list_search_profiles(components: Components = Depends(get_components)):
+    """Perfis de busca automatizada"""
+    return [asdict(profile) for profile in await asyncio.to_thread(components.search_manager.get_profiles)]
+
+@router.put("/api/auto-searches/profiles/{profile_id}")
+async def update_search_profile(profile_id: int, update: SearchProfileUpdate, components: Components = Depends(get_components)):
+    """Alterar perfil; só o job desse perfil é reagendado"""
+    if update.schedule:
+        _validate_schedule(update.schedule)
+    profile = await asyncio.to_thread(components.search_manager.update_profile, profile_id,
+                                      **update.dict(exclude_unset=True))
+    if not profile:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return {"profile": asdict(profile), "changes": await asyncio.to_thread(components.smart_scheduler.reconcile)}
 
-@app.post("/api/auto-searches/execute-now")
-async def execute_high_priority_now():
+@router.delete("/api/auto-searches/profiles/{profile_id}")
+async def delete_search_profile(profile_id: int, components: Components = Depends(get_components)):
+    """Remover perfil e o job dele"""
+    if not await asyncio.to_thread(components.search_manager.delete_profile, profile_id):
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return {"status": "deleted", "changes": await asyncio.to_thread(components.smart_scheduler.reconcile)}
+
+def _validate_schedule(schedule: str):
+    from apscheduler.triggers.cron import CronTrigger
+    try:
+        CronTrigger.from_crontab(schedule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Expressão cron inválida: {e}")
+
+@router.post("/api/auto-searches/execute-now")
+async def execute_high_priority_now(components: Components = Depends(get_components)):
     """Executar buscas de alta prioridade imediatamente"""
-    searches = search_manager.get_high_priority_searches()
-    await smart_scheduler._execute_batch_search(searches)
+    searches = await asyncio.to_thread(components.search_manager.get_high_priority_searches)
+    await components.smart_scheduler._execute_batch_search(searches)
     return {"executed_searches": len(searches), "status": "completed"}
 
-@app.post("/api/portal-integration/send-jobs")
-async def send_jobs_to_portal(job_ids: List[int] = None, auto_approve: bool = False, db: Session = Depends(get_db)):
-    """Enviar vagas aprovadas para o portal principal"""
+@router.get("/api/work-queue")
+async def get_work_queue_stats(components: Components = Depends(get_components)):
+    """Estado da fila de buscas consumida pelos workers (SCRAPE_EXECUTION=queue)"""
+    return {"execution": components.scheduling_service.execution, **await asyncio.to_thread(work_queue.get_stats)}
+
+@router.post("/api/portal-integration/send-jobs")
+async def send_jobs_to_portal(job_ids: List[int] = None, auto_approve: bool = False, db: Session = Depends(get_db), components: Components = Depends(get_components)):
+    """Enviar vagas aprovadas para o portal principal
+    
+    As vagas entram na outbox (uma única vez cada) e a fila é drenada em
+    seguida; falhas ficam para o dispatcher tentar de novo com backoff.
+    """
     if job_ids:
         # Enviar vagas específicas
-        jobs_data = []
-        for job_id in job_ids:
-            job = db.query(PendingJob).filter(PendingJob.id == job_id).first()
-            if job and job.status == "approved":
-                jobs_data.append({
-                    'title': job.title,
-                    'company': job.company,
-                    'location': job.location,
-                    'source': job.source,
-                    'link': job.link,
-                    'quality_score': job.quality_score
-                })
+        queued = components.portal_outbox.enqueue(job_ids, db, auto_approve)
     else:
-        # Enviar todas as vagas aprovadas
-        approved_jobs = approval_system.get_approved_jobs(db)
-        jobs_data = [{
-            'title': job.title,
-            'company': job.company,
-            'location': job.location,
-            'source': job.source,
-            'link': job.link,
-            'quality_score': job.quality_score
-        } for job in approved_jobs]
+        # Enviar todas as vagas aprovadas ainda não enfileiradas
+        queued = components.portal_outbox.enqueue_approved(db, auto_approve)
     
-    result = portal_integration.send_jobs_to_portal(jobs_data, auto_approve)
-    return result
+    result = await asyncio.to_thread(components.portal_outbox.drain)
+    return {**queued, **result}
 
-@app.get("/api/approval/pending")
-async def get_pending_jobs(limit: int = 50, db: Session = Depends(get_db)):
+@router.get("/api/portal-integration/outbox")
+async def get_portal_outbox(db: Session = Depends(get_db), components: Components = Depends(get_components)):
+    """Estado da fila de envios ao portal"""
+    return components.portal_outbox.get_stats(db)
+
+@router.get("/api/portal-integration/stats")
+async def get_portal_delivery_stats(components: Components = Depends(get_components)):
+    """Latência e erros das entregas ao portal"""
+    return components.portal_integration.get_delivery_stats()
+
+@router.get("/api/approval/pending")
+async def get_pending_jobs(limit: int = 50, db: Session = Depends(get_db), components: Components = Depends(get_components)):
     """Listar vagas pendentes de aprovação"""
-    jobs = approval_system.get_pending_jobs(db, limit)
+    jobs = components.approval_system.get_pending_jobs(db, limit)
     return [{
         'id': job.id,
         'title': job.title,
@@ -192,19 +306,59 @@ async def get_pending_jobs(limit: int = 50, db: Session = Depends(get_db)):
         'scraped_at': job.scraped_at
     } for job in jobs]
 
-@app.post("/api/approval/approve")
-async def approve_jobs(job_ids: List[int], reviewer: str = "admin", db: Session = Depends(get_db)):
+@router.post("/api/approval/approve")
+async def approve_jobs(job_ids: List[int], reviewer: str = "admin", db: Session = Depends(get_db), components: Components = Depends(get_components)):
     """Aprovar vagas em lote"""
-    result = approval_system.approve_jobs(job_ids, reviewer, db)
+    result = components.approval_system.approve_jobs(job_ids, reviewer, db)
     return result
 
-@app.post("/api/approval/reject")
-async def reject_jobs(job_ids: List[int], reason: str, reviewer: str = "admin", db: Session = Depends(get_db)):
+@router.post("/api/approval/reject")
+async def reject_jobs(job_ids: List[int], reason: str, reviewer: str = "admin", db: Session = Depends(get_db), components: Components = Depends(get_components)):
     """Rejeitar vagas em lote"""
-    result = approval_system.reject_jobs(job_ids, reason, reviewer, db)
+    result = components.approval_system.reject_jobs(job_ids, reason, reviewer, db)
     return result
 
-@app.get("/api/approval/stats")
-async def get_approval_stats(db: Session = Depends(get_db)):
+@router.get("/api/approval/stats")
+async def get_approval_stats(db: Session = Depends(get_db), components: Components = Depends(get_components)):
     """Estatísticas do sistema de aprovação"""
-    return approval_system.get_approval_stats(db)
\ No newline at end of file
+    return components.approval_system.get_approval_stats(db)
+
+
+def create_app(components: Components = None) -> FastAPI:
+    """Monta a aplicação
+    
+    Nada pesado é criado aqui: os componentes (agendadores, integração com o
+    portal, filtro, arquivo Parquet) nascem no primeiro uso, dentro do
+    container. Testes e ferramentas passam o próprio `Components` com
+    substitutos.
+    """
+    app = FastAPI(title="Portal Vagas Scraper API", version="1.0.0")
+    app.state.components = components = components or Components()
+    app.middleware("http")(observe_request_latency)
+    app.middleware("http")(profile_request)
+    add_web_routes(app)
+    app.include_router(admin_router)
+    if os.getenv('ADMIN_ACTIONS_ENABLED', 'false').lower() == 'true':
+        app.include_router(admin_actions_router)  # sem autenticação: só em rede interna
+    app.include_router(router)
+    
+    @app.on_event("startup")
+    async def startup_event():
+        from .archive import schedule_archive
+        init_db()
+        await asyncio.to_thread(scrape_job_runner.fail_orphans)  # execuções do processo anterior
+        await components.smart_scheduler.start()  # Iniciar buscas automatizadas
+        schedule_archive(components.scheduling_service)  # Arquivo Parquet para as analytics
+        components.portal_outbox.start()  # Retoma envios pendentes ao portal
+        logger.info("API started with automated searches")
+    
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        if 'portal_outbox' in components.created():
+            await components.portal_outbox.stop()
+        if 'scheduling_service' in components.created():
+            await components.scheduling_service.shutdown()
+    
+    return app
+
+app = create_app()
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, func
 from sqlalchemy.ext.declarative import declarative_base
 from .database import Base, get_db
+from .events import broadcaster
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional
 from datetime import datetime
 from loguru import logger
+import copy
+import os
+import threading
+import time
 
 class PendingJob(Base):
     __tablename__ = "pending_jobs"
@@ -22,15 +27,25 @@ class PendingJob(Base):
     reviewed_at = Column(DateTime)
     reviewed_by = Column(String)
     auto_approved = Column(Boolean, default=False)
+    portal_status = Column(String)  # sent, failed
+    portal_job_id = Column(Integer)
+    portal_error = Column(Text)
+    sent_to_portal_at = Column(DateTime)
 
 class ApprovalSystem:
     def __init__(self):
         self.auto_approval_threshold = 7  # Score mínimo para aprovação automática
+        self.stats_ttl = float(os.getenv('APPROVAL_STATS_TTL', '2'))  # segundos
+        self._stats_cache: Optional[Dict] = None
+        self._stats_cached_at = 0.0
+        self._stats_lock = threading.Lock()
+        self._stats_generation = 0  # incrementada a cada invalidação
         
     def add_jobs_for_review(self, jobs: List[Dict], db: Session) -> Dict:
         """Adiciona vagas para revisão manual"""
         added_count = 0
         auto_approved_count = 0
+        added_jobs = []
         
         for job in jobs:
             # Verificar se já existe
@@ -58,9 +73,15 @@ class ApprovalSystem:
                 auto_approved_count += 1
             
             db.add(pending_job)
+            added_jobs.append(pending_job)
             added_count += 1
         
+        db.flush()
+        payload = [self._serialize(job) for job in added_jobs]
         db.commit()
+        if added_count:
+            self.invalidate_stats()
+            self._publish("pending_jobs_added", {"jobs": payload}, db)
         
         return {
             "added": added_count,
@@ -80,6 +101,7 @@ class ApprovalSystem:
     def approve_jobs(self, job_ids: List[int], reviewer: str, db: Session) -> Dict:
         """Aprova vagas em lote"""
         approved_count = 0
+        approved_ids = []
         
         for job_id in job_ids:
             job = db.query(PendingJob).filter(PendingJob.id == job_id).first()
@@ -87,9 +109,17 @@ class ApprovalSystem:
                 job.status = "approved"
                 job.reviewed_at = datetime.utcnow()
                 job.reviewed_by = reviewer
+                approved_ids.append(job_id)
                 approved_count += 1
         
         db.commit()
+        if approved_count:
+            self.invalidate_stats()
+            self._publish("approval_status_changed", {
+                "job_ids": approved_ids,
+                "status": "approved",
+                "reviewer": reviewer
+            }, db)
         logger.info(f"{approved_count} vagas aprovadas por {reviewer}")
         
         return {"approved": approved_count}
@@ -97,6 +127,7 @@ class ApprovalSystem:
     def reject_jobs(self, job_ids: List[int], reason: str, reviewer: str, db: Session) -> Dict:
         """Rejeita vagas em lote"""
         rejected_count = 0
+        rejected_ids = []
         
         for job_id in job_ids:
             job = db.query(PendingJob).filter(PendingJob.id == job_id).first()
@@ -105,32 +136,136 @@ class ApprovalSystem:
                 job.rejection_reason = reason
                 job.reviewed_at = datetime.utcnow()
                 job.reviewed_by = reviewer
+                rejected_ids.append(job_id)
                 rejected_count += 1
         
         db.commit()
+        if rejected_count:
+            self.invalidate_stats()
+            self._publish("approval_status_changed", {
+                "job_ids": rejected_ids,
+                "status": "rejected",
+                "reviewer": reviewer
+            }, db)
         logger.info(f"{rejected_count} vagas rejeitadas por {reviewer}")
         
         return {"rejected": rejected_count}
     
-    def get_approved_jobs(self, db: Session, limit: int = 100) -> List[PendingJob]:
+    def get_approved_jobs(self, db: Session, limit: int = 100, unsent_only: bool = False) -> List[PendingJob]:
         """Retorna vagas aprovadas para envio ao portal"""
-        return db.query(PendingJob).filter(
-            PendingJob.status == "approved"
-        ).order_by(PendingJob.reviewed_at.desc()).limit(limit).all()
+        query = db.query(PendingJob).filter(PendingJob.status == "approved")
+        if unsent_only:
+            query = query.filter((PendingJob.portal_status.is_(None)) | (PendingJob.portal_status != "sent"))
+        return query.order_by(PendingJob.reviewed_at.desc()).limit(limit).all()
+    
+    def record_portal_results(self, results: List[Dict], db: Session) -> Dict:
+        """Registra em cada PendingJob o resultado do envio ao portal"""
+        by_id = {result['pending_job_id']: result for result in results if result.get('pending_job_id')}
+        if not by_id:
+            return {"updated": 0}
+        
+        now = datetime.utcnow()
+        jobs = db.query(PendingJob).filter(PendingJob.id.in_(list(by_id))).all()
+        for job in jobs:
+            result = by_id[job.id]
+            if result['success']:
+                job.portal_status = "sent"
+                job.portal_job_id = result.get('job_id')
+                job.portal_error = None
+                job.sent_to_portal_at = now
+            else:
+                job.portal_status = "failed"
+                job.portal_error = str(result.get('error') or '')[:1000]
+        
+        db.commit()
+        return {"updated": len(jobs)}
     
     def get_approval_stats(self, db: Session) -> Dict:
-        """Estatísticas do sistema de aprovação"""
-        total = db.query(PendingJob).count()
-        pending = db.query(PendingJob).filter(PendingJob.status == "pending").count()
-        approved = db.query(PendingJob).filter(PendingJob.status == "approved").count()
-        rejected = db.query(PendingJob).filter(PendingJob.status == "rejected").count()
-        auto_approved = db.query(PendingJob).filter(PendingJob.auto_approved == True).count()
+        """Estatísticas do sistema de aprovação (cacheadas por alguns segundos)"""
+        with self._stats_lock:
+            if self._stats_cache is not None and time.monotonic() - self._stats_cached_at < self.stats_ttl:
+                return copy.deepcopy(self._stats_cache)
+            generation = self._stats_generation
+        
+        stats = self._compute_stats(db)
+        
+        with self._stats_lock:
+            # Invalidada durante o cálculo: o resultado pode ser anterior à mudança, não vai para o cache
+            if generation == self._stats_generation:
+                self._stats_cache = stats
+                self._stats_cached_at = time.monotonic()
+        return copy.deepcopy(stats)
+    
+    def invalidate_stats(self):
+        """Descarta contadores em cache após mudança de status"""
+        with self._stats_lock:
+            self._stats_cache = None
+            self._stats_generation += 1
+    
+    def _publish(self, event_type: str, data: Dict, db: Session):
+        """Envia evento aos dashboards conectados junto com os contadores atualizados"""
+        if not broadcaster.subscriber_count():
+            return
+        data["stats"] = self.get_approval_stats(db)
+        broadcaster.publish(event_type, data)
+    
+    def _serialize(self, job: PendingJob) -> Dict:
+        return {
+            'id': job.id,
+            'title': job.title,
+            'company': job.company,
+            'location': job.location,
+            'source': job.source,
+            'link': job.link,
+            'quality_score': job.quality_score,
+            'status': job.status,
+            'scraped_at': job.scraped_at
+        }
+    
+    def _compute_stats(self, db: Session) -> Dict:
+        """Calcula todos os contadores com uma única query agrupada"""
+        rows = db.query(
+            PendingJob.status,
+            PendingJob.source,
+            PendingJob.reviewed_by,
+            PendingJob.auto_approved,
+            func.count(PendingJob.id)
+        ).group_by(
+            PendingJob.status,
+            PendingJob.source,
+            PendingJob.reviewed_by,
+            PendingJob.auto_approved
+        ).all()
+        
+        totals = {"pending": 0, "approved": 0, "rejected": 0}
+        total = 0
+        auto_approved = 0
+        by_source = {}
+        by_reviewer = {}
+        
+        for status, source, reviewer, is_auto, count in rows:
+            total += count
+            if status in totals:
+                totals[status] += count
+            if is_auto:
+                auto_approved += count
+            
+            source_stats = by_source.setdefault(source, {"total": 0, "pending": 0, "approved": 0, "rejected": 0})
+            source_stats["total"] += count
+            if status in source_stats:
+                source_stats[status] += count
+            
+            if reviewer and status in ("approved", "rejected"):
+                reviewer_stats = by_reviewer.setdefault(reviewer, {"approved": 0, "rejected": 0})
+                reviewer_stats[status] += count
         
         return {
             "total": total,
-            "pending": pending,
-            "approved": approved,
-            "rejected": rejected,
+            "pending": totals["pending"],
+            "approved": totals["approved"],
+            "rejected": totals["rejected"],
             "auto_approved": auto_approved,
-            "approval_rate": round((approved / total * 100) if total > 0 else 0, 2)
-        }
\ No newline at end of file
+            "approval_rate": round((totals["approved"] / total * 100) if total > 0 else 0, 2),
+            "by_source": by_source,
+            "by_reviewer": by_reviewer
+        }
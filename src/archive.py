@@ -0,0 +1,238 @@
+from sqlalchemy import select
+from .database import SessionLocal, ScrapingRun, ScrapedJob
+from typing import Dict, Iterator, Optional
+from datetime import datetime, timedelta
+from pathlib import Path
+from loguru import logger
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import asyncio
+import json
+import os
+import threading
+
+ARCHIVE_JOB_ID = 'parquet_archive'
+
+JOBS_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('title', pa.string()),
+    ('link', pa.string()),
+    ('source', pa.string()),
+    ('scraped_at', pa.timestamp('us'))
+])
+
+RUNS_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('keyword', pa.string()),
+    ('source', pa.string()),
+    ('region', pa.string()),
+    ('status', pa.string()),
+    ('jobs_found', pa.int64()),
+    ('pages_fetched', pa.int64()),
+    ('jobs_scraped', pa.int64()),
+    ('created_at', pa.timestamp('us')),
+    ('completed_at', pa.timestamp('us'))
+])
+
+# Partições hive: <dataset>/date=AAAA-MM-DD/source=<fonte>/part-*.parquet
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string()), ('source', pa.string())]), flavor='hive')
+
+class ParquetArchive:
+    """Arquivo colunar (Parquet) das vagas e execuções
+    
+    A cada ARCHIVE_INTERVAL_MINUTES o job periódico acrescenta o que entrou no
+    banco desde a última passada: vagas por id, execuções encerradas por
+    completed_at (marcas d'água em `_state.json`, gravado depois dos arquivos).
+    Só entram linhas com mais de ARCHIVE_SETTLE_SECONDS, para não pular
+    transações que ainda estavam abertas com ids/horários menores.
+    """
+    
+    def __init__(self, path: str = None):
+        self.path = Path(path or os.getenv('ARCHIVE_PATH', 'data/archive'))
+        self.interval_minutes = float(os.getenv('ARCHIVE_INTERVAL_MINUTES', '60'))
+        self.batch_rows = int(os.getenv('ARCHIVE_BATCH_ROWS', '100000'))
+        self.settle_seconds = int(os.getenv('ARCHIVE_SETTLE_SECONDS', '60'))
+        self.last_report: Dict = {}
+        self._lock = threading.Lock()
+    
+    def run(self) -> Dict:
+        """Acrescenta ao arquivo as vagas e execuções novas; retorna o resumo da passada"""
+        with self._lock:
+            started = datetime.utcnow()
+            cutoff = started - timedelta(seconds=self.settle_seconds)
+            state = self._load_state()
+            
+            jobs_state = state.setdefault('jobs', {'last_id': 0})
+            query = select(ScrapedJob.id, ScrapedJob.title, ScrapedJob.link, ScrapedJob.source,
+                           ScrapedJob.scraped_at).where(
+                ScrapedJob.id > jobs_state['last_id'],
+                ScrapedJob.scraped_at < cutoff
+            ).order_by(ScrapedJob.id)
+            jobs = 0
+            for table in self._read(query, JOBS_SCHEMA):
+                self._write('jobs', table, 'scraped_at')
+                jobs += table.num_rows
+                jobs_state['last_id'] = pc.max(table['id']).as_py()
+            
+            runs_state = state.setdefault('runs', {'last_completed_at': None})
+            query = select(*[getattr(ScrapingRun, name) for name in RUNS_SCHEMA.names]).where(
+                ScrapingRun.status.in_(('completed', 'failed')),
+                ScrapingRun.completed_at < cutoff
+            )
+            if runs_state['last_completed_at']:
+                query = query.where(ScrapingRun.completed_at > datetime.fromisoformat(runs_state['last_completed_at']))
+            query = query.order_by(ScrapingRun.completed_at)
+            runs = 0
+            for table in self._read(query, RUNS_SCHEMA):
+                self._write('runs', table, 'created_at')
+                runs += table.num_rows
+                runs_state['last_completed_at'] = pc.max(table['completed_at']).as_py().isoformat()
+            
+            state['archived_until'] = cutoff.isoformat()
+            self._save_state(state)
+            compacted = self._compact(before=cutoff.strftime('%Y-%m-%d'))
+            
+            self.last_report = {
+                'jobs': jobs,
+                'runs': runs,
+                'compacted_partitions': compacted,
+                'archived_until': cutoff,
+                'seconds': round((datetime.utcnow() - started).total_seconds(), 2)
+            }
+            if jobs or runs:
+                logger.info(f"Arquivo Parquet: +{jobs} vagas, +{runs} execuções em {self.last_report['seconds']}s")
+            return self.last_report
+    
+    def dataset(self, name: str):
+        """Dataset Arrow de 'jobs' ou 'runs'; None enquanto nada foi arquivado"""
+        base = self.path / name
+        if not base.exists() or not any(base.iterdir()):
+            return None
+        return ds.dataset(base, format='parquet', partitioning=PARTITIONING, schema=self.schema(name))
+    
+    def schema(self, name: str) -> pa.Schema:
+        """Esquema lido do dataset (colunas + partição de data)"""
+        schema = JOBS_SCHEMA if name == 'jobs' else RUNS_SCHEMA
+        return schema.append(pa.field('date', pa.string()))
+    
+    def oldest_date(self, name: str) -> Optional[str]:
+        """Data (YYYY-MM-DD) da partição mais antiga do dataset; None se vazio"""
+        dates = [directory.name.split('=', 1)[1] for directory in (self.path / name).glob('date=*')]
+        return min(dates) if dates else None
+    
+    def archived_until(self) -> Optional[str]:
+        """Até quando o arquivo cobre o banco (ISO, UTC)"""
+        return self._load_state().get('archived_until')
+    
+    def get_stats(self) -> Dict:
+        state = self._load_state()
+        files = list(self.path.glob('*/date=*/source=*/*.parquet'))
+        return {
+            'path': str(self.path),
+            'interval_minutes': self.interval_minutes,
+            'archived_until': state.get('archived_until'),
+            'last_job_id': state.get('jobs', {}).get('last_id'),
+            'files': len(files),
+            'size_mb': round(sum(f.stat().st_size for f in files) / 1024 / 1024, 2),
+            'last_run': self.last_report
+        }
+    
+    def _read(self, query, schema: pa.Schema) -> Iterator[pa.Table]:
+        """Lê a consulta em lotes de ARCHIVE_BATCH_ROWS (cursor do lado do servidor)"""
+        db = SessionLocal()
+        try:
+            result = db.execute(query.execution_options(stream_results=True, yield_per=self.batch_rows))
+            for rows in result.partitions():
+                columns = list(zip(*rows))
+                yield pa.table([pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                               schema=schema)
+        finally:
+            db.close()
+    
+    def _write(self, name: str, table: pa.Table, timestamp_column: str):
+        first_id = pc.min(table['id']).as_py()
+        last_id = pc.max(table['id']).as_py()
+        table = table.append_column('date', pc.strftime(table[timestamp_column], format='%Y-%m-%d'))
+        ds.write_dataset(
+            table,
+            self.path / name,
+            format='parquet',
+            partitioning=PARTITIONING,
+            basename_template=f"part-{first_id}-{last_id}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore'
+        )
+    
+    def _compact(self, before: str) -> int:
+        """Junta num arquivo só as partições de dias já fechados que têm vários
+        
+        Cada passada grava um arquivo por partição; sem compactar, um dia
+        terminaria com dezenas de arquivos pequenos. O novo arquivo é escrito
+        como `_compact.tmp` (ignorado na leitura, prefixo '_'); depois
+        `_compact.json` registra quais arquivos ele substitui, os antigos saem
+        e só então ele vira .parquet.
+        """
+        compacted = 0
+        for directory in self.path.glob('*/date=*/source=*'):
+            if directory.parent.name.split('=', 1)[1] >= before:
+                continue
+            pending = directory / '_compact.tmp'
+            manifest = directory / '_compact.json'
+            final = directory / 'part-compacted.parquet'
+            self._recover_compaction(pending, manifest, final)
+            
+            files = sorted(directory.glob('*.parquet'))
+            if len(files) < 2:
+                continue
+            pq.write_table(pa.concat_tables(pq.ParquetFile(file).read() for file in files), pending)
+            tmp = directory / '_compact.json.tmp'
+            tmp.write_text(json.dumps([file.name for file in files]))
+            os.replace(tmp, manifest)
+            self._promote(pending, manifest, final)
+            compacted += 1
+        return compacted
+    
+    def _recover_compaction(self, pending: Path, manifest: Path, final: Path):
+        """Conclui ou descarta a compactação que uma passada anterior não terminou"""
+        if pending.exists() and manifest.exists():
+            self._promote(pending, manifest, final)  # parou entre apagar os antigos e renomear
+        elif pending.exists():
+            pending.unlink()  # parou escrevendo: os antigos estão intactos
+        elif manifest.exists():
+            manifest.unlink()  # parou depois de renomear
+    
+    def _promote(self, pending: Path, manifest: Path, final: Path):
+        """Apaga os arquivos listados no manifesto e põe o compactado no lugar"""
+        for name in json.loads(manifest.read_text()):
+            (pending.parent / name).unlink(missing_ok=True)
+        os.replace(pending, final)
+        manifest.unlink()
+    
+    def _load_state(self) -> Dict:
+        state_file = self.path / '_state.json'
+        if not state_file.exists():
+            return {}
+        return json.loads(state_file.read_text())
+    
+    def _save_state(self, state: Dict):
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / '_state.json.tmp'
+        tmp.write_text(json.dumps(state, indent=2))
+        os.replace(tmp, self.path / '_state.json')
+
+def schedule_archive(service):
+    """Registra o job periódico do arquivo no serviço de agendamento (0 desativa)"""
+    if parquet_archive.interval_minutes <= 0:
+        if service.get_jobs(ARCHIVE_JOB_ID):
+            service.remove_job(ARCHIVE_JOB_ID)
+        return None
+    return service.add_interval_job(ARCHIVE_JOB_ID, 'src.archive:run_archive',
+                                    parquet_archive.interval_minutes * 60, name="Arquivo Parquet")
+
+async def run_archive():
+    """Alvo do job periódico"""
+    return await asyncio.to_thread(parquet_archive.run)
+
+# Instância global
+parquet_archive = ParquetArchive()
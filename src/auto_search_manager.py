@@ -1,4 +1,7 @@
-from typing import Dict, List
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy.exc import IntegrityError
+from .database import Base, SessionLocal
+from typing import Dict, List, Optional
 from dataclasses import dataclass
 from datetime import datetime, time
 import json
@@ -11,11 +14,70 @@ class SearchProfile:
     schedule: str  # cron expression
     priority: int  # 1-5 (5 = highest)
     active: bool = True
+    id: Optional[int] = None
+
+class StoredSearchProfile(Base):
+    """Perfil de busca automatizada (fonte da verdade para o reconciliador)"""
+    __tablename__ = "search_profiles"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    keywords = Column(Text, nullable=False)  # JSON
+    regions = Column(Text, nullable=False)  # JSON
+    schedule = Column(String, nullable=False)
+    priority = Column(Integer, default=3)
+    active = Column(Boolean, default=True)
+    deleted = Column(Boolean, default=False)  # removido; mantém a linha para não repovoar os padrões
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class SearchProfileSeed(Base):
+    """Marca de que os perfis padrão já foram gravados (a chave primária impede dois seeds)"""
+    __tablename__ = "search_profile_seeds"
+    
+    name = Column(String, primary_key=True)
+    seeded_at = Column(DateTime, default=datetime.utcnow)
 
 class AutoSearchManager:
-    def __init__(self):
-        self.profiles = self._load_default_profiles()
+    """Perfis de busca guardados no banco (tabela search_profiles)
+    
+    Na primeira leitura com a tabela vazia, os perfis padrão são gravados na
+    mesma transação que a marca em search_profile_seeds: se a API e o
+    scheduler sobem juntos, só um deles grava (o outro esbarra na chave).
+    """
+    
+    @property
+    def profiles(self) -> List[SearchProfile]:
+        return self.get_profiles()
+    
+    def get_profiles(self) -> List[SearchProfile]:
+        """Perfis não removidos, do banco"""
+        db = SessionLocal()
+        try:
+            if not db.query(StoredSearchProfile.id).first():
+                self._seed_defaults(db)
+            rows = db.query(StoredSearchProfile).filter(
+                StoredSearchProfile.deleted == False
+            ).order_by(StoredSearchProfile.id).all()
+            return [SearchProfile(
+                keywords=json.loads(row.keywords),
+                regions=json.loads(row.regions),
+                schedule=row.schedule,
+                priority=row.priority,
+                active=row.active,
+                id=row.id
+            ) for row in rows]
+        finally:
+            db.close()
         
+    def _seed_defaults(self, db):
+        """Grava os perfis padrão, a menos que outro processo já os tenha gravado"""
+        db.add(SearchProfileSeed(name='defaults'))
+        db.add_all(self._to_row(profile) for profile in self._load_default_profiles())
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+    
     def _load_default_profiles(self) -> List[SearchProfile]:
         """Perfis pré-configurados para ONGs"""
         return [
@@ -67,19 +129,20 @@ class AutoSearchManager:
         for profile in self.profiles:
             if not profile.active:
                 continue
-                
-            for keyword in profile.keywords:
-                for region in profile.regions:
-                    searches.append({
-                        'keyword': keyword,
-                        'region': region,
-                        'schedule': profile.schedule,
-                        'priority': profile.priority,
-                        'profile_id': f"{keyword}_{region}".replace(' ', '_')
-                    })
+            searches.extend(self.get_profile_searches(profile))
         
         return sorted(searches, key=lambda x: x['priority'], reverse=True)
     
+    def get_profile_searches(self, profile: SearchProfile) -> List[Dict]:
+        """Buscas keyword x região de um perfil"""
+        return [{
+            'keyword': keyword,
+            'region': region,
+            'schedule': profile.schedule,
+            'priority': profile.priority,
+            'profile_id': f"{keyword}_{region}".replace(' ', '_')
+        } for keyword in profile.keywords for region in profile.regions]
+    
     def get_high_priority_searches(self) -> List[Dict]:
         """Retorna buscas de alta prioridade para execução imediata"""
         matrix = self.get_search_matrix()
@@ -94,8 +157,56 @@ class AutoSearchManager:
             schedule=schedule,
             priority=priority
         )
-        self.profiles.append(profile)
-        return f"profile_{len(self.profiles)}"
+        self.get_profiles()  # garante os padrões antes do primeiro perfil personalizado
+        db = SessionLocal()
+        try:
+            row = self._to_row(profile)
+            db.add(row)
+            db.commit()
+            return f"profile_{row.id}"
+        finally:
+            db.close()
+    
+    def update_profile(self, profile_id: int, **changes) -> Optional[SearchProfile]:
+        """Altera campos de um perfil (keywords, regions, schedule, priority, active)"""
+        db = SessionLocal()
+        try:
+            row = db.query(StoredSearchProfile).filter(
+                StoredSearchProfile.id == profile_id,
+                StoredSearchProfile.deleted == False
+            ).first()
+            if not row:
+                return None
+            for field, value in changes.items():
+                if value is None:
+                    continue
+                setattr(row, field, json.dumps(value) if field in ('keywords', 'regions') else value)
+            row.updated_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+        return next((p for p in self.get_profiles() if p.id == profile_id), None)
+    
+    def delete_profile(self, profile_id: int) -> bool:
+        db = SessionLocal()
+        try:
+            updated = db.query(StoredSearchProfile).filter(
+                StoredSearchProfile.id == profile_id,
+                StoredSearchProfile.deleted == False
+            ).update({'deleted': True, 'active': False, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+            return bool(updated)
+        finally:
+            db.close()
+    
+    def _to_row(self, profile: SearchProfile) -> StoredSearchProfile:
+        return StoredSearchProfile(
+            keywords=json.dumps(profile.keywords),
+            regions=json.dumps(profile.regions),
+            schedule=profile.schedule,
+            priority=profile.priority,
+            active=profile.active
+        )
     
     def get_regional_stats(self) -> Dict:
         """Estatísticas por região"""
@@ -0,0 +1,223 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, func
+from .database import Base, SessionLocal, ScrapingRun
+from typing import Dict, List, Tuple
+from datetime import datetime, timedelta
+import json
+import os
+
+class BatchRun(Base):
+    """Plano persistido de um lote de buscas despachado"""
+    __tablename__ = "batch_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, default="running", index=True)  # running, completed, failed
+    owner = Column(String)
+    window = Column(Float)
+    total = Column(Integer, default=0)
+    skipped = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)  # heartbeat do dono
+    completed_at = Column(DateTime)
+
+class BatchRunItem(Base):
+    __tablename__ = "batch_run_items"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(Integer, nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    keyword = Column(String, nullable=False)
+    region = Column(String)
+    site = Column(String, nullable=False)
+    priority = Column(Integer, default=3)
+    filters = Column(Text)  # JSON
+    status = Column(String, default="pending")  # pending, done, failed, skipped
+    jobs_found = Column(Integer)
+    finished_at = Column(DateTime)
+
+class BatchCheckpoint:
+    """Checkpoint dos lotes de busca
+    
+    Cada lote vira um plano (uma linha por busca, na ordem de execução) e cada
+    busca concluída é marcada. Lote sem heartbeat do dono há mais de
+    BATCH_STALE_SECONDS (processo reiniciou no meio) é retomado a partir da
+    primeira busca incompleta; buscas com execução concluída dentro de
+    BATCH_FRESHNESS_MINUTES são puladas, na criação e na retomada.
+    """
+    
+    def __init__(self):
+        self.freshness_minutes = float(os.getenv('BATCH_FRESHNESS_MINUTES', '30'))
+        self.stale_seconds = int(os.getenv('BATCH_STALE_SECONDS', '180'))
+        self.retention_days = int(os.getenv('BATCH_RETENTION_DAYS', '7'))
+    
+    def create(self, units: List[Dict], owner: str, window: float = None) -> Tuple[int, List[Dict]]:
+        """Persiste o plano; retorna o id do lote e as buscas a executar (com item_id)"""
+        fresh = self._fresh_keys(units)
+        db = SessionLocal()
+        try:
+            batch = BatchRun(owner=owner, window=window, total=len(units))
+            db.add(batch)
+            db.flush()
+            
+            items = []
+            for position, unit in enumerate(units):
+                skip = (unit['keyword'], unit.get('region'), unit['site']) in fresh
+                items.append(BatchRunItem(
+                    batch_id=batch.id,
+                    position=position,
+                    keyword=unit['keyword'],
+                    region=unit.get('region'),
+                    site=unit['site'],
+                    priority=unit.get('priority', 3),
+                    filters=json.dumps(unit['filters']) if unit.get('filters') else None,
+                    status="skipped" if skip else "pending"
+                ))
+            batch.skipped = sum(item.status == "skipped" for item in items)
+            db.add_all(items)
+            self._purge(db)
+            db.commit()
+            return batch.id, [self._unit(item) for item in items if item.status == "pending"]
+        finally:
+            db.close()
+    
+    def mark(self, item_id: int, status: str, jobs_found: int = None):
+        db = SessionLocal()
+        try:
+            db.query(BatchRunItem).filter(BatchRunItem.id == item_id).update(
+                {"status": status, "jobs_found": jobs_found, "finished_at": datetime.utcnow()},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+    
+    def touch(self, batch_id: int, owner: str) -> bool:
+        """Heartbeat do dono; False se outro processo assumiu o lote"""
+        return self._update(batch_id, owner, {"updated_at": datetime.utcnow()})
+    
+    def finish(self, batch_id: int, owner: str, status: str = "completed"):
+        """Encerra o lote ("failed" se o despacho quebrou); só lotes "running" são retomados"""
+        now = datetime.utcnow()
+        self._update(batch_id, owner, {"status": status, "updated_at": now, "completed_at": now})
+    
+    def claim_orphans(self, owner: str) -> List[Tuple[int, List[Dict]]]:
+        """Assume lotes abandonados; retorna (id, buscas restantes) de cada um"""
+        stale_before = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        db = SessionLocal()
+        try:
+            orphans = db.query(BatchRun).filter(
+                BatchRun.status == "running",
+                BatchRun.updated_at < stale_before
+            ).all()
+            
+            claimed = []
+            for batch in orphans:
+                # UPDATE condicional: se outra réplica assumiu antes, fica de fora
+                taken = db.query(BatchRun).filter(
+                    BatchRun.id == batch.id,
+                    BatchRun.status == "running",
+                    BatchRun.updated_at == batch.updated_at
+                ).update({"owner": owner, "updated_at": datetime.utcnow()}, synchronize_session=False)
+                db.commit()
+                if taken:
+                    claimed.append(batch.id)
+        finally:
+            db.close()
+        
+        return [(batch_id, self._remaining(batch_id)) for batch_id in claimed]
+    
+    def get_recent(self, limit: int = 10) -> List[Dict]:
+        """Últimos lotes com progresso por status"""
+        db = SessionLocal()
+        try:
+            batches = db.query(BatchRun).order_by(BatchRun.id.desc()).limit(limit).all()
+            counts: Dict[int, Dict[str, int]] = {}
+            if batches:
+                rows = db.query(BatchRunItem.batch_id, BatchRunItem.status, func.count(BatchRunItem.id)).filter(
+                    BatchRunItem.batch_id.in_([batch.id for batch in batches])
+                ).group_by(BatchRunItem.batch_id, BatchRunItem.status).all()
+                for batch_id, status, count in rows:
+                    counts.setdefault(batch_id, {})[status] = count
+            return [{
+                "id": batch.id,
+                "status": batch.status,
+                "owner": batch.owner,
+                "total": batch.total,
+                "progress": counts.get(batch.id, {}),
+                "created_at": batch.created_at,
+                "completed_at": batch.completed_at
+            } for batch in batches]
+        finally:
+            db.close()
+    
+    def _remaining(self, batch_id: int) -> List[Dict]:
+        """Buscas incompletas a partir da primeira, pulando as que ficaram frescas nesse meio tempo"""
+        db = SessionLocal()
+        try:
+            items = db.query(BatchRunItem).filter(
+                BatchRunItem.batch_id == batch_id,
+                BatchRunItem.status == "pending"
+            ).order_by(BatchRunItem.position).all()
+            units = [self._unit(item) for item in items]
+            fresh = self._fresh_keys(units)
+            
+            remaining = []
+            for item, unit in zip(items, units):
+                if (item.keyword, item.region, item.site) in fresh:
+                    item.status = "skipped"
+                    item.finished_at = datetime.utcnow()
+                else:
+                    remaining.append(unit)
+            db.commit()
+            return remaining
+        finally:
+            db.close()
+    
+    def _fresh_keys(self, units: List[Dict]) -> set:
+        """(palavra-chave, região, site) com execução concluída dentro da janela de frescor"""
+        if not units or self.freshness_minutes <= 0:
+            return set()
+        since = datetime.utcnow() - timedelta(minutes=self.freshness_minutes)
+        db = SessionLocal()
+        try:
+            rows = db.query(ScrapingRun.keyword, ScrapingRun.region, ScrapingRun.source).filter(
+                ScrapingRun.status == "completed",
+                ScrapingRun.completed_at >= since,
+                ScrapingRun.keyword.in_({unit['keyword'] for unit in units})
+            ).distinct().all()
+            return {(row.keyword, row.region, row.source) for row in rows}
+        finally:
+            db.close()
+    
+    def _update(self, batch_id: int, owner: str, values: Dict) -> bool:
+        db = SessionLocal()
+        try:
+            updated = db.query(BatchRun).filter(
+                BatchRun.id == batch_id,
+                BatchRun.owner == owner
+            ).update(values, synchronize_session=False)
+            db.commit()
+            return bool(updated)
+        finally:
+            db.close()
+    
+    def _purge(self, db):
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        finished = BatchRun.status.in_(("completed", "failed"))
+        old = db.query(BatchRun.id).filter(finished, BatchRun.completed_at < cutoff)
+        db.query(BatchRunItem).filter(BatchRunItem.batch_id.in_(old)).delete(synchronize_session=False)
+        db.query(BatchRun).filter(finished, BatchRun.completed_at < cutoff).delete(
+            synchronize_session=False
+        )
+    
+    def _unit(self, item: BatchRunItem) -> Dict:
+        return {
+            'item_id': item.id,
+            'keyword': item.keyword,
+            'region': item.region,
+            'site': item.site,
+            'priority': item.priority,
+            'filters': json.loads(item.filters) if item.filters else None
+        }
+
+# Instância global
+batch_checkpoint = BatchCheckpoint()
@@ -1,6 +1,13 @@
-from typing import Set, Dict, Any
+from typing import Set, Dict, Any, List, Callable, Optional
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from loguru import logger
+from .metrics import DEDUP_LOOKUPS
+import atexit
 import hashlib
+import os
+import shelve
+import threading
 
 class JobCache:
     def __init__(self):
@@ -9,6 +16,8 @@ class JobCache:
             'terceirizada', 'outsourcing', 'consultoria generica',
             'vaga falsa', 'empresa fantasma'
         }
+        self.hits = 0
+        self.misses = 0
     
     def _generate_key(self, title: str, link: str) -> str:
         """Gera chave única para a vaga"""
@@ -23,11 +32,15 @@ class JobCache:
             # Verifica se ainda está válido (24h)
             cached_time = self._cache[key]['timestamp']
             if datetime.now() - cached_time < timedelta(hours=24):
+                self.hits += 1
+                DEDUP_LOOKUPS.labels('job', 'hit').inc()
                 return True
             else:
                 # Remove cache expirado
                 del self._cache[key]
         
+        self.misses += 1
+        DEDUP_LOOKUPS.labels('job', 'miss').inc()
         return False
     
     def add_job(self, title: str, link: str):
@@ -50,10 +63,130 @@ class JobCache:
     
     def get_cache_stats(self) -> Dict[str, int]:
         """Retorna estatísticas do cache"""
+        lookups = self.hits + self.misses
         return {
             'cached_jobs': len(self._cache),
-            'blacklist_terms': len(self._blacklist)
+            'blacklist_terms': len(self._blacklist),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
         }
 
-# Instância global
-job_cache = JobCache()
\ No newline at end of file
+class FeatureCache:
+    """LRU das features derivadas de cada vaga, chaveado pelo hash do conteúdo + versão das regras
+    
+    Com FEATURE_CACHE_PATH, as features também vão para um shelve. O dbm
+    não aceita escrita de vários processos: o primeiro processo a abrir o
+    arquivo fica com ele (lock exclusivo em `<path>.lock`) e os demais
+    (API, scheduler, worker no mesmo volume) rodam só com a LRU em memória.
+    """
+    
+    def __init__(self, max_size: int = None, persist_path: str = None):
+        self.max_size = max_size or int(os.getenv('FEATURE_CACHE_SIZE', '10000'))
+        self.persist_path = persist_path or os.getenv('FEATURE_CACHE_PATH')
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = None
+        self._store_lock = None
+        self.hits = 0
+        self.misses = 0
+        
+        if self.persist_path:
+            try:
+                import fcntl  # só POSIX; sem ele o cache fica em memória
+                os.makedirs(os.path.dirname(self.persist_path) or '.', exist_ok=True)
+                self._store_lock = open(f"{self.persist_path}.lock", 'w')
+                fcntl.flock(self._store_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._store = shelve.open(self.persist_path)
+                atexit.register(self.close)
+            except Exception as e:
+                logger.warning(f"Cache de features persistente indisponível neste processo: {e}")
+                if self._store_lock is not None:
+                    self._store_lock.close()
+                    self._store_lock = None
+    
+    def make_key(self, job: Dict, rules_version: str) -> str:
+        """Hash dos textos exatos que o extrator lê (sem normalizar: quebras de linha e
+        caixa mudam as features)"""
+        content = '\x1f'.join(
+            str(job.get(field) or '')
+            for field in ('title', 'description', 'company', 'location')
+        )
+        return hashlib.blake2b(f"{rules_version}\x1e{content}".encode(), digest_size=16).hexdigest()
+    
+    def get_many(self, jobs: List[Dict], rules_version: str,
+                 compute: Callable[[List[Dict]], List[Dict]]) -> List[Dict]:
+        """Retorna o registro de cada vaga, calculando em lote apenas as ausentes"""
+        keys = [self.make_key(job, rules_version) for job in jobs]
+        records: List[Optional[Dict]] = [None] * len(jobs)
+        missing = []
+        
+        with self._lock:
+            for index, key in enumerate(keys):
+                record = self._entries.get(key)
+                if record is None and self._store is not None:
+                    record = self._store.get(key)
+                    if record is not None:
+                        self._remember(key, record)
+                if record is None:
+                    missing.append(index)
+                else:
+                    self._entries.move_to_end(key)
+                    records[index] = record
+            self.hits += len(jobs) - len(missing)
+            self.misses += len(missing)
+        DEDUP_LOOKUPS.labels('feature', 'hit').inc(len(jobs) - len(missing))
+        DEDUP_LOOKUPS.labels('feature', 'miss').inc(len(missing))
+        
+        if missing:
+            computed = compute([jobs[index] for index in missing])
+            with self._lock:
+                for index, record in zip(missing, computed):
+                    records[index] = record
+                    self._remember(keys[index], record)
+                    if self._store is not None:
+                        self._store[keys[index]] = record
+                if self._store is not None:
+                    self._store.sync()
+        
+        return [dict(record) for record in records]
+    
+    def _remember(self, key: str, record: Dict):
+        self._entries[key] = record
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self):
+        """Descarta todas as features (chamado quando as regras mudam)"""
+        with self._lock:
+            self._entries.clear()
+            if self._store is not None:
+                self._store.clear()
+        logger.info("Cache de features invalidado")
+    
+    def close(self):
+        """Grava e fecha o shelve (registrado no atexit)"""
+        with self._lock:
+            if self._store is not None:
+                self._store.close()
+                self._store = None
+            if self._store_lock is not None:
+                self._store_lock.close()
+                self._store_lock = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do cache"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'persistent': self._store is not None
+        }
+
+# Instâncias globais
+job_cache = JobCache()
+feature_cache = FeatureCache()
\ No newline at end of file
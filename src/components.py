@@ -0,0 +1,74 @@
+from functools import cached_property
+from fastapi import Request
+from typing import List
+
+class Components:
+    """Componentes da API, criados (e os módulos pesados importados) no primeiro uso
+    
+    Cada app criada por `create_app` tem o seu container em
+    `app.state.components`; as rotas o recebem por `Depends(get_components)`.
+    Passar um componente no construtor substitui o padrão (ex.: um
+    PortalIntegration falso): cached_property lê primeiro o __dict__.
+    """
+    
+    def __init__(self, **overrides):
+        self.__dict__.update(overrides)
+    
+    @cached_property
+    def scheduling_service(self):
+        from .scheduling_service import scheduling_service  # APScheduler e o job store
+        return scheduling_service
+    
+    @cached_property
+    def smart_scheduler(self):
+        from .smart_scheduler import SmartScheduler
+        return SmartScheduler()
+    
+    @cached_property
+    def search_manager(self):
+        from .auto_search_manager import AutoSearchManager
+        return AutoSearchManager()
+    
+    @cached_property
+    def portal_integration(self):
+        from .portal_integration import PortalIntegration
+        return PortalIntegration()
+    
+    @cached_property
+    def approval_system(self):
+        from .approval_system import ApprovalSystem
+        return ApprovalSystem()
+    
+    @cached_property
+    def portal_outbox(self):
+        from .portal_outbox import PortalOutbox
+        return PortalOutbox(self.portal_integration, self.approval_system)
+    
+    @cached_property
+    def scheduler_manager(self):
+        from .scheduler_manager import SchedulerManager
+        return SchedulerManager()
+    
+    @cached_property
+    def ai_filter(self):
+        from .ai_filter import AIJobFilter
+        return AIJobFilter()
+    
+    @cached_property
+    def archive(self):
+        from .archive import parquet_archive  # pyarrow
+        return parquet_archive
+    
+    @cached_property
+    def analytics(self):
+        from .analytics import archive_analytics
+        return archive_analytics
+    
+    def created(self) -> List[str]:
+        """Componentes já instanciados neste processo"""
+        return sorted(name for name, value in vars(type(self)).items()
+                      if isinstance(value, cached_property) and name in self.__dict__)
+
+def get_components(request: Request) -> Components:
+    """Dependência das rotas: o container da app que atende a requisição"""
+    return request.app.state.components
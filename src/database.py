@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text
+from sqlalchemy import create_engine, inspect, text, Column, Integer, String, DateTime, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -16,11 +16,17 @@ class ScrapingRun(Base):
     id = Column(Integer, primary_key=True, index=True)
     keyword = Column(String, nullable=False)
     source = Column(String, nullable=False)
+    region = Column(String)
     jobs_found = Column(Integer, default=0)
+    pages_fetched = Column(Integer)
+    jobs_scraped = Column(Integer)
     status = Column(String, default="running")
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime)
     error_message = Column(Text)
+    trace = Column(Text)  # JSON compacto com os spans da execução (ver tracing.py)
+    profile = Column(String)  # arquivo .folded do profiler, quando a execução foi perfilada
+    runner = Column(String)  # processo do ScrapeJobRunner dono da execução sob demanda (host-pid-id)
 
 class ScrapedJob(Base):
     __tablename__ = "scraped_jobs"
@@ -40,4 +46,28 @@ def get_db():
         db.close()
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    # Registra os modelos dos outros módulos, que podem ainda não ter sido importados
+    from . import (approval_system, auto_search_manager, batch_checkpoint, notification_digest,  # noqa: F401
+                   portal_outbox, scheduling_service, work_queue)
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+
+def _add_missing_columns():
+    """Adiciona colunas novas (anuláveis) a tabelas já existentes
+    
+    create_all só cria tabelas que não existem; sem migrações, colunas
+    acrescentadas aos modelos depois são criadas aqui.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
\ No newline at end of file
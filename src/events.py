@@ -0,0 +1,108 @@
+from typing import Dict, List, Optional, Set, AsyncIterator
+from loguru import logger
+import asyncio
+import json
+import threading
+
+class EventBroadcaster:
+    """Distribui eventos em tempo real (SSE) para os dashboards conectados"""
+
+    def __init__(self, queue_size: int = 100, keepalive: float = 15.0):
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Registra um novo cliente e retorna sua fila de eventos"""
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Remove cliente desconectado"""
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, data: Dict):
+        """Publica evento para todos os clientes (pode ser chamado de qualquer thread)"""
+        if not self._subscribers or self._loop is None:
+            return
+
+        message = json.dumps({"type": event_type, "data": data}, default=str, ensure_ascii=False)
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self._loop:
+            self._fanout(message)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._fanout, message)
+
+    def _fanout(self, message: str):
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for queue in subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Cliente lento: descarta o evento mais antigo
+                try:
+                    queue.get_nowait()
+                    queue.put_nowait(message)
+                except (asyncio.QueueEmpty, asyncio.QueueFull):
+                    pass
+
+    async def stream(self, request) -> AsyncIterator[str]:
+        """Gera mensagens no formato Server-Sent Events até o cliente desconectar"""
+        queue = self.subscribe()
+        logger.debug(f"Cliente SSE conectado ({self.subscriber_count()} ativos)")
+
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=self.keepalive)
+                    yield f"data: {message}\n\n"
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(queue)
+            logger.debug(f"Cliente SSE desconectado ({self.subscriber_count()} ativos)")
+
+def serialize_run(run, jobs: List[Dict] = None) -> Dict:
+    """Formata execução concluída para o evento run_completed"""
+    return {
+        "run": {
+            "id": run.id,
+            "keyword": run.keyword,
+            "source": run.source,
+            "region": run.region,
+            "jobs_found": run.jobs_found,
+            "pages_fetched": run.pages_fetched,
+            "jobs_scraped": run.jobs_scraped,
+            "status": run.status,
+            "created_at": run.created_at,
+            "completed_at": run.completed_at,
+            "error_message": run.error_message
+        },
+        "jobs": [{
+            "title": job['title'],
+            "link": job['link'],
+            "source": job['source']
+        } for job in (jobs or [])[:20]]
+    }
+
+# Instância global
+broadcaster = EventBroadcaster()
@@ -1,76 +1,131 @@
 import csv
 import io
 import json
-from datetime import datetime
-from sqlalchemy.orm import Session
-from .database import ScrapedJob
-import openpyxl
-from openpyxl.styles import Font, PatternFill
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import select
+from .database import SessionLocal, ScrapedJob
 
-def export_to_csv(jobs: list) -> str:
-    """Exporta vagas para CSV"""
+HEADERS = ['Título', 'Link', 'Fonte', 'Data Coleta']
+CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '1000'))
+FILE_CHUNK_BYTES = 64 * 1024
+
+def iter_jobs(date_from: date = None, date_to: date = None, sources: List[str] = None) -> Iterator[List[Tuple]]:
+    """Vagas em lotes de EXPORT_CHUNK_ROWS, mais recentes primeiro
+    
+    Lê só as colunas exportadas (sem objetos ORM no identity map) por um
+    cursor do lado do servidor, então a memória não cresce com a tabela.
+    `date_to` é inclusivo.
+    """
+    query = select(ScrapedJob.title, ScrapedJob.link, ScrapedJob.source, ScrapedJob.scraped_at)
+    if date_from:
+        query = query.where(ScrapedJob.scraped_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        query = query.where(ScrapedJob.scraped_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    if sources:
+        query = query.where(ScrapedJob.source.in_(sources))
+    # id acompanha scraped_at (default utcnow) e anda pelo índice da PK, sem ordenar a tabela
+    query = query.order_by(ScrapedJob.id.desc())
+    
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(stream_results=True, yield_per=CHUNK_ROWS))
+        for rows in result.partitions():
+            yield rows
+    finally:
+        db.close()
+
+def _format_date(value: Optional[datetime]) -> str:
+    return value.strftime('%d/%m/%Y %H:%M') if value else ''
+
+def stream_csv(batches: Iterator[List[Tuple]]) -> Iterator[bytes]:
+    """Exporta vagas para CSV, um pedaço por lote"""
     output = io.StringIO()
     writer = csv.writer(output)
-    writer.writerow(['Título', 'Link', 'Fonte', 'Data Coleta'])
+    writer.writerow(HEADERS)
     
-    for job in jobs:
-        writer.writerow([
-            job.title,
-            job.link,
-            job.source,
-            job.scraped_at.strftime('%d/%m/%Y %H:%M')
-        ])
+    for rows in batches:
+        for title, link, source, scraped_at in rows:
+            writer.writerow([title, link, source, _format_date(scraped_at)])
+        yield output.getvalue().encode('utf-8')
+        output.seek(0)
+        output.truncate()
     
-    return output.getvalue()
+    if output.tell():
+        yield output.getvalue().encode('utf-8')
+
+def _as_dict(row: Tuple) -> dict:
+    title, link, source, scraped_at = row
+    return {
+        'title': title,
+        'link': link,
+        'source': source,
+        'scraped_at': scraped_at.isoformat() if scraped_at else None
+    }
+
+def stream_ndjson(batches: Iterator[List[Tuple]]) -> Iterator[bytes]:
+    """Exporta vagas para NDJSON (um objeto por linha)"""
+    for rows in batches:
+        yield ''.join(json.dumps(_as_dict(row), ensure_ascii=False) + '\n' for row in rows).encode('utf-8')
 
-def export_to_excel(jobs: list) -> bytes:
-    """Exporta vagas para Excel"""
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Vagas Coletadas"
+def stream_json(batches: Iterator[List[Tuple]]) -> Iterator[bytes]:
+    """Exporta vagas para um array JSON, escrito aos pedaços"""
+    yield b'['
+    first = True
+    for rows in batches:
+        parts = []
+        for row in rows:
+            parts.append(('\n  ' if first else ',\n  ') + json.dumps(_as_dict(row), ensure_ascii=False))
+            first = False
+        yield ''.join(parts).encode('utf-8')
+    yield b'\n]\n'
+
+def stream_xlsx(batches: Iterator[List[Tuple]]) -> Iterator[bytes]:
+    """Exporta vagas para Excel
+    
+    O workbook write-only grava as linhas em arquivo temporário à medida que
+    chegam; o .xlsx é um zip e só fica pronto no save, então o arquivo é
+    montado em disco e enviado em pedaços.
+    """
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+    
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Vagas Coletadas")
     
-    # Cabeçalhos
-    headers = ['Título', 'Link', 'Fonte', 'Data Coleta']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
+    # Sem ler os dados antes, as larguras são fixas
+    for letter, width in zip('ABCD', (50, 50, 15, 18)):
+        ws.column_dimensions[letter].width = width
+    
+    header = []
+    for value in HEADERS:
+        cell = WriteOnlyCell(ws, value=value)
         cell.font = Font(bold=True)
         cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        header.append(cell)
+    ws.append(header)
     
-    # Dados
-    for row, job in enumerate(jobs, 2):
-        ws.cell(row=row, column=1, value=job.title)
-        ws.cell(row=row, column=2, value=job.link)
-        ws.cell(row=row, column=3, value=job.source)
-        ws.cell(row=row, column=4, value=job.scraped_at.strftime('%d/%m/%Y %H:%M'))
-    
-    # Ajustar largura das colunas
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
+    for rows in batches:
+        for title, link, source, scraped_at in rows:
+            ws.append([title, link, source, _format_date(scraped_at)])
     
-    # Salvar em bytes
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output.getvalue()
+    with tempfile.TemporaryFile() as output:
+        wb.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(FILE_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
 
-def export_to_json(jobs: list) -> str:
-    """Exporta vagas para JSON"""
-    data = []
-    for job in jobs:
-        data.append({
-            'title': job.title,
-            'link': job.link,
-            'source': job.source,
-            'scraped_at': job.scraped_at.isoformat()
-        })
-    
-    return json.dumps(data, indent=2, ensure_ascii=False)
\ No newline at end of file
+# formato -> (media type, extensão, gerador)
+FORMATS = {
+    'csv': ('text/csv', 'csv', stream_csv),
+    'ndjson': ('application/x-ndjson', 'ndjson', stream_ndjson),
+    'json': ('application/json', 'json', stream_json),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx', stream_xlsx),
+    'excel': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx', stream_xlsx)
+}
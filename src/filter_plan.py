@@ -0,0 +1,150 @@
+from typing import Callable, Dict, List, Tuple
+from datetime import datetime, timedelta
+from loguru import logger
+from .ai_filter import AIJobFilter
+from .metrics import SCRAPE_CARDS, FILTER_DROPS
+
+# Predicados que cada site aplica via parâmetros de URL (ou durante o parse)
+SITE_PUSHDOWN = {
+    'infojobs': {'location', 'date'},
+    'linkedin': {'location', 'date', 'contract_type'},
+    'catho': {'location'}
+}
+
+# Valores aceitos no filtro contract_type -> classificação derivada da vaga
+CONTRACT_TYPES = {
+    'clt': 'CLT',
+    'estagio': 'INTERNSHIP',
+    'pj': 'FREELANCE',
+    'freelance': 'FREELANCE'
+}
+
+class FilterPlan:
+    """Plano de filtragem compilado uma vez por busca
+
+    Predicados suportados pelo site vão para a URL; os demais rodam uma única
+    vez sobre o resultado combinado, do mais barato para o mais caro.
+    """
+
+    def __init__(self, filters: Dict = None, days_back: int = 1, location: str = None,
+                 ai_filter: AIJobFilter = None):
+        self.filters = dict(filters or {})
+        self.days_back = days_back
+        self.location = (location or self.filters.get('location') or '').strip()
+        self.contract_type = (self.filters.get('contract_type') or '').lower() or None
+        self.ai_filter = ai_filter or AIJobFilter()
+        self.cutoff_date = datetime.now().date() - timedelta(days=days_back)
+        self.stats: Dict[str, int] = {}
+
+        self._row_predicates = self._compile_row_predicates()
+        self._batch_predicates = self._compile_batch_predicates()
+
+    @property
+    def remote_only(self) -> bool:
+        return self.location.lower() == 'remoto'
+
+    def url_params(self, site: str) -> Dict:
+        """Parâmetros que o scraper do site deve aplicar na própria busca"""
+        pushdown = SITE_PUSHDOWN.get(site, set())
+        params = {'location': '', 'days_back': self.days_back, 'contract_type': None, 'remote': False}
+
+        if 'location' in pushdown and self.location:
+            if self.remote_only:
+                params['remote'] = site == 'linkedin'
+            else:
+                params['location'] = self.location
+        if 'contract_type' in pushdown and self.contract_type in CONTRACT_TYPES:
+            params['contract_type'] = self.contract_type
+
+        return params
+
+    def apply(self, jobs: List[Dict]) -> List[Dict]:
+        """Aplica os predicados restantes uma única vez e ordena por qualidade"""
+        self.stats = {'input': len(jobs)}
+        if not self.filters:
+            self.stats['output'] = len(jobs)
+            return jobs
+
+        # 1ª etapa: predicados baratos por vaga, com curto-circuito
+        survivors = []
+        for job in jobs:
+            site = (job.get('source') or '').lower()
+            pushed = SITE_PUSHDOWN.get(site, set())
+            for name, predicate in self._row_predicates:
+                if name in pushed:
+                    continue
+                if not predicate(job):
+                    self._count_drop(name, site)
+                    break
+            else:
+                survivors.append(job)
+
+        # 2ª etapa: predicados que dependem das features derivadas (memoizadas, em lote)
+        records = self.ai_filter.derive_features(survivors) if survivors else []
+        scored = []
+        for job, record in zip(survivors, records):
+            site = (job.get('source') or '').lower()
+            pushed = SITE_PUSHDOWN.get(site, set())
+            for name, predicate in self._batch_predicates:
+                if name in pushed:
+                    continue
+                if not predicate(record):
+                    self._count_drop(name, site)
+                    break
+            else:
+                job['quality_score'] = record['quality_score']
+                scored.append(job)
+
+        scored.sort(key=lambda x: x.get('quality_score', 0), reverse=True)
+        self.stats['output'] = len(scored)
+        return scored
+
+    def log_stats(self, keyword: str = ""):
+        dropped = {k: v for k, v in self.stats.items() if k not in ('input', 'output')}
+        logger.info(
+            f"Filtros '{keyword}': {self.stats.get('input', 0)} -> {self.stats.get('output', 0)} vagas"
+            + (f" (descartadas: {dropped})" if dropped else "")
+        )
+
+    def _count_drop(self, name: str, site: str):
+        self.stats[name] = self.stats.get(name, 0) + 1
+        SCRAPE_CARDS.labels(site, 'filtered').inc()
+        FILTER_DROPS.labels(site, name).inc()
+
+    def _compile_row_predicates(self) -> List[Tuple[str, Callable[[Dict], bool]]]:
+        """Predicados sobre campos brutos, em ordem crescente de custo"""
+        predicates = []
+
+        if self.filters:
+            cutoff = self.cutoff_date
+            predicates.append(('date', lambda job: not job.get('date') or job['date'] >= cutoff))
+
+        if self.filters.get('location') and not self.remote_only:
+            location = self.location.lower()
+            predicates.append(('location', lambda job: location in (job.get('location') or '').lower()))
+
+        if self.filters.get('seniority'):
+            seniority = self.filters['seniority'].lower()
+            predicates.append(('seniority', lambda job: seniority in (job.get('title') or '').lower()))
+
+        if self.filters:
+            blacklist = self.ai_filter.blacklist_companies
+            predicates.append(('blacklist', lambda job: not any(
+                blocked in (job.get('company') or '').lower() for blocked in blacklist
+            )))
+
+        return predicates
+
+    def _compile_batch_predicates(self) -> List[Tuple[str, Callable[[Dict], bool]]]:
+        """Predicados sobre o registro de features derivadas"""
+        predicates = []
+
+        if self.contract_type in CONTRACT_TYPES:
+            expected = CONTRACT_TYPES[self.contract_type]
+            predicates.append(('contract_type', lambda record: record['contract_type'] == expected))
+
+        if self.filters.get('min_salary'):
+            min_salary = int(self.filters['min_salary'])
+            predicates.append(('min_salary', lambda record: not (0 < record['salary'] < min_salary)))
+
+        return predicates
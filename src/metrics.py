@@ -0,0 +1,101 @@
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from typing import Dict, List, Sequence
+from loguru import logger
+import bisect
+import os
+import threading
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class LatencyHistogram:
+    """Histograma de latências (segundos) com buckets fixos, seguro entre threads"""
+    
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # último bucket = +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, seconds: float):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+            self._count += 1
+    
+    def percentile(self, q: float) -> float:
+        """Estimativa do percentil q (0-100) pelo limite superior do bucket"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+        if not total:
+            return 0.0
+        
+        target = total * q / 100
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= target:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, total_sum = self._count, self._sum
+        
+        labels: List[str] = [f"<={bucket}s" for bucket in self.buckets] + ["+Inf"]
+        return {
+            'count': total,
+            'avg': round(total_sum / total, 4) if total else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': dict(zip(labels, counts))
+        }
+
+# Métricas Prometheus (expostas em /metrics; workers e scheduler usam METRICS_PORT)
+
+PHASE_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+SCRAPE_PHASE_SECONDS = Histogram(
+    'vagas_scrape_phase_seconds', 'Duração das fases do scraping por site',
+    ['site', 'phase'], buckets=PHASE_BUCKETS  # phase: driver, page_load, scroll, parse
+)
+SCRAPE_CARDS = Counter(
+    'vagas_scrape_cards_total', 'Cards de vaga por desfecho',
+    ['site', 'outcome']  # seen, accepted, duplicate, blacklisted, expired, error, filtered
+)
+FILTER_DROPS = Counter('vagas_filter_drops_total', 'Vagas descartadas pelo plano de filtros', ['site', 'predicate'])
+DEDUP_LOOKUPS = Counter('vagas_dedup_lookups_total', 'Consultas aos caches de deduplicação', ['cache', 'result'])
+
+DB_INGEST_SECONDS = Histogram('vagas_db_ingest_seconds', 'Gravação de um lote de vagas no banco')
+DB_INGEST_JOBS = Counter('vagas_db_ingest_jobs_total', 'Vagas recebidas na gravação', ['result'])  # new, duplicate
+
+SCHEDULER_QUEUE_DEPTH = Gauge('vagas_scheduler_queue_depth', 'Buscas aguardando uma sessão do grid')
+SCHEDULER_LAG_SECONDS = Histogram(
+    'vagas_scheduler_lag_seconds', 'Atraso entre o horário previsto e o início',
+    ['stage'], buckets=PHASE_BUCKETS  # stage: job (disparo do APScheduler), unit (fila do grid)
+)
+WORK_QUEUE_TASKS = Gauge('vagas_work_queue_tasks', 'Tarefas na fila de buscas por status', ['status'])
+WORK_QUEUE_OLDEST_SECONDS = Gauge('vagas_work_queue_oldest_seconds', 'Idade da tarefa mais antiga aguardando worker')
+
+TELEGRAM_SEND_SECONDS = Histogram('vagas_telegram_send_seconds', 'Chamadas sendMessage ao Telegram')
+TELEGRAM_MESSAGES = Counter('vagas_telegram_messages_total', 'Mensagens do Telegram por desfecho', ['result'])
+TELEGRAM_QUEUE_DEPTH = Gauge('vagas_telegram_queue_depth', 'Mensagens aguardando envio ao Telegram')
+
+PORTAL_REQUEST_SECONDS = Histogram('vagas_portal_request_seconds', 'Chamadas à API do portal', ['operation'])
+PORTAL_ERRORS = Counter('vagas_portal_errors_total', 'Erros nas chamadas à API do portal', ['operation'])
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'vagas_http_request_seconds', 'Latência das rotas HTTP (até o início da resposta)',
+    ['method', 'route', 'status']
+)
+
+def start_metrics_server():
+    """Servidor /metrics próprio para processos sem a API (METRICS_PORT)"""
+    port = os.getenv('METRICS_PORT')
+    if port:
+        start_http_server(int(port))
+        logger.info(f"Métricas Prometheus em :{port}/metrics")
@@ -0,0 +1,231 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from sqlalchemy.exc import IntegrityError
+from .database import Base, SessionLocal
+from .telegram_queue import telegram_queue
+from typing import Dict, List
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from loguru import logger
+import atexit
+import os
+import threading
+import unicodedata
+
+class NotifiedJob(Base):
+    """Vagas já enviadas a cada chat (evita repetir a mesma vaga em resumos futuros)"""
+    __tablename__ = "notified_jobs"
+    __table_args__ = (UniqueConstraint('chat_id', 'dedupe_key', name='uq_notified_chat_key'),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(String, nullable=False, index=True)
+    dedupe_key = Column(String, nullable=False)
+    sent_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    return ' '.join(''.join(c for c in text if not unicodedata.combining(c)).split())
+
+def dedupe_keys(job: Dict) -> List[str]:
+    """Chaves que identificam a mesma vaga entre palavras-chave e sites"""
+    keys = []
+    link = (job.get('link') or '').strip()
+    if link:
+        # Ignora query string (parâmetros de rastreamento do LinkedIn etc.)
+        parts = urlsplit(link)
+        keys.append(f"link:{parts.netloc.lower()}{parts.path.rstrip('/')}")
+    
+    # Mesma vaga publicada em dois sites; outra cidade é outra vaga
+    title, company = _normalize(job.get('title')), _normalize(job.get('company'))
+    if title and company:
+        keys.append(f"title:{title}|{company}|{_normalize(job.get('location'))}")
+    return keys
+
+def _remembered_keys(keys) -> set:
+    """Só o link identifica a vaga entre resumos: título + empresa só agrupa dentro da janela
+    
+    (a mesma vaga reaberta semanas depois, com outro link, deve ser avisada de novo)
+    """
+    return {key for key in keys if key.startswith('link:')}
+
+class NotificationDigest:
+    """Agrupa vagas novas numa janela e envia um resumo ranqueado por chat
+    
+    Vagas repetidas entre buscas (mesmo link, ou mesmo título + empresa +
+    local) viram uma entrada só; vagas já enviadas ao chat antes (mesmo link)
+    não entram de novo.
+    """
+    
+    def __init__(self):
+        self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
+        self.default_chat_id = os.getenv('TELEGRAM_CHAT_ID')
+        self.window = float(os.getenv('TELEGRAM_DIGEST_WINDOW', '900'))  # segundos; 0 = envio imediato
+        self.page_size = int(os.getenv('TELEGRAM_DIGEST_PAGE_SIZE', '10'))
+        self.max_pages = int(os.getenv('TELEGRAM_DIGEST_MAX_PAGES', '3'))
+        self.memory_days = int(os.getenv('TELEGRAM_DIGEST_MEMORY_DAYS', '30'))
+        
+        self._buffers: Dict[str, Dict[str, Dict]] = {}  # chat -> chave primária -> entrada
+        self._aliases: Dict[str, Dict[str, str]] = {}  # chat -> qualquer chave -> chave primária
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+        self.stats = {'received': 0, 'duplicates': 0, 'already_sent': 0, 'digests': 0, 'messages': 0}
+        atexit.register(self._flush_on_exit)
+    
+    def add(self, jobs: List[Dict], keyword: str = "", chat_id: str = None) -> bool:
+        """Bufferiza vagas para o próximo resumo; retorna False se o Telegram não está configurado"""
+        chat = chat_id or self.default_chat_id
+        if not self.bot_token or not chat:
+            logger.warning("Telegram not configured")
+            return False
+        
+        with self._lock:
+            buffer = self._buffers.setdefault(chat, {})
+            aliases = self._aliases.setdefault(chat, {})
+            for job in jobs:
+                self.stats['received'] += 1
+                self._merge(buffer, aliases, job, job.get('keyword') or keyword)
+            
+            if buffer and chat not in self._timers and self.window > 0:
+                timer = threading.Timer(self.window, self.flush, args=[chat])
+                timer.daemon = True
+                self._timers[chat] = timer
+                timer.start()
+        
+        if self.window <= 0:
+            self.flush(chat)
+        return True
+    
+    def flush(self, chat_id: str = None) -> int:
+        """Envia o resumo pendente (de um chat ou de todos); retorna mensagens enfileiradas"""
+        chats = [chat_id] if chat_id else list(self._buffers)
+        messages = 0
+        for chat in chats:
+            with self._lock:
+                timer = self._timers.pop(chat, None)
+                entries = list(self._buffers.pop(chat, {}).values())
+                self._aliases.pop(chat, None)
+            if timer:
+                timer.cancel()
+            if entries:
+                try:
+                    messages += self._send_digest(chat, entries)
+                except Exception as e:
+                    logger.error(f"Erro enviando resumo para o chat {chat}: {e}")
+        return messages
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            buffered = {chat: len(buffer) for chat, buffer in self._buffers.items() if buffer}
+        return {**self.stats, 'buffered': buffered, 'window_seconds': self.window}
+    
+    def _merge(self, buffer: Dict, aliases: Dict, job: Dict, keyword: str):
+        keys = dedupe_keys(job)
+        if not keys:
+            return
+        
+        primary = next((aliases[key] for key in keys if key in aliases), None)
+        if primary is None:
+            primary = keys[0]
+            buffer[primary] = {'job': dict(job), 'keys': set(), 'keywords': set(), 'sources': set()}
+        else:
+            self.stats['duplicates'] += 1
+            entry = buffer[primary]
+            if (job.get('quality_score') or 0) > (entry['job'].get('quality_score') or 0):
+                entry['job'] = dict(job)
+        
+        entry = buffer[primary]
+        for key in keys:
+            aliases[key] = primary
+            entry['keys'].add(key)
+        if keyword:
+            entry['keywords'].add(keyword)
+        if job.get('source'):
+            entry['sources'].add(job['source'])
+    
+    def _send_digest(self, chat_id: str, entries: List[Dict]) -> int:
+        entries = self._drop_already_sent(chat_id, entries)
+        if not entries:
+            return 0
+        
+        entries.sort(key=lambda e: (e['job'].get('quality_score') or 0, len(e['keywords'])), reverse=True)
+        pages = [entries[i:i + self.page_size] for i in range(0, len(entries), self.page_size)]
+        shown, hidden = pages[:self.max_pages], len(entries) - sum(len(p) for p in pages[:self.max_pages])
+        
+        for number, page in enumerate(shown, 1):
+            message = self._format_page(page, number, len(shown), len(entries), (number - 1) * self.page_size)
+            if number == len(shown) and hidden:
+                message += f"➕ e mais {hidden} vagas com score menor\n"
+            telegram_queue.enqueue(self.bot_token, chat_id, message, parse_mode='Markdown')
+        
+        # Só o que foi mostrado conta como enviado; o restante pode voltar num próximo resumo
+        self._remember(chat_id, [e for page in shown for e in page])
+        self.stats['digests'] += 1
+        self.stats['messages'] += len(shown)
+        logger.info(f"Resumo enviado ao chat {chat_id}: {len(entries)} vagas em {len(shown)} mensagens")
+        return len(shown)
+    
+    def _format_page(self, page: List[Dict], number: int, total_pages: int, total_jobs: int, offset: int) -> str:
+        message = f"📬 **RESUMO - {total_jobs} NOVAS VAGAS**"
+        if total_pages > 1:
+            message += f" ({number}/{total_pages})"
+        message += "\n\n"
+        
+        for i, entry in enumerate(page, offset + 1):
+            job = entry['job']
+            message += f"{i}. **{job['title']}**\n"
+            message += f"📍 {job.get('location') or 'N/A'} | 🏢 {job.get('company') or 'N/A'}\n"
+            message += f"⭐ Score: {job.get('quality_score', 0)} | 🌐 {', '.join(sorted(entry['sources']))}"
+            if job.get('date'):
+                message += f" | 📅 {job['date']}"
+            message += "\n"
+            if entry['keywords']:
+                message += f"🔎 {', '.join(sorted(entry['keywords']))}\n"
+            message += f"🔗 {job['link']}\n\n"
+        return message
+    
+    def _drop_already_sent(self, chat_id: str, entries: List[Dict]) -> List[Dict]:
+        all_keys = {key for entry in entries for key in _remembered_keys(entry['keys'])}
+        db = SessionLocal()
+        try:
+            sent = {row.dedupe_key for row in db.query(NotifiedJob.dedupe_key).filter(
+                NotifiedJob.chat_id == chat_id,
+                NotifiedJob.dedupe_key.in_(all_keys)
+            )}
+        except Exception as e:
+            logger.warning(f"Não foi possível consultar vagas já enviadas: {e}")
+            sent = set()
+        finally:
+            db.close()
+        
+        fresh = [entry for entry in entries if not _remembered_keys(entry['keys']) & sent]
+        self.stats['already_sent'] += len(entries) - len(fresh)
+        return fresh
+    
+    def _remember(self, chat_id: str, entries: List[Dict]):
+        keys = set().union(*(_remembered_keys(entry['keys']) for entry in entries))
+        db = SessionLocal()
+        try:
+            # Uma savepoint por chave: chave já gravada (outro processo, envio anterior) não
+            # derruba as demais
+            for key in keys:
+                try:
+                    with db.begin_nested():
+                        db.add(NotifiedJob(chat_id=chat_id, dedupe_key=key))
+                except IntegrityError:
+                    pass
+            db.query(NotifiedJob).filter(
+                NotifiedJob.sent_at < datetime.utcnow() - timedelta(days=self.memory_days)
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Não foi possível registrar vagas enviadas: {e}")
+        finally:
+            db.close()
+    
+    def _flush_on_exit(self):
+        if any(self._buffers.values()):
+            self.flush()
+            telegram_queue.flush()
+
+# Instância global
+notification_digest = NotificationDigest()
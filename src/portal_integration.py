@@ -1,51 +1,209 @@
 import requests
 import os
+import time
+import threading
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from loguru import logger
 from datetime import datetime
+from .metrics import LatencyHistogram, PORTAL_REQUEST_SECONDS, PORTAL_ERRORS
+
+# Respostas de /jobs/batch que indicam portal sem suporte a lote
+BATCH_UNSUPPORTED_STATUS = {404, 405, 501}
 
 class PortalIntegration:
     def __init__(self):
         self.portal_api_url = os.getenv('PORTAL_API_URL', 'http://localhost:8080/api')
         self.portal_admin_token = os.getenv('PORTAL_ADMIN_TOKEN', '')
         self.ong_employer_id = os.getenv('ONG_EMPLOYER_ID', '1')  # ID do empregador ONG
+        from .ai_filter import AIJobFilter  # numpy só carrega quando o componente é criado
+        self.ai_filter = AIJobFilter()
+        self.max_workers = int(os.getenv('PORTAL_MAX_WORKERS', '8'))
+        self.timeout = (
+            float(os.getenv('PORTAL_CONNECT_TIMEOUT', '5')),
+            float(os.getenv('PORTAL_TIMEOUT', '30'))
+        )
+        self.batch_size = max(1, int(os.getenv('PORTAL_BATCH_SIZE', '50')))
+        self._batch_supported: Optional[bool] = None  # descoberto na primeira chamada
+        self.session = self._create_session()
+        self.latency = {'create': LatencyHistogram(), 'approve': LatencyHistogram(), 'batch': LatencyHistogram()}
+        self.errors = {'create': 0, 'approve': 0, 'batch': 0}
+        self._errors_lock = threading.Lock()
         
+    def _create_session(self) -> requests.Session:
+        """Sessão HTTP com keep-alive e pool dimensionado para as entregas concorrentes"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
+            'Authorization': f'Bearer {self.portal_admin_token}',
+            'Content-Type': 'application/json'
+        })
+        return session
+    
     def send_jobs_to_portal(self, jobs: List[Dict], auto_approve: bool = False) -> Dict:
-        """Envia vagas para o portal principal"""
+        """Envia vagas para o portal principal
+        
+        Usa o endpoint de lote quando o portal suporta; caso contrário, uma
+        chamada por vaga. `results` traz o resultado de cada vaga, na mesma
+        ordem e com o `pending_job_id` (campo 'id' da vaga), quando houver.
+        """
         if not jobs:
             return {"status": "no_jobs", "sent": 0}
-            
-        sent_count = 0
-        failed_jobs = []
         
-        for job in jobs:
-            try:
-                job_data = self._format_job_for_portal(job)
-                
-                # Criar vaga no portal
-                response = self._create_job_in_portal(job_data)
-                
-                if response.get('success'):
-                    job_id = response.get('job_id')
-                    
-                    # Auto-aprovar se configurado
-                    if auto_approve and job_id:
-                        self._approve_job_in_portal(job_id)
-                    
-                    sent_count += 1
-                    logger.info(f"Vaga enviada: {job['title']} -> ID: {job_id}")
-                else:
-                    failed_jobs.append(job['title'])
-                    
-            except Exception as e:
-                logger.error(f"Erro enviando vaga {job['title']}: {e}")
-                failed_jobs.append(job['title'])
+        if self.batch_size > 1 and self._batch_supported is not False:
+            results = self._send_in_batches(jobs, auto_approve)
+        else:
+            results = self._send_individually(jobs, auto_approve)
+        
+        for job, result in zip(jobs, results):
+            result['pending_job_id'] = job.get('id')
+        
+        sent_count = sum(1 for result in results if result['success'])
+        failed_jobs = [job['title'] for job, result in zip(jobs, results) if not result['success']]
         
         return {
             "status": "completed",
             "sent": sent_count,
             "failed": len(failed_jobs),
-            "failed_jobs": failed_jobs
+            "failed_jobs": failed_jobs,
+            "results": results
+        }
+    
+    def _send_individually(self, jobs: List[Dict], auto_approve: bool) -> List[Dict]:
+        workers = min(self.max_workers, len(jobs))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda job: self._deliver_job(job, auto_approve), jobs))
+    
+    def _send_in_batches(self, jobs: List[Dict], auto_approve: bool) -> List[Dict]:
+        """Envia em blocos de PORTAL_BATCH_SIZE; blocos recusados caem para chamadas individuais"""
+        chunks = [jobs[i:i + self.batch_size] for i in range(0, len(jobs), self.batch_size)]
+        workers = min(self.max_workers, len(chunks))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunk_results = list(executor.map(lambda chunk: self._deliver_batch(chunk, auto_approve), chunks))
+        
+        results: List[Optional[Dict]] = []
+        fallback = []
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            if chunk_result is None:
+                fallback.extend(range(len(results), len(results) + len(chunk)))
+                results.extend([None] * len(chunk))
+            else:
+                results.extend(chunk_result)
+        
+        if fallback:
+            for index, result in zip(fallback, self._send_individually([jobs[i] for i in fallback], auto_approve)):
+                results[index] = result
+        return results
+    
+    def _deliver_batch(self, chunk: List[Dict], auto_approve: bool) -> Optional[List[Dict]]:
+        """Cria (e opcionalmente aprova) um bloco de vagas numa única chamada
+        
+        Protocolo: POST {PORTAL_API_URL}/jobs/batch com {"jobs": [...], "approve": bool};
+        resposta 200/201/207 com {"results": [{"index", "id", "approved", "error"}]}.
+        Cada item leva seu idempotencyKey, quando houver. Retorna None se o
+        portal não suporta lote.
+        """
+        results = [None] * len(chunk)
+        payload, positions = [], []
+        for index, job in enumerate(chunk):
+            try:
+                job_data = self._format_job_for_portal(job)
+                if job.get('idempotency_key'):
+                    job_data['idempotencyKey'] = job['idempotency_key']
+                payload.append(job_data)
+                positions.append(index)
+            except Exception as e:
+                logger.error(f"Erro formatando vaga {job.get('title')}: {e}")
+                results[index] = {"success": False, "error": str(e)}
+        
+        if not payload:
+            return results
+        
+        start = time.perf_counter()
+        try:
+            response = self.session.post(
+                f"{self.portal_api_url}/jobs/batch",
+                json={"jobs": payload, "approve": auto_approve},
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            self._record_error('batch')
+            logger.error(f"Portal batch request failed: {e}")
+            return [result or {"success": False, "error": str(e)} for result in results]
+        finally:
+            self._observe('batch', time.perf_counter() - start)
+        
+        if response.status_code in BATCH_UNSUPPORTED_STATUS:
+            if self._batch_supported is not False:
+                logger.warning("Portal não suporta envio em lote; usando chamadas individuais")
+            self._batch_supported = False
+            return None
+        
+        if response.status_code not in (200, 201, 207):
+            self._record_error('batch')
+            logger.error(f"Portal batch error: {response.status_code} - {response.text}")
+            return [result or {"success": False, "error": response.text} for result in results]
+        
+        self._batch_supported = True
+        items = response.json().get('results', [])
+        for position, item in enumerate(items):
+            index = item.get('index', position)
+            if not 0 <= index < len(positions):
+                continue
+            job = chunk[positions[index]]
+            
+            if item.get('id') and not item.get('error'):
+                # Aprovação que falhou no lote é refeita individualmente
+                if auto_approve and item.get('approved') is False:
+                    self._approve_job_in_portal(item['id'])
+                logger.info(f"Vaga enviada: {job['title']} -> ID: {item['id']}")
+                results[positions[index]] = {"success": True, "job_id": item['id']}
+            else:
+                results[positions[index]] = {"success": False, "error": item.get('error') or 'erro desconhecido'}
+        
+        return [result or {"success": False, "error": "vaga ausente na resposta do portal"} for result in results]
+    
+    def _deliver_job(self, job: Dict, auto_approve: bool) -> Dict:
+        """Cria (e opcionalmente aprova) uma vaga no portal"""
+        try:
+            job_data = self._format_job_for_portal(job)
+            
+            # Criar vaga no portal
+            response = self._create_job_in_portal(job_data, job.get('idempotency_key'))
+            
+            if response.get('success'):
+                job_id = response.get('job_id')
+                
+                # Auto-aprovar se configurado
+                if auto_approve and job_id:
+                    self._approve_job_in_portal(job_id)
+                
+                logger.info(f"Vaga enviada: {job['title']} -> ID: {job_id}")
+                return {"success": True, "job_id": job_id}
+            
+            return {"success": False, "error": response.get('error')}
+            
+        except Exception as e:
+            logger.error(f"Erro enviando vaga {job['title']}: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def _observe(self, operation: str, seconds: float):
+        self.latency[operation].observe(seconds)
+        PORTAL_REQUEST_SECONDS.labels(operation).observe(seconds)
+    
+    def _record_error(self, operation: str):
+        with self._errors_lock:
+            self.errors[operation] += 1
+        PORTAL_ERRORS.labels(operation).inc()
+    
+    def get_delivery_stats(self) -> Dict:
+        """Histogramas de latência e erros das chamadas ao portal"""
+        return {
+            operation: {**histogram.snapshot(), "errors": self.errors[operation]}
+            for operation, histogram in self.latency.items()
         }
     
     def _format_job_for_portal(self, job: Dict) -> Dict:
@@ -65,55 +223,55 @@ class PortalIntegration:
             "companyId": self.ong_employer_id
         }
     
-    def _create_job_in_portal(self, job_data: Dict) -> Dict:
+    def _create_job_in_portal(self, job_data: Dict, idempotency_key: str = None) -> Dict:
         """Cria vaga no portal via API"""
-        headers = {
-            'Authorization': f'Bearer {self.portal_admin_token}',
-            'Content-Type': 'application/json'
-        }
-        
+        start = time.perf_counter()
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.portal_api_url}/jobs",
                 json=job_data,
-                headers=headers,
-                timeout=30
+                headers={'Idempotency-Key': idempotency_key} if idempotency_key else None,
+                timeout=self.timeout
             )
             
-            if response.status_code == 201:
+            # 200: portal devolveu a vaga já criada com a mesma chave de idempotência
+            if response.status_code in (200, 201):
                 return {"success": True, "job_id": response.json().get('id')}
             else:
+                self._record_error('create')
                 logger.error(f"Portal API error: {response.status_code} - {response.text}")
                 return {"success": False, "error": response.text}
                 
         except requests.RequestException as e:
+            self._record_error('create')
             logger.error(f"Portal API request failed: {e}")
             return {"success": False, "error": str(e)}
+        finally:
+            self._observe('create', time.perf_counter() - start)
     
     def _approve_job_in_portal(self, job_id: int) -> bool:
         """Aprova vaga automaticamente no portal"""
-        headers = {
-            'Authorization': f'Bearer {self.portal_admin_token}',
-            'Content-Type': 'application/json'
-        }
-        
+        start = time.perf_counter()
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.portal_api_url}/admin/jobs/{job_id}/approve",
-                headers=headers,
-                timeout=30
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
                 logger.info(f"Vaga {job_id} aprovada automaticamente")
                 return True
             else:
+                self._record_error('approve')
                 logger.error(f"Erro aprovando vaga {job_id}: {response.text}")
                 return False
                 
         except requests.RequestException as e:
+            self._record_error('approve')
             logger.error(f"Erro na aprovação automática: {e}")
             return False
+        finally:
+            self._observe('approve', time.perf_counter() - start)
     
     def _generate_description(self, job: Dict) -> str:
         """Gera descrição formatada da vaga"""
@@ -158,37 +316,18 @@ class PortalIntegration:
         # Implementar extração de salário do título/descrição
         return None
     
+    def _features(self, job: Dict) -> Dict:
+        """Features derivadas da vaga (memoizadas por conteúdo)"""
+        return self.ai_filter.derive_features([job])[0]
+    
     def _determine_work_type(self, job: Dict) -> str:
         """Determina tipo de trabalho"""
-        title_desc = (job['title'] + ' ' + job.get('location', '')).lower()
-        
-        if 'remoto' in title_desc or 'home office' in title_desc:
-            return 'REMOTE'
-        elif 'hibrido' in title_desc:
-            return 'HYBRID'
-        else:
-            return 'ON_SITE'
+        return self._features(job)['work_type']
     
     def _determine_contract_type(self, job: Dict) -> str:
         """Determina tipo de contrato"""
-        title = job['title'].lower()
-        
-        if 'estagio' in title:
-            return 'INTERNSHIP'
-        elif 'freelancer' in title or 'autonomo' in title:
-            return 'FREELANCE'
-        else:
-            return 'CLT'
+        return self._features(job)['contract_type']
     
     def _determine_seniority(self, job: Dict) -> str:
         """Determina nível de senioridade"""
-        title = job['title'].lower()
-        
-        if 'junior' in title or 'jr' in title or 'estagio' in title:
-            return 'JUNIOR'
-        elif 'senior' in title or 'sr' in title:
-            return 'SENIOR'
-        elif 'pleno' in title or 'pl' in title:
-            return 'MID_LEVEL'
-        else:
-            return 'MID_LEVEL'  # Default
\ No newline at end of file
+        return self._features(job)['seniority_level']
\ No newline at end of file
@@ -0,0 +1,254 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, func, or_, and_
+from sqlalchemy.orm import Session
+from .database import Base, SessionLocal
+from .approval_system import ApprovalSystem, PendingJob
+from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from loguru import logger
+import asyncio
+import os
+import random
+import threading
+import uuid
+
+# Namespace fixo: a mesma vaga pendente gera sempre a mesma chave de idempotência
+IDEMPOTENCY_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'portal-vagas-scraper/portal-outbox')
+
+class PortalOutboxEntry(Base):
+    __tablename__ = "portal_outbox"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    pending_job_id = Column(Integer, nullable=False, unique=True, index=True)
+    idempotency_key = Column(String, nullable=False, unique=True)
+    auto_approve = Column(Boolean, default=False)
+    status = Column(String, default="pending", index=True)  # pending, in_flight, sent, dead
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    locked_until = Column(DateTime)
+    portal_job_id = Column(Integer)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+
+class PortalOutbox:
+    """Fila persistente de envios ao portal
+    
+    Cada vaga aprovada entra uma única vez; o dispatcher reivindica as entradas
+    vencidas, envia com chave de idempotência e grava o resultado. Entradas
+    presas em 'in_flight' (processo morreu no meio) voltam à fila quando o
+    lease expira e são reenviadas com a mesma chave.
+    """
+    
+    def __init__(self, portal_integration=None, approval_system: ApprovalSystem = None):
+        if portal_integration is None:
+            from .portal_integration import PortalIntegration  # requests
+            portal_integration = PortalIntegration()
+        self.portal_integration = portal_integration
+        self.approval_system = approval_system or ApprovalSystem()
+        self.max_attempts = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8'))
+        self.backoff_base = float(os.getenv('OUTBOX_BACKOFF_BASE', '30'))  # segundos
+        self.backoff_max = float(os.getenv('OUTBOX_BACKOFF_MAX', '3600'))
+        self.lease_seconds = int(os.getenv('OUTBOX_LEASE_SECONDS', '300'))
+        self.poll_interval = float(os.getenv('OUTBOX_POLL_INTERVAL', '10'))
+        self.claim_size = int(os.getenv('OUTBOX_CLAIM_SIZE', '200'))
+        self._drain_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def enqueue(self, pending_job_ids: List[int], db: Session, auto_approve: bool = False) -> Dict:
+        """Coloca vagas aprovadas na fila; vagas já enfileiradas são ignoradas"""
+        approved_ids = {row.id for row in db.query(PendingJob.id).filter(
+            PendingJob.id.in_(pending_job_ids),
+            PendingJob.status == "approved"
+        )}
+        queued_ids = {row.pending_job_id for row in db.query(PortalOutboxEntry.pending_job_id).filter(
+            PortalOutboxEntry.pending_job_id.in_(approved_ids)
+        )} if approved_ids else set()
+        
+        new_ids = sorted(approved_ids - queued_ids)
+        for pending_job_id in new_ids:
+            db.add(PortalOutboxEntry(
+                pending_job_id=pending_job_id,
+                idempotency_key=str(uuid.uuid5(IDEMPOTENCY_NAMESPACE, str(pending_job_id))),
+                auto_approve=auto_approve
+            ))
+        db.commit()
+        return {"enqueued": len(new_ids), "already_queued": len(queued_ids)}
+    
+    def enqueue_approved(self, db: Session, auto_approve: bool = False) -> Dict:
+        """Enfileira todas as vagas aprovadas que ainda não estão na fila"""
+        queued = db.query(PortalOutboxEntry.pending_job_id)
+        ids = [row.id for row in db.query(PendingJob.id).filter(
+            PendingJob.status == "approved",
+            ~PendingJob.id.in_(queued)
+        )]
+        if not ids:
+            return {"enqueued": 0, "already_queued": queued.count()}
+        return self.enqueue(ids, db, auto_approve)
+    
+    def drain(self) -> Dict:
+        """Envia tudo o que está vencido na fila; retorna o resumo da rodada"""
+        summary = {"sent": 0, "failed": 0, "dead": 0, "failed_jobs": []}
+        
+        # Uma drenagem por processo; outras instâncias são separadas pelo claim no banco
+        if not self._drain_lock.acquire(blocking=False):
+            return {**summary, "status": "busy"}
+        
+        try:
+            while True:
+                db = SessionLocal()
+                try:
+                    entries = self._claim(db)
+                    if not entries:
+                        break
+                    self._dispatch(entries, db, summary)
+                finally:
+                    db.close()
+        finally:
+            self._drain_lock.release()
+        
+        if summary["sent"] or summary["failed"]:
+            logger.info(f"Outbox do portal: {summary['sent']} enviadas, {summary['failed']} com falha "
+                        f"({summary['dead']} esgotaram as tentativas)")
+        return {**summary, "status": "completed"}
+    
+    def get_stats(self, db: Session) -> Dict:
+        """Contadores por status e próxima tentativa agendada"""
+        counts = dict(db.query(PortalOutboxEntry.status, func.count(PortalOutboxEntry.id)).group_by(
+            PortalOutboxEntry.status
+        ).all())
+        next_retry = db.query(func.min(PortalOutboxEntry.next_attempt_at)).filter(
+            PortalOutboxEntry.status == "pending"
+        ).scalar()
+        return {
+            "pending": counts.get("pending", 0),
+            "in_flight": counts.get("in_flight", 0),
+            "sent": counts.get("sent", 0),
+            "dead": counts.get("dead", 0),
+            "next_attempt_at": next_retry
+        }
+    
+    def _claim(self, db: Session) -> List[PortalOutboxEntry]:
+        """Reivindica entradas vencidas (ou com lease expirado) via UPDATE condicional"""
+        now = datetime.utcnow()
+        due = or_(
+            and_(PortalOutboxEntry.status == "pending", PortalOutboxEntry.next_attempt_at <= now),
+            and_(PortalOutboxEntry.status == "in_flight", PortalOutboxEntry.locked_until < now)
+        )
+        candidates = db.query(PortalOutboxEntry.id).filter(due).order_by(
+            PortalOutboxEntry.next_attempt_at
+        ).limit(self.claim_size).all()
+        if not candidates:
+            return []
+        
+        # O filtro é reavaliado no UPDATE: linhas levadas por outra instância ficam de fora
+        token = now + timedelta(seconds=self.lease_seconds)
+        db.query(PortalOutboxEntry).filter(
+            PortalOutboxEntry.id.in_([row.id for row in candidates]),
+            due
+        ).update({"status": "in_flight", "locked_until": token}, synchronize_session=False)
+        db.commit()
+        
+        return db.query(PortalOutboxEntry).filter(
+            PortalOutboxEntry.id.in_([row.id for row in candidates]),
+            PortalOutboxEntry.status == "in_flight",
+            PortalOutboxEntry.locked_until == token
+        ).all()
+    
+    def _dispatch(self, entries: List[PortalOutboxEntry], db: Session, summary: Dict):
+        jobs = {job.id: job for job in db.query(PendingJob).filter(
+            PendingJob.id.in_([entry.pending_job_id for entry in entries])
+        )}
+        
+        results = []
+        for auto_approve in (False, True):
+            group = [entry for entry in entries if bool(entry.auto_approve) == auto_approve]
+            payload = [self._job_payload(jobs[entry.pending_job_id], entry)
+                       for entry in group if entry.pending_job_id in jobs]
+            if payload:
+                results.extend(self.portal_integration.send_jobs_to_portal(payload, auto_approve)['results'])
+        
+        by_id = {result['pending_job_id']: result for result in results}
+        now = datetime.utcnow()
+        for entry in entries:
+            result = by_id.get(entry.pending_job_id) or {"success": False, "error": "vaga pendente não encontrada"}
+            entry.locked_until = None
+            
+            if result['success']:
+                entry.status = "sent"
+                entry.portal_job_id = result.get('job_id')
+                entry.sent_at = now
+                entry.last_error = None
+                summary["sent"] += 1
+                continue
+            
+            entry.attempts = (entry.attempts or 0) + 1
+            entry.last_error = str(result.get('error') or '')[:1000]
+            summary["failed"] += 1
+            summary["failed_jobs"].append(entry.pending_job_id)
+            if entry.attempts >= self.max_attempts:
+                entry.status = "dead"
+                summary["dead"] += 1
+            else:
+                entry.status = "pending"
+                entry.next_attempt_at = now + timedelta(seconds=self._backoff(entry.attempts))
+        
+        db.commit()
+        self.approval_system.record_portal_results(results, db)
+    
+    def _backoff(self, attempts: int) -> float:
+        """Backoff exponencial com jitter"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+    
+    def _job_payload(self, job: PendingJob, entry: PortalOutboxEntry) -> Dict:
+        return {
+            'id': job.id,
+            'title': job.title,
+            'company': job.company,
+            'location': job.location,
+            'source': job.source,
+            'link': job.link,
+            'quality_score': job.quality_score,
+            'idempotency_key': entry.idempotency_key
+        }
+    
+    # Dispatcher em segundo plano
+    
+    def start(self):
+        """Inicia o dispatcher no event loop atual (chamar no startup da API)"""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Dispatcher da outbox do portal iniciado")
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def wakeup(self):
+        """Antecipa a próxima drenagem (seguro a partir de qualquer thread)"""
+        if self._wakeup is None or self._task is None:
+            return
+        loop = self._task.get_loop()
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(self._wakeup.set)
+    
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.drain)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro drenando outbox do portal: {e}")
+            
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
@@ -0,0 +1,199 @@
+from contextlib import contextmanager
+from collections import Counter
+from typing import Dict, List, Optional
+from datetime import datetime
+from pathlib import Path
+from loguru import logger
+import os
+import random
+import re
+import sys
+import threading
+
+PROFILE_HEADER = 'X-Profile'
+
+# Frames do topo que indicam thread ociosa (espera em lock, fila ou selector)
+IDLE_MODULES = ('threading.py', 'queue.py', 'selectors.py')
+
+_local = threading.local()
+
+class Profile:
+    """Amostras de um perfil: pilha dobrada ("a;b;c") -> quantidade"""
+    
+    def __init__(self, kind: str, label: str = None):
+        self.kind = kind
+        self.label = label
+        self.started_at = datetime.utcnow()
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+    
+    @property
+    def filename(self) -> str:
+        return f"{self.kind}-{self.label or 'anon'}-{self.started_at:%Y%m%dT%H%M%S}.folded"
+
+class Sampler(threading.Thread):
+    """Thread que lê as pilhas a cada `interval` segundos
+    
+    Com `thread_id`, amostra só aquela thread (tempo de parede da execução,
+    esperas incluídas). Sem, amostra todas as threads ocupadas do processo,
+    com o nome da thread como raiz, para cobrir o que a requisição delega a
+    outras threads (asyncio.to_thread).
+    """
+    
+    def __init__(self, profile: Profile, interval: float, thread_id: int = None):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.profile = profile
+        self.interval = interval
+        self.thread_id = thread_id
+        self._stop_event = threading.Event()
+        self._labels: Dict = {}  # code object -> rótulo do frame
+    
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_id is not None:
+                frame = frames.get(self.thread_id)
+                if frame is not None:
+                    self._add(self._stack(frame))
+                continue
+            
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in frames.items():
+                if thread_id == own_id or frame.f_code.co_filename.endswith(IDLE_MODULES):
+                    continue
+                self._add(f"{names.get(thread_id, thread_id)};{self._stack(frame)}")
+    
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+    
+    def _add(self, stack: str):
+        self.profile.samples[stack] += 1
+        self.profile.sample_count += 1
+    
+    def _stack(self, frame) -> str:
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            labels.append(label)
+            frame = frame.f_back
+        return ';'.join(reversed(labels))
+
+class SamplingProfiler:
+    """Profiler estatístico opcional para execuções de scraping e requisições
+    
+    Desligado (PROFILE_SAMPLE_RATE=0, sem header nem ativação pelo admin), o
+    custo é uma comparação por execução/requisição. Ligado, uma thread lê a
+    pilha a cada PROFILE_INTERVAL_MS e, no fim, grava um arquivo de pilhas
+    dobradas (formato do flamegraph.pl / speedscope) em PROFILE_PATH,
+    nomeado pelo run_id ou pelo id da requisição.
+    """
+    
+    def __init__(self):
+        self.path = Path(os.getenv('PROFILE_PATH', 'data/profiles'))
+        self.sample_rate = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+        self.interval = float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000
+        self.max_files = int(os.getenv('PROFILE_MAX_FILES', '200'))
+        self.allow_header = os.getenv('PROFILE_ALLOW_HEADER', 'false').lower() == 'true'  # X-Profile de qualquer cliente
+        self.pending = 0  # próximas execuções/requisições a perfilar (ativado pelo admin)
+        self._lock = threading.Lock()
+    
+    def should_profile(self, force: bool = False) -> bool:
+        if force:
+            return True
+        if self.pending:
+            with self._lock:
+                if self.pending:
+                    self.pending -= 1
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+    
+    def requested(self, headers) -> bool:
+        """Header X-Profile: 1 pede o perfil da requisição (ou da execução que ela cria)
+        
+        Ignorado sem PROFILE_ALLOW_HEADER=true: a API não autentica, e cada
+        perfil forçado custa uma thread de amostragem e um arquivo em disco.
+        """
+        return self.allow_header and headers.get(PROFILE_HEADER, '').lower() in ('1', 'true', 'yes')
+    
+    def configure(self, sample_rate: float = None, next_count: int = None) -> Dict:
+        """Ajuste em tempo de execução (só neste processo)"""
+        with self._lock:
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            if next_count is not None:
+                self.pending = next_count
+        return self.get_stats()
+    
+    @contextmanager
+    def profile(self, kind: str, label: str = None, force: bool = False, all_threads: bool = False):
+        """Perfila o bloco se sorteado; produz o Profile (ou None, sem custo)"""
+        if not self.should_profile(force):
+            yield None
+            return
+        
+        profile = Profile(kind, label)
+        sampler = Sampler(profile, self.interval, None if all_threads else threading.get_ident())
+        previous = getattr(_local, 'profile', None)
+        _local.profile = profile
+        sampler.start()
+        try:
+            yield profile
+        finally:
+            sampler.stop()
+            _local.profile = previous
+            self._write(profile)
+    
+    def attach(self, run) -> Optional[str]:
+        """Nomeia o perfil ativo desta thread pela execução e o liga ao ScrapingRun"""
+        profile = getattr(_local, 'profile', None)
+        if profile is None:
+            return None
+        profile.label = str(run.id)
+        run.profile = profile.filename
+        return profile.filename
+    
+    def list_profiles(self, limit: int = 50) -> List[Dict]:
+        files = sorted(self.path.glob('*.folded'), key=lambda f: f.stat().st_mtime, reverse=True)[:limit]
+        return [{
+            'name': f.name,
+            'size_kb': round(f.stat().st_size / 1024, 1),
+            'created_at': datetime.utcfromtimestamp(f.stat().st_mtime)
+        } for f in files]
+    
+    def get_profile_path(self, name: str) -> Optional[Path]:
+        if not re.fullmatch(r'[\w.-]+\.folded', name):
+            return None
+        path = self.path / name
+        return path if path.exists() else None
+    
+    def get_stats(self) -> Dict:
+        return {
+            'path': str(self.path),
+            'sample_rate': self.sample_rate,
+            'interval_ms': round(self.interval * 1000, 1),
+            'pending': self.pending,
+            'files': len(list(self.path.glob('*.folded'))) if self.path.exists() else 0
+        }
+    
+    def _write(self, profile: Profile):
+        if not profile.samples:
+            return
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            target = self.path / profile.filename
+            target.write_text(''.join(f"{stack} {count}\n" for stack, count in profile.samples.most_common()))
+            logger.info(f"Perfil gravado: {target} ({profile.sample_count} amostras)")
+            
+            files = sorted(self.path.glob('*.folded'), key=lambda f: f.stat().st_mtime)
+            for old in files[:max(0, len(files) - self.max_files)]:
+                old.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o perfil {profile.filename}: {e}")
+
+# Instância global
+profiler = SamplingProfiler()
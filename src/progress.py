@@ -0,0 +1,21 @@
+from contextlib import contextmanager
+from typing import Callable
+import threading
+
+_local = threading.local()
+
+def report(**increments):
+    """Informa progresso (ex.: pages=1, jobs=12) à execução corrente desta thread, se houver"""
+    callback = getattr(_local, 'callback', None)
+    if callback:
+        callback(**increments)
+
+@contextmanager
+def reporting(callback: Callable):
+    """Direciona os `report` desta thread para `callback` durante o bloco"""
+    previous = getattr(_local, 'callback', None)
+    _local.callback = callback
+    try:
+        yield
+    finally:
+        _local.callback = previous
@@ -1,56 +1,43 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-from datetime import datetime
 from loguru import logger
-from .scraper import JobScraper
-from .telegram_bot import TelegramNotifier
-import asyncio
+from .scheduling_service import scheduling_service
+import uuid
 
 class SchedulerManager:
+    """Agendamentos recorrentes criados pelo painel admin
+    
+    Fachada sobre o serviço único de agendamento: os jobs ficam no job store
+    persistente, com ids únicos.
+    """
+    
     def __init__(self):
-        self.scheduler = AsyncIOScheduler()
-        self.scraper = JobScraper()
-        self.notifier = TelegramNotifier()
-        self.active_jobs = []
+        self.service = scheduling_service
+        self.scheduler = scheduling_service.scheduler
         
     def start(self):
         """Inicia o scheduler"""
-        self.scheduler.start()
+        self.service.start()
         logger.info("Scheduler iniciado")
     
-    def stop(self):
+    async def stop(self):
         """Para o scheduler"""
-        self.scheduler.shutdown()
+        await self.service.shutdown()
         logger.info("Scheduler parado")
     
-    def add_recurring_job(self, keywords: list, schedule: str, sites: list = None):
+    def add_recurring_job(self, keywords: list, schedule: str, sites: list = None, job_id: str = None):
         """Adiciona job recorrente
         
         Args:
             keywords: Lista de palavras-chave
             schedule: Cron expression (ex: '0 9 * * *' para 9h todo dia)
             sites: Lista de sites para buscar
+            job_id: Id fixo (substitui o job existente); gerado se omitido
         """
         if not sites:
             sites = ['infojobs', 'linkedin', 'catho']
             
-        job_id = f"job_{len(self.active_jobs)}"
-        
-        self.scheduler.add_job(
-            func=self._execute_scraping,
-            trigger=CronTrigger.from_crontab(schedule),
-            args=[keywords, sites],
-            id=job_id,
-            name=f"Scraping: {', '.join(keywords)}"
-        )
+        job_id = job_id or f"job_{uuid.uuid4().hex[:12]}"
         
-        self.active_jobs.append({
-            'id': job_id,
-            'keywords': keywords,
-            'schedule': schedule,
-            'sites': sites,
-            'created_at': datetime.now()
-        })
+        self.service.add_recurring_scrape(job_id, keywords, schedule, sites)
         
         logger.info(f"Job agendado: {job_id} - {schedule}")
         return job_id
@@ -58,8 +45,7 @@ class SchedulerManager:
     def remove_job(self, job_id: str):
         """Remove job agendado"""
         try:
-            self.scheduler.remove_job(job_id)
-            self.active_jobs = [j for j in self.active_jobs if j['id'] != job_id]
+            self.service.remove_job(job_id)
             logger.info(f"Job removido: {job_id}")
             return True
         except Exception as e:
@@ -68,33 +54,21 @@ class SchedulerManager:
     
     def get_active_jobs(self):
         """Retorna jobs ativos"""
-        return self.active_jobs
+        return [
+            {
+                'id': job.id,
+                'keywords': job.kwargs.get('keywords', []),
+                'schedule': str(job.trigger),
+                'sites': job.kwargs.get('sites', []),
+                'next_run': job.next_run_time
+            }
+            for job in self.service.get_jobs('job_')
+        ]
     
     async def _execute_scraping(self, keywords: list, sites: list):
         """Executa scraping agendado"""
-        try:
-            logger.info(f"Executando scraping agendado: {keywords}")
-            
-            all_jobs = []
-            for keyword in keywords:
-                for site in sites:
-                    if site == 'infojobs':
-                        jobs = self.scraper.scrape_infojobs(keyword)
-                        all_jobs.extend(jobs)
-            
-            if all_jobs:
-                # Enviar para Telegram
-                for keyword in keywords:
-                    keyword_jobs = [j for j in all_jobs if keyword.lower() in j['title'].lower()]
-                    if keyword_jobs:
-                        self.notifier.send_jobs(keyword_jobs[:5], keyword)
-                
-                logger.info(f"Scraping concluído: {len(all_jobs)} vagas encontradas")
-            else:
-                logger.info("Nenhuma vaga nova encontrada")
-                
-        except Exception as e:
-            logger.error(f"Erro no scraping agendado: {e}")
+        logger.info(f"Executando scraping agendado: {keywords}")
+        return await self.service.dispatch([{'keyword': keyword, 'sites': sites} for keyword in keywords])
     
     def add_preset_schedules(self):
         """Adiciona agendamentos pré-definidos para ONGs"""
@@ -103,21 +77,24 @@ class SchedulerManager:
         self.add_recurring_job(
             keywords=['desenvolvedor', 'programador', 'analista sistemas'],
             schedule='0 9,14,18 * * *',  # 9h, 14h, 18h
-            sites=['infojobs', 'linkedin']
+            sites=['infojobs', 'linkedin'],
+            job_id='job_preset_ti'
         )
         
         # Vagas administrativas - 2x por dia  
         self.add_recurring_job(
             keywords=['assistente administrativo', 'auxiliar administrativo', 'recepcionista'],
             schedule='0 10,16 * * *',  # 10h, 16h
-            sites=['infojobs', 'catho']
+            sites=['infojobs', 'catho'],
+            job_id='job_preset_administrativo'
         )
         
         # Vagas de vendas - 1x por dia
         self.add_recurring_job(
             keywords=['vendedor', 'consultor vendas', 'representante comercial'],
             schedule='0 11 * * *',  # 11h
-            sites=['infojobs']
+            sites=['infojobs'],
+            job_id='job_preset_vendas'
         )
         
         logger.info("Agendamentos pré-definidos adicionados")
\ No newline at end of file
@@ -0,0 +1,623 @@
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.events import EVENT_JOB_SUBMITTED
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.exc import IntegrityError
+from .database import Base, SessionLocal, engine, ScrapingRun, ScrapedJob
+from .telegram_bot import TelegramNotifier
+from .approval_system import ApprovalSystem
+from .events import broadcaster, serialize_run
+from .notification_digest import notification_digest
+from .work_queue import work_queue
+from .batch_checkpoint import batch_checkpoint
+from . import tracing
+from .profiling import profiler
+from .metrics import DB_INGEST_SECONDS, DB_INGEST_JOBS, SCHEDULER_QUEUE_DEPTH, SCHEDULER_LAG_SECONDS
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+from collections import deque
+from contextlib import contextmanager
+from loguru import logger
+import asyncio
+import heapq
+import itertools
+import os
+import socket
+import threading
+import time
+import uuid
+
+DEFAULT_SITES = ['infojobs', 'linkedin', 'catho']
+DEFAULT_SITE_DURATION = 60.0  # segundos, até haver execuções medidas
+
+def cron_interval(schedule: str, samples: int = 8) -> float:
+    """Menor intervalo (s) entre disparos consecutivos de uma expressão cron"""
+    trigger = CronTrigger.from_crontab(schedule)
+    previous = trigger.get_next_fire_time(None, datetime.now(trigger.timezone))
+    gaps = []
+    for _ in range(samples):
+        following = trigger.get_next_fire_time(previous, previous + timedelta(seconds=1))
+        if following is None:
+            break
+        gaps.append((following - previous).total_seconds())
+        previous = following
+    return min(gaps) if gaps else 0.0
+
+class SchedulerLease(Base):
+    """Lease de liderança: só a instância que o detém dispara os jobs agendados"""
+    __tablename__ = "scheduler_leases"
+    
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class SchedulingService:
+    """Serviço único de agendamento
+    
+    Um AsyncIOScheduler com job store SQL (os jobs sobrevivem a restarts e são
+    compartilhados entre réplicas), eleição de líder por lease no banco e um
+    único caminho de despacho que respeita a capacidade do grid Selenium.
+    """
+    
+    def __init__(self):
+        self.max_sessions = int(os.getenv('GRID_MAX_SESSIONS', '3'))
+        self._grid_slots = threading.BoundedSemaphore(self.max_sessions)  # sessões do grid neste processo
+        self.spread_fraction = float(os.getenv('SCHEDULER_SPREAD_FRACTION', '0.5'))
+        self.max_spread = float(os.getenv('SCHEDULER_MAX_SPREAD', '3600'))  # segundos
+        self.duration_alpha = float(os.getenv('SCHEDULER_DURATION_ALPHA', '0.3'))
+        self.lease_seconds = int(os.getenv('SCHEDULER_LEASE_SECONDS', '30'))
+        self.execution = os.getenv('SCRAPE_EXECUTION', 'local')  # local ou queue (workers separados)
+        self.queue_poll_interval = float(os.getenv('WORK_QUEUE_POLL_INTERVAL', '2'))
+        self.queue_wait_limit = float(os.getenv('WORK_QUEUE_WAIT_LIMIT', '600'))  # segundos até um worker pegar a busca
+        self.instance_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.scheduler = AsyncIOScheduler(
+            jobstores={'default': SQLAlchemyJobStore(engine=engine, tablename='apscheduler_jobs')},
+            job_defaults={'coalesce': True, 'max_instances': 1, 'misfire_grace_time': 300}
+        )
+        self._scraper = None  # criado no primeiro uso (carrega Selenium)
+        self.notifier = TelegramNotifier()
+        self.approval_system = ApprovalSystem()
+        self.is_leader = False
+        self.site_durations: Dict[str, float] = {}
+        self.batch_reports = deque(maxlen=20)
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+        self._lease_task: Optional[asyncio.Task] = None
+        self._resumed = set()
+        self._next_resume_check = 0.0
+        self.scheduler.add_listener(self._on_job_submitted, EVENT_JOB_SUBMITTED)
+        SCHEDULER_QUEUE_DEPTH.set_function(lambda: self._queue.qsize() if self._queue else 0)
+    
+    @property
+    def scraper(self):
+        """JobScraper compartilhado pelas execuções, criado na primeira"""
+        if self._scraper is None:
+            from .scraper import JobScraper
+            self._scraper = JobScraper()
+        return self._scraper
+    
+    # Ciclo de vida
+    
+    def start(self):
+        """Inicia o scheduler pausado; só o líder retoma o disparo dos jobs"""
+        if self.scheduler.running:
+            return
+        self.scheduler.start(paused=True)
+        self._lease_task = asyncio.get_event_loop().create_task(self._lease_loop())
+        logger.info(f"Serviço de agendamento iniciado ({self.instance_id})")
+    
+    async def shutdown(self):
+        for task in list(self._resumed) + self._workers:
+            task.cancel()
+        self._workers = []
+        self._queue = None
+        if self._lease_task:
+            self._lease_task.cancel()
+            self._lease_task = None
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        if self.is_leader:
+            await asyncio.to_thread(self._release_lease)
+            self.is_leader = False
+    
+    def _on_job_submitted(self, event):
+        """Atraso entre o horário previsto do job e o disparo efetivo"""
+        now = datetime.now(timezone.utc)
+        for scheduled in event.scheduled_run_times:
+            SCHEDULER_LAG_SECONDS.labels('job').observe(max(0.0, (now - scheduled).total_seconds()))
+    
+    async def _lease_loop(self):
+        while True:
+            try:
+                leader = await asyncio.to_thread(self._acquire_lease)
+            except Exception as e:
+                logger.error(f"Erro renovando lease do scheduler: {e}")
+                leader = False
+            
+            if leader and not self.is_leader:
+                logger.info(f"Instância {self.instance_id} assumiu a liderança do scheduler")
+                self.scheduler.resume()
+            elif not leader and self.is_leader:
+                logger.warning(f"Instância {self.instance_id} perdeu a liderança do scheduler")
+                self.scheduler.pause()
+            self.is_leader = leader
+            
+            if leader:
+                # Jobs adicionados por outras réplicas só aparecem no store
+                self.scheduler.wakeup()
+                if time.monotonic() >= self._next_resume_check:
+                    self._next_resume_check = time.monotonic() + batch_checkpoint.stale_seconds / 3
+                    try:
+                        await self.resume_batches()
+                    except Exception as e:
+                        logger.error(f"Erro retomando lotes: {e}")
+            await asyncio.sleep(self.lease_seconds / 3)
+    
+    def _acquire_lease(self) -> bool:
+        """Renova ou toma o lease (UPDATE condicional); cria a linha na primeira vez"""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        db = SessionLocal()
+        try:
+            updated = db.query(SchedulerLease).filter(
+                SchedulerLease.name == 'scheduler',
+                (SchedulerLease.holder == self.instance_id) | (SchedulerLease.expires_at < now)
+            ).update({'holder': self.instance_id, 'expires_at': expires_at}, synchronize_session=False)
+            if not updated:
+                if db.query(SchedulerLease).filter(SchedulerLease.name == 'scheduler').first():
+                    db.rollback()
+                    return False
+                db.add(SchedulerLease(name='scheduler', holder=self.instance_id, expires_at=expires_at))
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+        finally:
+            db.close()
+    
+    def _release_lease(self):
+        db = SessionLocal()
+        try:
+            db.query(SchedulerLease).filter(
+                SchedulerLease.name == 'scheduler',
+                SchedulerLease.holder == self.instance_id
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+    
+    # Jobs persistentes
+    
+    def add_cron_job(self, job_id: str, func: str, schedule: str, name: str = None, **kwargs):
+        """Agenda (ou substitui) um job cron; `func` é referência textual 'modulo:funcao'"""
+        return self.scheduler.add_job(
+            func,
+            trigger=CronTrigger.from_crontab(schedule),
+            id=job_id,
+            name=name or job_id,
+            kwargs=kwargs,
+            replace_existing=True
+        )
+    
+    def add_interval_job(self, job_id: str, func: str, seconds: float, name: str = None, **kwargs):
+        """Agenda (ou substitui) um job a cada `seconds` segundos"""
+        return self.scheduler.add_job(
+            func,
+            trigger=IntervalTrigger(seconds=seconds),
+            id=job_id,
+            name=name or job_id,
+            kwargs=kwargs,
+            replace_existing=True
+        )
+    
+    def add_recurring_scrape(self, job_id: str, keywords: List[str], schedule: str, sites: List[str] = None):
+        return self.add_cron_job(
+            job_id, 'src.scheduling_service:run_recurring_scrape', schedule,
+            name=f"Scraping: {', '.join(keywords)}",
+            keywords=keywords, sites=sites or DEFAULT_SITES, window=cron_interval(schedule)
+        )
+    
+    def remove_job(self, job_id: str):
+        self.scheduler.remove_job(job_id)
+    
+    def get_jobs(self, prefix: str = '') -> List:
+        return [job for job in self.scheduler.get_jobs() if job.id.startswith(prefix)]
+    
+    # Despacho com capacidade limitada
+    
+    def expand(self, searches: List[Dict]) -> List[Dict]:
+        """Quebra buscas em unidades (palavra-chave, região, site) — uma sessão do grid cada
+        
+        Ordem: prioridade maior primeiro e, dentro da mesma prioridade, sites
+        intercalados para não concentrar as requisições num único site.
+        """
+        by_priority: Dict[int, Dict[str, List[Dict]]] = {}
+        for search in searches:
+            priority = search.get('priority', 3)
+            for site in search.get('sites') or DEFAULT_SITES:
+                by_priority.setdefault(priority, {}).setdefault(site, []).append({
+                    'keyword': search['keyword'],
+                    'region': search.get('region'),
+                    'site': site,
+                    'priority': priority
+                })
+        
+        units = []
+        for priority in sorted(by_priority, reverse=True):
+            for group in itertools.zip_longest(*by_priority[priority].values()):
+                units.extend(unit for unit in group if unit)
+        return units
+    
+    def expected_duration(self, site: str) -> float:
+        return self.site_durations.get(site, DEFAULT_SITE_DURATION)
+    
+    def predict_makespan(self, units: List[Dict], release_interval: float = 0.0) -> float:
+        """Tempo previsto do lote: simulação das vagas do grid com as durações medidas por site"""
+        slots = [0.0] * min(self.max_sessions, len(units))
+        finish = 0.0
+        for index, unit in enumerate(units):
+            start = max(heapq.heappop(slots), index * release_interval)
+            end = start + self.expected_duration(unit['site'])
+            heapq.heappush(slots, end)
+            finish = max(finish, end)
+        return finish
+    
+    async def dispatch(self, searches: List[Dict], window: float = None) -> Dict:
+        """Executa as buscas sem passar de GRID_MAX_SESSIONS sessões simultâneas
+        
+        Cada busca sai assim que uma sessão do grid fica livre. Com `window`
+        (intervalo até o próximo disparo do cron), sobra de tempo prevista é
+        usada para espaçar as liberações ao longo da janela. O lote é
+        persistido como plano (ver BatchCheckpoint) para poder ser retomado.
+        """
+        units = self.expand(searches)
+        if not units:
+            return {"searches": 0, "new_jobs": 0}
+        
+        batch_id, pending = await asyncio.to_thread(batch_checkpoint.create, units, self.instance_id, window)
+        if len(pending) < len(units):
+            logger.info(f"Lote {batch_id}: {len(units) - len(pending)} buscas recentes puladas")
+        return await self._run_batch(batch_id, pending, window)
+    
+    async def resume_batches(self):
+        """Retoma lotes abandonados (dono reiniciou no meio) da primeira busca incompleta"""
+        orphans = await asyncio.to_thread(batch_checkpoint.claim_orphans, self.instance_id)
+        for batch_id, units in orphans:
+            logger.info(f"Retomando lote {batch_id}: {len(units)} buscas restantes")
+            task = asyncio.create_task(self._run_batch(batch_id, units))
+            self._resumed.add(task)
+            task.add_done_callback(self._resumed.discard)
+    
+    async def _run_batch(self, batch_id: int, units: List[Dict], window: float = None) -> Dict:
+        self._ensure_workers()
+        if not self.site_durations:
+            await asyncio.to_thread(self._seed_durations)
+        
+        heartbeat = asyncio.create_task(self._batch_heartbeat(batch_id))
+        try:
+            result = await self._execute_units(units, window)
+        except Exception:
+            # Sem isso o lote ficaria "running" e seria retomado em loop como órfão.
+            # Cancelamento (shutdown) não cai aqui: o lote fica para outra instância retomar.
+            await asyncio.to_thread(batch_checkpoint.finish, batch_id, self.instance_id, "failed")
+            raise
+        finally:
+            heartbeat.cancel()
+        await asyncio.to_thread(batch_checkpoint.finish, batch_id, self.instance_id)
+        return {"batch_id": batch_id, **result}
+    
+    async def _batch_heartbeat(self, batch_id: int):
+        while True:
+            await asyncio.sleep(batch_checkpoint.stale_seconds / 3)
+            try:
+                if not await asyncio.to_thread(batch_checkpoint.touch, batch_id, self.instance_id):
+                    logger.warning(f"Lote {batch_id} foi assumido por outra instância")
+                    return
+            except Exception as e:
+                logger.warning(f"Heartbeat do lote {batch_id} falhou: {e}")
+    
+    async def _execute_units(self, units: List[Dict], window: float = None) -> Dict:
+        if not units:
+            return {"searches": 0, "new_jobs": 0}
+        
+        release_interval = 0.0
+        predicted = self.predict_makespan(units)
+        if window:
+            target = min(window * self.spread_fraction, self.max_spread)
+            if target > predicted:
+                release_interval = (target - predicted) / len(units)
+                predicted = self.predict_makespan(units, release_interval)
+        
+        started_at, started = datetime.utcnow(), time.monotonic()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for index, unit in enumerate(units):
+            future = loop.create_future()
+            release_at = started + index * release_interval
+            self._queue.put_nowait((release_at, -unit['priority'], next(self._sequence), unit, future))
+            futures.append(future)
+        
+        logger.info(f"Despachando {len(units)} buscas em {self.max_sessions} sessões "
+                    f"(previsão {predicted:.0f}s, liberação a cada {release_interval:.0f}s)")
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        new_jobs = sum(result for result in results if isinstance(result, int))
+        actual = time.monotonic() - started
+        
+        self.batch_reports.append({
+            "started_at": started_at,
+            "searches": len(units),
+            "window_seconds": window,
+            "release_interval": round(release_interval, 1),
+            "predicted_seconds": round(predicted, 1),
+            "actual_seconds": round(actual, 1),
+            "new_jobs": new_jobs
+        })
+        
+        # Um resumo no Telegram por lote despachado
+        notification_digest.flush()
+        logger.info(f"Despacho concluído: {len(units)} buscas, {new_jobs} vagas novas "
+                    f"em {actual:.0f}s (previsto {predicted:.0f}s)")
+        return {"searches": len(units), "new_jobs": new_jobs, "predicted_seconds": round(predicted, 1),
+                "actual_seconds": round(actual, 1)}
+    
+    def get_dispatch_stats(self) -> Dict:
+        return {
+            "slots": self.max_sessions,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "site_durations": {site: round(seconds, 1) for site, seconds in self.site_durations.items()},
+            "recent_batches": list(self.batch_reports),
+            "resumed_batches": len(self._resumed)
+        }
+    
+    def _ensure_workers(self):
+        """Uma corrotina por sessão do grid, consumindo a fila global de buscas"""
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_sessions)]
+    
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            release_at, _, _, unit, future = item
+            
+            # Ainda não liberada (lote espaçado): devolve e tenta de novo em seguida
+            delay = release_at - time.monotonic()
+            if delay > 0:
+                self._queue.put_nowait(item)
+                await asyncio.sleep(min(delay, 1.0))
+                continue
+            SCHEDULER_LAG_SECONDS.labels('unit').observe(-delay)
+            
+            try:
+                if self.execution == 'queue':
+                    result = await self._run_queued(unit)
+                else:
+                    started = time.monotonic()
+                    result = await asyncio.to_thread(self.run_unit, unit, -delay)
+                    self._record_duration(unit['site'], time.monotonic() - started)
+                await self._checkpoint(unit, "done", result)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                await self._checkpoint(unit, "failed")
+                if not future.done():
+                    future.set_exception(e)
+    
+    async def _checkpoint(self, unit: Dict, status: str, jobs_found: int = None):
+        if not unit.get('item_id'):
+            return
+        try:
+            await asyncio.to_thread(batch_checkpoint.mark, unit['item_id'], status, jobs_found)
+        except Exception as e:
+            logger.warning(f"Não foi possível registrar o checkpoint da busca {unit['item_id']}: {e}")
+    
+    async def _run_queued(self, unit: Dict) -> int:
+        """Publica a busca na fila e aguarda um worker concluí-la
+        
+        A vaga do grid continua ocupada enquanto a tarefa está na fila, então
+        os workers nunca recebem mais buscas simultâneas do que GRID_MAX_SESSIONS.
+        A espera tem prazo (`_queue_deadline`): sem worker, ou com um que morreu
+        depois da última tentativa, a tarefa é cancelada no broker e a busca
+        falha, liberando a vaga. O worker não tem assinantes de eventos, então
+        o run_completed da execução sai daqui.
+        """
+        task_id = (await asyncio.to_thread(work_queue.publish, [unit]))[0]
+        deadline = time.monotonic() + self._queue_deadline()
+        while True:
+            await asyncio.sleep(self.queue_poll_interval)
+            result = (await asyncio.to_thread(work_queue.get_results, [task_id])).get(task_id)
+            if result and result['status'] in ('done', 'failed'):
+                await self._publish_run(result.get('run_id'))
+            if result is None or result['status'] == 'failed':
+                raise RuntimeError(f"busca {task_id} falhou na fila: {result and result['error']}")
+            if result['status'] == 'done':
+                if result['started_at'] and result['finished_at']:
+                    self._record_duration(unit['site'], (result['finished_at'] - result['started_at']).total_seconds())
+                return result['jobs_found'] or 0
+            if time.monotonic() >= deadline:
+                error = f"sem resultado de um worker em {self._queue_deadline():.0f}s"
+                await asyncio.to_thread(work_queue.cancel, task_id, error)
+                raise RuntimeError(f"busca {task_id} expirou na fila: {error}")
+    
+    def _queue_deadline(self) -> float:
+        """Espera máxima por uma tarefa: WORK_QUEUE_WAIT_LIMIT mais todas as tentativas com backoff"""
+        attempts = getattr(work_queue, 'max_attempts', 3)
+        lease = getattr(work_queue, 'visibility_timeout', 120)
+        backoff = getattr(work_queue, 'retry_delay', 30) * (2 ** (attempts - 1) - 1)
+        return self.queue_wait_limit + attempts * lease + backoff
+    
+    async def _publish_run(self, run_id: Optional[int]):
+        """run_completed de uma execução gravada por um worker"""
+        if run_id:
+            event = await asyncio.to_thread(self._serialize_run, run_id)
+            if event:
+                broadcaster.publish("run_completed", event)
+    
+    def _serialize_run(self, run_id: int) -> Optional[Dict]:
+        db = SessionLocal()
+        try:
+            run = db.get(ScrapingRun, run_id)
+            return serialize_run(run) if run else None
+        finally:
+            db.close()
+    
+    def _record_duration(self, site: str, seconds: float):
+        """Média móvel exponencial da duração por site"""
+        previous = self.site_durations.get(site)
+        self.site_durations[site] = seconds if previous is None else (
+            self.duration_alpha * seconds + (1 - self.duration_alpha) * previous
+        )
+    
+    def _seed_durations(self):
+        """Inicializa as durações por site a partir das últimas execuções registradas"""
+        db = SessionLocal()
+        try:
+            for site in DEFAULT_SITES:
+                runs = db.query(ScrapingRun.created_at, ScrapingRun.completed_at).filter(
+                    ScrapingRun.source == site,
+                    ScrapingRun.status == "completed",
+                    ScrapingRun.completed_at.isnot(None)
+                ).order_by(ScrapingRun.created_at.desc()).limit(20).all()
+                durations = [(run.completed_at - run.created_at).total_seconds() for run in runs]
+                if durations:
+                    self.site_durations.setdefault(site, sum(durations) / len(durations))
+        finally:
+            db.close()
+    
+    def run_unit(self, unit: Dict, queued_seconds: float = None) -> int:
+        """Executa uma busca num site e registra a execução; retorna vagas novas
+        
+        Se a busca falhar, o ScrapingRun fica como "failed" e a exceção é
+        propagada (o worker da fila a devolve com backoff; o despacho local
+        marca o checkpoint como falho).
+        
+        As fases (espera por uma sessão do grid, driver, página, parse, filtro,
+        gravação, notificação) ficam no trace da execução (ScrapingRun.trace).
+        Com `unit['profile']` (ou sorteada pelo profiler) a execução também é perfilada.
+        """
+        with tracing.tracing() as trace, profiler.profile('run', force=unit.get('profile', False)):
+            with self.grid_slot(unit['site'], queued_seconds or 0.0):
+                return self._run_unit(unit, trace)
+    
+    @contextmanager
+    def grid_slot(self, site: str, queued_seconds: float = 0.0):
+        """Ocupa uma sessão do grid enquanto o bloco roda
+        
+        Compartilhada pelo despacho local e pelas execuções sob demanda
+        (scrape_jobs), para que juntos não passem de GRID_MAX_SESSIONS. A
+        espera (mais `queued_seconds` na fila do despacho) vai para o trace
+        como grid_wait.
+        """
+        started = time.monotonic()
+        with self._grid_slots:
+            tracing.record('grid_wait', queued_seconds + time.monotonic() - started, site)
+            yield
+    
+    def _run_unit(self, unit: Dict, trace: tracing.RunTrace) -> int:
+        keyword, region, site = unit['keyword'], unit.get('region'), unit['site']
+        db = SessionLocal()
+        run = ScrapingRun(keyword=keyword, source=site, region=region, status="running")
+        db.add(run)
+        db.commit()
+        db.refresh(run)
+        unit['run_id'] = run.id  # o worker devolve ao broker; o despacho publica o run_completed
+        profiler.attach(run)
+        
+        try:
+            scrape = getattr(self.scraper, f"scrape_{site}")
+            if region:
+                filters = unit.get('filters') or {'location': region, 'min_salary': 2000}
+                jobs = scrape(keyword, location=region, filters=filters)
+            elif unit.get('filters'):
+                jobs = scrape(keyword, filters=unit['filters'])
+            else:
+                jobs = scrape(keyword)
+            
+            new_jobs = self.store_new_jobs(jobs, db)
+            
+            if new_jobs:
+                with tracing.span('notify', site, jobs=len(new_jobs)):
+                    for job in new_jobs:
+                        job.setdefault('keyword', keyword)
+                    self.notifier.send_jobs(new_jobs, keyword)
+            
+            run.jobs_found = len(new_jobs)
+            run.status = "completed"
+            run.completed_at = datetime.utcnow()
+            run.trace = trace.to_json()
+            db.commit()
+            broadcaster.publish("run_completed", serialize_run(run, new_jobs))
+            logger.info(f"'{keyword}' em '{region or '-'}' ({site}): {len(new_jobs)} vagas novas")
+            return len(new_jobs)
+        
+        except Exception as e:
+            db.rollback()
+            run.status = "failed"
+            run.error_message = str(e)
+            run.completed_at = datetime.utcnow()
+            run.trace = trace.to_json()
+            db.commit()
+            broadcaster.publish("run_completed", serialize_run(run))
+            logger.error(f"Scraping failed for '{keyword}' ({site}): {e}")
+            raise  # quem chamou decide: checkpoint "failed", retry da fila
+        finally:
+            db.close()
+    
+    def store_new_jobs(self, jobs: List[Dict], db) -> List[Dict]:
+        """Grava as vagas ainda não vistas (por link) e as envia para aprovação"""
+        with DB_INGEST_SECONDS.time(), tracing.span('db_ingest', jobs=len(jobs)) as span:
+            new_jobs = self._insert_new_jobs(jobs, db)
+            if new_jobs:
+                self.approval_system.add_jobs_for_review(new_jobs, db)
+            span.set(new=len(new_jobs))
+        DB_INGEST_JOBS.labels('new').inc(len(new_jobs))
+        DB_INGEST_JOBS.labels('duplicate').inc(len(jobs) - len(new_jobs))
+        return new_jobs
+    
+    def _insert_new_jobs(self, jobs: List[Dict], db) -> List[Dict]:
+        links = [job['link'] for job in jobs]
+        existing = {row.link for row in db.query(ScrapedJob.link).filter(ScrapedJob.link.in_(links))} if links else set()
+        
+        new_jobs = []
+        for job in jobs:
+            if job['link'] in existing:
+                continue
+            existing.add(job['link'])
+            new_jobs.append(job)
+        if not new_jobs:
+            return []
+        
+        try:
+            db.add_all([ScrapedJob(title=job['title'], link=job['link'], source=job['source']) for job in new_jobs])
+            db.commit()
+            return new_jobs
+        except IntegrityError:
+            # Outra busca (thread ou worker) gravou algum desses links entre a consulta e o commit
+            db.rollback()
+        
+        inserted = []
+        for job in new_jobs:
+            try:
+                with db.begin_nested():
+                    db.add(ScrapedJob(title=job['title'], link=job['link'], source=job['source']))
+                inserted.append(job)
+            except IntegrityError:
+                pass  # já gravada pela outra busca: conta como duplicada
+        db.commit()
+        return inserted
+
+# Instância global
+scheduling_service = SchedulingService()
+
+# Funções referenciadas textualmente pelo job store (precisam ser de módulo)
+
+async def run_search_batch(searches: List[Dict], window: float = None):
+    await scheduling_service.dispatch(searches, window)
+
+async def run_recurring_scrape(keywords: List[str], sites: List[str], window: float = None):
+    await scheduling_service.dispatch([{'keyword': keyword, 'sites': sites} for keyword in keywords], window)
@@ -0,0 +1,228 @@
+from .database import SessionLocal, ScrapingRun
+from .telegram_bot import TelegramNotifier
+from .events import broadcaster, serialize_run
+from . import progress, tracing
+from .profiling import profiler
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional
+from datetime import datetime
+from loguru import logger
+import asyncio
+import json
+import os
+import socket
+import threading
+import uuid
+
+SUPPORTED_SITES = ['infojobs', 'linkedin', 'catho']
+FINISHED = ('completed', 'failed')
+
+class ScrapeJobRunner:
+    """Execuções de scraping pedidas pela API e pelo formulário, fora da requisição
+    
+    `submit` grava a execução como 'queued' e retorna o id na hora; uma
+    thread do pool roda o Selenium e publica o progresso (páginas
+    carregadas, vagas encontradas, vagas novas) como eventos run_progress.
+    Cada site ocupa uma sessão do grid do serviço de agendamento, então o
+    formulário e os lotes agendados dividem GRID_MAX_SESSIONS. O pool vive
+    só neste processo: no startup, `fail_orphans` encerra as execuções que
+    um processo anterior deste host deixou na fila ou pela metade.
+    """
+    
+    def __init__(self):
+        self.max_workers = int(os.getenv('SCRAPE_JOB_WORKERS', '2'))
+        self.max_tracked = int(os.getenv('SCRAPE_JOB_TRACKED', '200'))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scrape-job')
+        self._progress: OrderedDict = OrderedDict()  # run_id -> progresso (só as mais recentes)
+        self._lock = threading.Lock()
+        self.instance_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    
+    def submit(self, keyword: str, sites: List[str], days_back: int = 1, send_telegram: bool = True,
+               profile: bool = False) -> int:
+        """Enfileira a execução e retorna o run_id (`profile` força o profiler nela)"""
+        db = SessionLocal()
+        try:
+            run = ScrapingRun(keyword=keyword, source=",".join(sites), status="queued",
+                              runner=self.instance_id)
+            db.add(run)
+            db.commit()
+            run_id = run.id
+        finally:
+            db.close()
+        
+        self._update(run_id, keyword=keyword, sites=sites, status="queued", site=None,
+                     pages_fetched=0, jobs_found=0, new_jobs=0, queued_at=datetime.utcnow())
+        self._executor.submit(self._run, run_id, keyword, sites, days_back, send_telegram, profile)
+        return run_id
+    
+    def fail_orphans(self) -> int:
+        """Marca como falhas as execuções de processos mortos deste host; retorna quantas
+        
+        Só olha as execuções deste host (o hostname do container sobrevive ao
+        restart): as de outras réplicas são recuperadas quando elas sobem.
+        """
+        host = socket.gethostname()
+        db = SessionLocal()
+        try:
+            runs = db.query(ScrapingRun).filter(
+                ScrapingRun.status.in_(("queued", "running")),
+                ScrapingRun.runner.like(f"{host}-%"),
+                ScrapingRun.runner != self.instance_id
+            ).all()
+            orphans = [run for run in runs if not _process_alive(run.runner.rsplit('-', 2)[1])]
+            for run in orphans:
+                run.status = "failed"
+                run.error_message = "processo encerrado antes do fim da execução"
+                run.completed_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+        
+        if orphans:
+            logger.warning(f"{len(orphans)} execuções sob demanda órfãs marcadas como falhas")
+        return len(orphans)
+    
+    def get_status(self, run_id: int) -> Optional[Dict]:
+        """Progresso em memória, ou o registro da execução se ela já saiu do acompanhamento"""
+        with self._lock:
+            state = self._progress.get(run_id)
+            if state:
+                return dict(state)
+        
+        db = SessionLocal()
+        try:
+            run = db.query(ScrapingRun).filter(ScrapingRun.id == run_id).first()
+            if not run:
+                return None
+            return {
+                'run_id': run.id,
+                'keyword': run.keyword,
+                'sites': run.source.split(','),
+                'status': run.status,
+                'pages_fetched': run.pages_fetched,
+                'jobs_found': run.jobs_scraped,
+                'new_jobs': run.jobs_found,
+                'error': run.error_message,
+                'created_at': run.created_at,
+                'completed_at': run.completed_at
+            }
+        finally:
+            db.close()
+    
+    async def stream(self, run_id: int, request) -> AsyncIterator[str]:
+        """SSE com o progresso de uma execução; encerra quando ela termina"""
+        queue = broadcaster.subscribe()
+        try:
+            state = await asyncio.to_thread(self.get_status, run_id)
+            yield "retry: 5000\n\n"
+            yield f"data: {json.dumps({'type': 'run_progress', 'data': state}, default=str, ensure_ascii=False)}\n\n"
+            if state['status'] in FINISHED:
+                return
+            
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=broadcaster.keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                
+                event = json.loads(message)
+                if event['type'] == 'run_progress' and event['data']['run_id'] == run_id:
+                    yield f"data: {message}\n\n"
+                    if event['data']['status'] in FINISHED:
+                        return
+        finally:
+            broadcaster.unsubscribe(queue)
+    
+    def _run(self, run_id: int, keyword: str, sites: List[str], days_back: int, send_telegram: bool,
+             profile: bool = False):
+        with tracing.tracing() as trace, profiler.profile('run', force=profile):
+            self._run_traced(run_id, keyword, sites, days_back, send_telegram, trace)
+    
+    def _run_traced(self, run_id: int, keyword: str, sites: List[str], days_back: int, send_telegram: bool,
+                    trace: tracing.RunTrace):
+        db = SessionLocal()
+        run = db.query(ScrapingRun).filter(ScrapingRun.id == run_id).first()
+        run.status = "running"
+        profiler.attach(run)
+        db.commit()
+        self._update(run_id, status="running", started_at=datetime.utcnow())
+        
+        def on_progress(pages: int = 0, jobs: int = 0):
+            with self._lock:
+                state = self._progress.get(run_id, {})
+                state['pages_fetched'] = state.get('pages_fetched', 0) + pages
+                state['jobs_found'] = state.get('jobs_found', 0) + jobs
+            self._update(run_id)
+        
+        try:
+            from .scraper import JobScraper  # Selenium só carrega na primeira execução
+            from .scheduling_service import scheduling_service  # APScheduler, idem
+            scraper = JobScraper()
+            new_jobs = []
+            with progress.reporting(on_progress):
+                for site in sites:
+                    with scheduling_service.grid_slot(site):
+                        self._update(run_id, site=site)
+                        jobs = getattr(scraper, f"scrape_{site}")(keyword, days_back)
+                    site_new = scheduling_service.store_new_jobs(jobs, db)
+                    new_jobs.extend(site_new)
+                    self._update(run_id, new_jobs=len(new_jobs))
+            
+            if send_telegram and new_jobs:
+                with tracing.span('notify', jobs=len(new_jobs)):
+                    TelegramNotifier().send_jobs(new_jobs, keyword)
+            
+            state = self.get_status(run_id)
+            run.jobs_found = len(new_jobs)
+            run.pages_fetched = state['pages_fetched']
+            run.jobs_scraped = state['jobs_found']
+            run.status = "completed"
+            run.completed_at = datetime.utcnow()
+            run.trace = trace.to_json()
+            db.commit()
+            broadcaster.publish("run_completed", serialize_run(run, new_jobs))
+            self._update(run_id, status="completed", site=None, completed_at=run.completed_at)
+        
+        except Exception as e:
+            db.rollback()
+            run.status = "failed"
+            run.error_message = str(e)
+            run.completed_at = datetime.utcnow()
+            run.trace = trace.to_json()
+            db.commit()
+            broadcaster.publish("run_completed", serialize_run(run))
+            logger.error(f"Scraping failed: {e}")
+            self._update(run_id, status="failed", site=None, error=str(e), completed_at=run.completed_at)
+        finally:
+            db.close()
+    
+    def _update(self, run_id: int, **fields):
+        """Atualiza o progresso e publica run_progress"""
+        with self._lock:
+            state = self._progress.setdefault(run_id, {'run_id': run_id})
+            state.update(fields)
+            snapshot = dict(state)
+            self._progress.move_to_end(run_id)
+            while len(self._progress) > self.max_tracked:
+                _, old_state = next(iter(self._progress.items()))
+                if old_state.get('status') not in FINISHED:
+                    break
+                self._progress.popitem(last=False)
+        broadcaster.publish("run_progress", snapshot)
+
+def _process_alive(pid: str) -> bool:
+    """O pid ainda existe e não é este processo (que reusa o pid de um container reiniciado)"""
+    if int(pid) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+# Instância global
+scrape_job_runner = ScrapeJobRunner()
@@ -7,7 +7,10 @@ from selenium.webdriver.support import expected_conditions as EC
 from datetime import datetime, timedelta
 from loguru import logger
 from .cache import job_cache
+from .metrics import SCRAPE_CARDS
+from . import progress, tracing
 from .ai_filter import AIJobFilter
+from .filter_plan import FilterPlan
 from .scrapers.linkedin_scraper import LinkedInScraper
 from .scrapers.catho_scraper import CathoScraper
 from concurrent.futures import ThreadPoolExecutor
@@ -23,7 +26,7 @@ class JobScraper:
         self.linkedin_scraper = LinkedInScraper()
         self.catho_scraper = CathoScraper()
         
-    def _create_driver(self):
+    def _create_driver(self, site: str):
         options = Options()
         if self.headless:
             options.add_argument('--headless')
@@ -33,69 +36,58 @@ class JobScraper:
         options.add_argument('--window-size=1920,1080')
         
         try:
-            driver = webdriver.Remote(
-                command_executor=self.selenium_hub_url,
-                options=options
-            )
+            with tracing.phase(site, 'driver') as span:
+                driver = webdriver.Remote(
+                    command_executor=self.selenium_hub_url,
+                    options=options
+                )
+                capabilities = driver.capabilities or {}
+                span.set(engine=f"{capabilities.get('browserName', '?')} {capabilities.get('browserVersion', '')}".strip())
             return driver
         except WebDriverException as e:
             logger.error(f"Failed to create driver: {e}")
             raise
-
+    
     def scrape_infojobs(self, keyword: str, days_back: int = 1, location: str = "", filters: dict = None) -> list:
-        driver = self._create_driver()
+        """Scrape InfoJobs jobs"""
+        plan = FilterPlan(filters, days_back=days_back, location=location, ai_filter=self.ai_filter)
+        jobs = self._fetch_infojobs(keyword, plan)
+        return self._apply_plan('infojobs', plan, jobs) if filters else jobs
+    
+    def _apply_plan(self, site: str, plan: FilterPlan, jobs: list) -> list:
+        with tracing.span('filter', site, input=len(jobs)) as span:
+            jobs = plan.apply(jobs)
+            span.set(output=len(jobs))
+        return jobs
+    
+    def _fetch_infojobs(self, keyword: str, plan: FilterPlan) -> list:
+        params = plan.url_params('infojobs')
+        driver = self._create_driver('infojobs')
         jobs = []
         
         try:
             # URL com filtros
             url = f"https://www.infojobs.com.br/empregos.aspx?palabra={keyword.replace(' ', '+')}"
-            if location:
-                url += f"&provincia={location.replace(' ', '+')}"
-            
-            driver.get(url)
+            if params['location']:
+                url += f"&provincia={params['location'].replace(' ', '+')}"
             
-            # Wait com timeout
-            wait = WebDriverWait(driver, 10)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '[class*="js_rowCard"]')))
+            with tracing.phase('infojobs', 'page_load'):
+                driver.get(url)
+                progress.report(pages=1)
+                
+                # Wait com timeout
+                wait = WebDriverWait(driver, 10)
+                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '[class*="js_rowCard"]')))
             
-            self._scroll_page(driver)
+            with tracing.phase('infojobs', 'scroll') as span:
+                span.set(scrolls=self._scroll_page(driver))
             
-            job_elements = driver.find_elements(By.CSS_SELECTOR, '[class*="js_rowCard"]')
-            cutoff_date = datetime.now().date() - timedelta(days=days_back)
+            with tracing.phase('infojobs', 'parse') as span:
+                if span.active:
+                    span.set(bytes=tracing.page_bytes(driver))
+                jobs = self._parse_infojobs_cards(driver, params)
+                span.set(accepted=len(jobs))
             
-            for job_elem in job_elements:
-                try:
-                    title = job_elem.find_element(By.CSS_SELECTOR, 'h2').get_attribute("textContent").strip()
-                    date_text = job_elem.find_element(By.CSS_SELECTOR, '[class*="text-medium small"]').get_attribute("textContent").strip()
-                    link_elem = job_elem.find_element(By.CSS_SELECTOR, 'a[href*="vaga"]')
-                    link = link_elem.get_attribute("href")
-                    
-                    # Verificar cache e blacklist
-                    if job_cache.is_duplicate(title, link):
-                        continue
-                    
-                    if job_cache.is_blacklisted(title):
-                        logger.info(f"Vaga bloqueada: {title}")
-                        continue
-                    
-                    job_date = self._parse_date(date_text)
-                    if job_date and job_date >= cutoff_date:
-                        job_cache.add_job(title, link)
-                        jobs.append({
-                            'title': title,
-                            'date': job_date,
-                            'link': link,
-                            'source': 'InfoJobs'
-                        })
-                        
-                        # Limite de vagas por execução
-                        if len(jobs) >= 20:
-                            break
-                            
-                except Exception as e:
-                    logger.warning(f"Error parsing job: {e}")
-                    continue
-                    
         except TimeoutException:
             logger.error("Timeout waiting for job cards to load")
         except Exception as e:
@@ -104,46 +96,116 @@ class JobScraper:
             driver.quit()
             
         logger.info(f"Found {len(jobs)} new jobs for '{keyword}'")
+        progress.report(jobs=len(jobs))
+        return jobs
+    
+    def _parse_infojobs_cards(self, driver, params: dict) -> list:
+        """Lê os cards carregados, descartando duplicadas, bloqueadas e antigas"""
+        jobs = []
+        job_elements = driver.find_elements(By.CSS_SELECTOR, '[class*="js_rowCard"]')
+        cutoff_date = datetime.now().date() - timedelta(days=params['days_back'])
+        
+        for job_elem in job_elements:
+            SCRAPE_CARDS.labels('infojobs', 'seen').inc()
+            try:
+                title = job_elem.find_element(By.CSS_SELECTOR, 'h2').get_attribute("textContent").strip()
+                date_text = job_elem.find_element(By.CSS_SELECTOR, '[class*="text-medium small"]').get_attribute("textContent").strip()
+                link_elem = job_elem.find_element(By.CSS_SELECTOR, 'a[href*="vaga"]')
+                link = link_elem.get_attribute("href")
+                
+                # Verificar cache e blacklist
+                if job_cache.is_duplicate(title, link):
+                    SCRAPE_CARDS.labels('infojobs', 'duplicate').inc()
+                    continue
+                
+                if job_cache.is_blacklisted(title):
+                    SCRAPE_CARDS.labels('infojobs', 'blacklisted').inc()
+                    logger.info(f"Vaga bloqueada: {title}")
+                    continue
+                
+                job_date = self._parse_date(date_text)
+                if not (job_date and job_date >= cutoff_date):
+                    SCRAPE_CARDS.labels('infojobs', 'expired').inc()
+                else:
+                    SCRAPE_CARDS.labels('infojobs', 'accepted').inc()
+                    job_cache.add_job(title, link)
+                    jobs.append({
+                        'title': title,
+                        'date': job_date,
+                        'link': link,
+                        'source': 'InfoJobs'
+                    })
+                    
+                    # Limite de vagas por execução
+                    if len(jobs) >= 20:
+                        break
+                        
+            except Exception as e:
+                SCRAPE_CARDS.labels('infojobs', 'error').inc()
+                logger.warning(f"Error parsing job: {e}")
+                continue
+        
         return jobs
     
     def scrape_linkedin(self, keyword: str, days_back: int = 1, location: str = "", filters: dict = None) -> list:
         """Scrape LinkedIn jobs"""
-        driver = self._create_driver()
+        plan = FilterPlan(filters, days_back=days_back, location=location, ai_filter=self.ai_filter)
+        jobs = self._fetch_linkedin(keyword, plan)
+        return self._apply_plan('linkedin', plan, jobs) if filters else jobs
+    
+    def _fetch_linkedin(self, keyword: str, plan: FilterPlan) -> list:
+        params = plan.url_params('linkedin')
+        driver = self._create_driver('linkedin')
         try:
-            jobs = self.linkedin_scraper.scrape_jobs(driver, keyword, location, days_back)
-            if filters:
-                jobs = self.ai_filter.filter_jobs(jobs, filters)
+            jobs = self.linkedin_scraper.scrape_jobs(
+                driver, keyword, params['location'], params['days_back'],
+                contract_type=params['contract_type'], remote=params['remote']
+            )
+            progress.report(pages=1, jobs=len(jobs))
             return jobs
         finally:
             driver.quit()
     
     def scrape_catho(self, keyword: str, days_back: int = 1, location: str = "", filters: dict = None) -> list:
         """Scrape Catho jobs"""
-        driver = self._create_driver()
+        plan = FilterPlan(filters, days_back=days_back, location=location, ai_filter=self.ai_filter)
+        jobs = self._fetch_catho(keyword, plan)
+        return self._apply_plan('catho', plan, jobs) if filters else jobs
+    
+    def _fetch_catho(self, keyword: str, plan: FilterPlan) -> list:
+        params = plan.url_params('catho')
+        driver = self._create_driver('catho')
         try:
-            jobs = self.catho_scraper.scrape_jobs(driver, keyword, location, days_back)
-            if filters:
-                jobs = self.ai_filter.filter_jobs(jobs, filters)
+            jobs = self.catho_scraper.scrape_jobs(driver, keyword, params['location'], params['days_back'])
+            progress.report(pages=1, jobs=len(jobs))
             return jobs
         finally:
             driver.quit()
     
-    def scrape_all_sites(self, keyword: str, sites: list = None, filters: dict = None) -> list:
-        """Scrape multiple sites in parallel"""
+    def scrape_all_sites(self, keyword: str, sites: list = None, filters: dict = None,
+                         days_back: int = 1, location: str = None, plan: FilterPlan = None) -> list:
+        """Scrape multiple sites in parallel
+        
+        O plano de filtros é compilado uma vez: o que cada site suporta vai na
+        URL e o restante roda uma única vez sobre o resultado combinado.
+        """
         if not sites:
             sites = ['infojobs', 'linkedin', 'catho']
         
+        plan = plan or FilterPlan(filters, days_back=days_back, location=location, ai_filter=self.ai_filter)
+        fetchers = {
+            'infojobs': self._fetch_infojobs,
+            'linkedin': self._fetch_linkedin,
+            'catho': self._fetch_catho
+        }
+        
         all_jobs = []
         
         with ThreadPoolExecutor(max_workers=3) as executor:
-            futures = []
-            
-            if 'infojobs' in sites:
-                futures.append(executor.submit(self.scrape_infojobs, keyword, 1, "", filters))
-            if 'linkedin' in sites:
-                futures.append(executor.submit(self.scrape_linkedin, keyword, 1, "", filters))
-            if 'catho' in sites:
-                futures.append(executor.submit(self.scrape_catho, keyword, 1, "", filters))
+            futures = [
+                executor.submit(fetchers[site], keyword, plan)
+                for site in sites if site in fetchers
+            ]
             
             for future in futures:
                 try:
@@ -152,12 +214,13 @@ class JobScraper:
                 except Exception as e:
                     logger.error(f"Scraping failed: {e}")
         
-        # Apply final AI filtering
-        if filters:
-            all_jobs = self.ai_filter.filter_jobs(all_jobs, filters)
+        # Predicados restantes, uma única vez
+        if plan.filters:
+            all_jobs = plan.apply(all_jobs)
+            plan.log_stats(keyword)
         
         return all_jobs
-
+    
     def _scroll_page(self, driver):
         last_height = driver.execute_script("return document.body.scrollHeight")
         attempts = 0
@@ -172,7 +235,8 @@ class JobScraper:
                 
             last_height = new_height
             attempts += 1
-
+        return attempts
+    
     def _parse_date(self, date_text: str):
         try:
             if "hoje" in date_text.lower():
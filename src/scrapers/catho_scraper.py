@@ -3,6 +3,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from datetime import datetime
 from loguru import logger
+from ..metrics import SCRAPE_CARDS
+from .. import tracing
 
 class CathoScraper:
     def scrape_jobs(self, driver, keyword: str, location: str = "", days_back: int = 1) -> list:
@@ -12,35 +14,44 @@ class CathoScraper:
             if location:
                 url += f"&cidade={location}"
                 
-            driver.get(url)
-            
-            wait = WebDriverWait(driver, 10)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '[data-testid="job-card"]')))
-            
-            job_cards = driver.find_elements(By.CSS_SELECTOR, '[data-testid="job-card"]')
+            with tracing.phase('catho', 'page_load'):
+                driver.get(url)
+                
+                wait = WebDriverWait(driver, 10)
+                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '[data-testid="job-card"]')))
             
-            for card in job_cards[:20]:
-                try:
-                    title_elem = card.find_element(By.CSS_SELECTOR, 'h2 a')
-                    title = title_elem.text.strip()
-                    link = title_elem.get_attribute('href')
-                    
+            with tracing.phase('catho', 'parse') as span:
+                if span.active:
+                    span.set(bytes=tracing.page_bytes(driver))
+                job_cards = driver.find_elements(By.CSS_SELECTOR, '[data-testid="job-card"]')
+                
+                for card in job_cards[:20]:
+                    SCRAPE_CARDS.labels('catho', 'seen').inc()
                     try:
-                        company = card.find_element(By.CSS_SELECTOR, '[data-testid="company-name"]').text.strip()
-                    except:
-                        company = "Empresa não informada"
-                    
-                    jobs.append({
-                        'title': title,
-                        'company': company,
-                        'link': link,
-                        'source': 'Catho',
-                        'date': datetime.now().date()
-                    })
-                    
-                except Exception as e:
-                    logger.warning(f"Error parsing Catho job: {e}")
-                    continue
+                        title_elem = card.find_element(By.CSS_SELECTOR, 'h2 a')
+                        title = title_elem.text.strip()
+                        link = title_elem.get_attribute('href')
+                        
+                        try:
+                            company = card.find_element(By.CSS_SELECTOR, '[data-testid="company-name"]').text.strip()
+                        except:
+                            company = "Empresa não informada"
+                        
+                        jobs.append({
+                            'title': title,
+                            'company': company,
+                            'link': link,
+                            'source': 'Catho',
+                            'date': datetime.now().date()
+                        })
+                        SCRAPE_CARDS.labels('catho', 'accepted').inc()
+                        
+                    except Exception as e:
+                        SCRAPE_CARDS.labels('catho', 'error').inc()
+                        logger.warning(f"Error parsing Catho job: {e}")
+                        continue
+                
+                span.set(cards=len(job_cards), accepted=len(jobs))
                     
         except Exception as e:
             logger.error(f"Catho scraping failed: {e}")
@@ -3,39 +3,66 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from datetime import datetime
 from loguru import logger
+from ..metrics import SCRAPE_CARDS
+from .. import tracing
 import time
 
+# Filtro f_JT do LinkedIn (tipo de vaga)
+CONTRACT_TYPE_PARAMS = {
+    'clt': 'F',
+    'estagio': 'I',
+    'pj': 'C',
+    'freelance': 'C'
+}
+
 class LinkedInScraper:
-    def scrape_jobs(self, driver, keyword: str, location: str = "Brasil", days_back: int = 1) -> list:
+    def scrape_jobs(self, driver, keyword: str, location: str = "Brasil", days_back: int = 1,
+                    contract_type: str = None, remote: bool = False) -> list:
         jobs = []
         try:
-            url = f"https://www.linkedin.com/jobs/search/?keywords={keyword.replace(' ', '%20')}&location={location}"
-            driver.get(url)
-            
-            wait = WebDriverWait(driver, 15)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '.job-search-card')))
-            
-            self._scroll_and_load(driver)
+            url = f"https://www.linkedin.com/jobs/search/?keywords={keyword.replace(' ', '%20')}&location={location or 'Brasil'}"
+            if days_back:
+                url += f"&f_TPR=r{days_back * 86400}"
+            if contract_type in CONTRACT_TYPE_PARAMS:
+                url += f"&f_JT={CONTRACT_TYPE_PARAMS[contract_type]}"
+            if remote:
+                url += "&f_WT=2"
+            with tracing.phase('linkedin', 'page_load'):
+                driver.get(url)
+                
+                wait = WebDriverWait(driver, 15)
+                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '.job-search-card')))
             
-            job_cards = driver.find_elements(By.CSS_SELECTOR, '.job-search-card')
+            with tracing.phase('linkedin', 'scroll'):
+                self._scroll_and_load(driver)
             
-            for card in job_cards[:20]:
-                try:
-                    title = card.find_element(By.CSS_SELECTOR, '.base-search-card__title').text.strip()
-                    company = card.find_element(By.CSS_SELECTOR, '.base-search-card__subtitle').text.strip()
-                    link = card.find_element(By.CSS_SELECTOR, 'a').get_attribute('href')
-                    
-                    jobs.append({
-                        'title': title,
-                        'company': company,
-                        'link': link,
-                        'source': 'LinkedIn',
-                        'date': datetime.now().date()
-                    })
-                    
-                except Exception as e:
-                    logger.warning(f"Error parsing LinkedIn job: {e}")
-                    continue
+            with tracing.phase('linkedin', 'parse') as span:
+                if span.active:
+                    span.set(bytes=tracing.page_bytes(driver))
+                job_cards = driver.find_elements(By.CSS_SELECTOR, '.job-search-card')
+                
+                for card in job_cards[:20]:
+                    SCRAPE_CARDS.labels('linkedin', 'seen').inc()
+                    try:
+                        title = card.find_element(By.CSS_SELECTOR, '.base-search-card__title').text.strip()
+                        company = card.find_element(By.CSS_SELECTOR, '.base-search-card__subtitle').text.strip()
+                        link = card.find_element(By.CSS_SELECTOR, 'a').get_attribute('href')
+                        
+                        jobs.append({
+                            'title': title,
+                            'company': company,
+                            'link': link,
+                            'source': 'LinkedIn',
+                            'date': datetime.now().date()
+                        })
+                        SCRAPE_CARDS.labels('linkedin', 'accepted').inc()
+                        
+                    except Exception as e:
+                        SCRAPE_CARDS.labels('linkedin', 'error').inc()
+                        logger.warning(f"Error parsing LinkedIn job: {e}")
+                        continue
+                
+                span.set(cards=len(job_cards), accepted=len(jobs))
                     
         except Exception as e:
             logger.error(f"LinkedIn scraping failed: {e}")
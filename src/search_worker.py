@@ -0,0 +1,89 @@
+from .work_queue import work_queue, WorkQueueBroker
+from .scheduling_service import scheduling_service
+from typing import Dict, Optional
+from loguru import logger
+import asyncio
+import os
+import socket
+import uuid
+
+class SearchWorker:
+    """Consome a fila de buscas fora do processo da API
+    
+    Executa até WORKER_CONCURRENCY buscas ao mesmo tempo (uma sessão do grid
+    cada) e renova o lease de cada uma enquanto ela roda. Vários processos
+    podem consumir a mesma fila; escalar é subir mais workers.
+    """
+    
+    def __init__(self, broker: WorkQueueBroker = None, concurrency: int = None):
+        self.broker = broker or work_queue
+        self.concurrency = concurrency or int(os.getenv('WORKER_CONCURRENCY', '1'))
+        self.poll_interval = float(os.getenv('WORKER_POLL_INTERVAL', '2'))
+        self.heartbeat_interval = getattr(self.broker, 'visibility_timeout', 120) / 3
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.stats = {'completed': 0, 'failed': 0, 'lost_leases': 0}
+        self._running: Dict[int, asyncio.Task] = {}
+        self._stopping: Optional[asyncio.Event] = None
+    
+    async def run(self):
+        """Loop principal: reivindica tarefas enquanto houver slots livres"""
+        self._stopping = asyncio.Event()
+        logger.info(f"Worker {self.worker_id} consumindo a fila de buscas ({self.concurrency} slots)")
+        
+        while not self._stopping.is_set():
+            free = self.concurrency - len(self._running)
+            tasks = []
+            if free > 0:
+                try:
+                    tasks = await asyncio.to_thread(self.broker.claim, self.worker_id, free)
+                except Exception as e:
+                    logger.error(f"Erro reivindicando buscas: {e}")
+            
+            for task in tasks:
+                self._running[task['id']] = asyncio.create_task(self._execute(task))
+            
+            if not tasks or len(self._running) >= self.concurrency:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        
+        # Encerramento: termina o que já começou; o que não terminar volta à fila pelo lease
+        if self._running:
+            logger.info(f"Aguardando {len(self._running)} buscas em andamento")
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+        logger.info(f"Worker {self.worker_id} encerrado: {self.stats}")
+    
+    def stop(self):
+        if self._stopping:
+            self._stopping.set()
+    
+    async def _execute(self, task: Dict):
+        heartbeat = asyncio.create_task(self._heartbeat(task['id']))
+        unit = {key: task[key] for key in ('keyword', 'region', 'site', 'filters', 'priority')}
+        try:
+            jobs_found = await asyncio.to_thread(scheduling_service.run_unit, unit)
+            owned = await asyncio.to_thread(self.broker.complete, task['id'], self.worker_id, jobs_found,
+                                            unit.get('run_id'))
+            self.stats['completed'] += 1
+        except Exception as e:
+            logger.error(f"Busca {task['id']} falhou: {e}")
+            owned = await asyncio.to_thread(self.broker.fail, task['id'], self.worker_id, str(e), unit.get('run_id'))
+            self.stats['failed'] += 1
+        finally:
+            heartbeat.cancel()
+            self._running.pop(task['id'], None)
+        
+        if not owned:
+            self.stats['lost_leases'] += 1
+            logger.warning(f"Lease da busca {task['id']} expirou antes do fim; resultado descartado")
+    
+    async def _heartbeat(self, task_id: int):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                if not await asyncio.to_thread(self.broker.heartbeat, task_id, self.worker_id):
+                    logger.warning(f"Worker {self.worker_id} perdeu o lease da busca {task_id}")
+                    return
+            except Exception as e:
+                logger.warning(f"Heartbeat da busca {task_id} falhou: {e}")
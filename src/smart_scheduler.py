@@ -1,135 +1,119 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from .auto_search_manager import AutoSearchManager
-from .scraper import JobScraper
-from .telegram_bot import TelegramNotifier
+from .scheduling_service import scheduling_service, cron_interval
+from .adaptive_scheduler import adaptive_scheduler, ADAPTIVE_TICK_JOB_ID
+from typing import Dict
 from loguru import logger
 import asyncio
 
 class SmartScheduler:
+    """Buscas automatizadas da matriz palavra-chave x região
+    
+    Os jobs ficam no serviço único de agendamento (job store persistente);
+    esta classe só traduz os perfis (tabela search_profiles) em jobs cron — ou,
+    com ADAPTIVE_SCHEDULING, num tick periódico que decide a frequência de cada
+    combinação pelo rendimento.
+    """
+    
     def __init__(self):
-        self.scheduler = AsyncIOScheduler()
+        self.service = scheduling_service
+        self.scheduler = scheduling_service.scheduler
         self.search_manager = AutoSearchManager()
-        self.scraper = JobScraper()
-        self.notifier = TelegramNotifier()
-        
-    def setup_automated_searches(self):
-        """Configura todas as buscas automatizadas"""
-        search_matrix = self.search_manager.get_search_matrix()
+        self.adaptive = adaptive_scheduler
         
-        # Agrupar por horário para otimizar
-        schedule_groups = {}
-        for search in search_matrix:
-            schedule = search['schedule']
-            if schedule not in schedule_groups:
-                schedule_groups[schedule] = []
-            schedule_groups[schedule].append(search)
-        
-        # Criar jobs agrupados
-        for schedule, searches in schedule_groups.items():
-            job_id = f"auto_search_{schedule.replace(' ', '_').replace('*', 'x')}"
-            
-            self.scheduler.add_job(
-                func=self._execute_batch_search,
-                trigger='cron',
-                **self._parse_cron(schedule),
-                args=[searches],
-                id=job_id,
-                max_instances=1
-            )
-            
-        logger.info(f"Configuradas {len(schedule_groups)} buscas automatizadas")
-    
-    def _parse_cron(self, cron_expr: str) -> dict:
-        """Converte cron expression para parâmetros do scheduler"""
-        parts = cron_expr.split()
-        return {
-            'minute': parts[0],
-            'hour': parts[1], 
-            'day': parts[2],
-            'month': parts[3],
-            'day_of_week': parts[4]
-        }
+    def setup_automated_searches(self) -> Dict:
+        """Configura todas as buscas automatizadas (reconciliação incremental)"""
+        return self.reconcile()
     
-    async def _execute_batch_search(self, searches: list):
-        """Executa lote de buscas em paralelo"""
-        logger.info(f"Executando {len(searches)} buscas automatizadas")
+    def reconcile(self) -> Dict:
+        """Aplica só a diferença entre os perfis desejados e os jobs agendados
         
-        # Agrupar por prioridade
-        high_priority = [s for s in searches if s['priority'] >= 4]
-        normal_priority = [s for s in searches if s['priority'] < 4]
+        Modo fixo: um job cron `profile_{id}` por perfil ativo. Modo adaptativo:
+        um único tick com a matriz inteira. Job igual ao desejado não é tocado
+        (mantém o próximo disparo); os demais são criados, alterados ou removidos.
+        """
+        desired = {}
+        if self.adaptive.enabled:
+            desired[ADAPTIVE_TICK_JOB_ID] = {
+                'func': 'src.adaptive_scheduler:run_adaptive_tick',
+                'trigger': IntervalTrigger(seconds=self.adaptive.tick_seconds),
+                'name': "Buscas adaptativas",
+                'kwargs': {'searches': self.search_manager.get_search_matrix()}
+            }
+        else:
+            for profile in self.search_manager.get_profiles():
+                if not profile.active:
+                    continue
+                desired[f"profile_{profile.id}"] = {
+                    'func': 'src.scheduling_service:run_search_batch',
+                    'trigger': CronTrigger.from_crontab(profile.schedule),
+                    'name': f"Perfil {profile.id}: {', '.join(profile.keywords[:3])}",
+                    'kwargs': {
+                        'searches': self.search_manager.get_profile_searches(profile),
+                        'window': cron_interval(profile.schedule)
+                    }
+                }
         
-        # Executar alta prioridade primeiro
-        if high_priority:
-            await self._run_searches(high_priority)
-            
-        # Executar prioridade normal com delay
-        if normal_priority:
-            await asyncio.sleep(30)  # Evitar sobrecarga
-            await self._run_searches(normal_priority)
-    
-    async def _run_searches(self, searches: list):
-        """Executa grupo de buscas"""
-        tasks = []
+        summary = {'added': [], 'updated': [], 'removed': [], 'unchanged': 0}
+        current = {job.id: job for job in self.service.get_jobs() if self._is_managed(job.id)}
         
-        for search in searches:
-            task = asyncio.create_task(
-                self._single_search(search['keyword'], search['region'])
-            )
-            tasks.append(task)
+        for job_id, spec in desired.items():
+            job = current.get(job_id)
+            if job is None:
+                self.scheduler.add_job(spec['func'], trigger=spec['trigger'], id=job_id, name=spec['name'],
+                                       kwargs=spec['kwargs'], replace_existing=True)
+                summary['added'].append(job_id)
+                continue
             
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Processar resultados
-        all_jobs = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"Erro na busca {searches[i]}: {result}")
+            changes = {key: spec[key] for key in ('name', 'kwargs') if getattr(job, key) != spec[key]}
+            if changes:
+                self.scheduler.modify_job(job_id, **changes)
+            if str(job.trigger) != str(spec['trigger']):
+                self.scheduler.reschedule_job(job_id, trigger=spec['trigger'])
+                changes['trigger'] = spec['trigger']
+            if changes:
+                summary['updated'].append(job_id)
             else:
-                all_jobs.extend(result)
+                summary['unchanged'] += 1
         
-        # Enviar melhores vagas para Telegram
-        if all_jobs:
-            best_jobs = sorted(all_jobs, key=lambda x: x.get('quality_score', 0), reverse=True)[:10]
-            await self._send_batch_notification(best_jobs)
+        for job_id in current.keys() - desired.keys():
+            self.service.remove_job(job_id)
+            summary['removed'].append(job_id)
+        
+        if summary['added'] or summary['updated'] or summary['removed']:
+            logger.info(f"Buscas automatizadas reconciliadas: {len(summary['added'])} novas, "
+                        f"{len(summary['updated'])} alteradas, {len(summary['removed'])} removidas, "
+                        f"{summary['unchanged']} sem mudança")
+        return summary
     
-    async def _single_search(self, keyword: str, region: str) -> list:
-        """Executa busca única"""
-        try:
-            filters = {'location': region, 'min_salary': 2000}
-            jobs = self.scraper.scrape_all_sites(keyword, filters=filters)
-            logger.info(f"'{keyword}' em '{region}': {len(jobs)} vagas")
-            return jobs
-        except Exception as e:
-            logger.error(f"Erro buscando '{keyword}' em '{region}': {e}")
-            return []
+    def _is_managed(self, job_id: str) -> bool:
+        # auto_search_*: grupos por horário de versões anteriores, removidos na primeira reconciliação
+        return job_id.startswith(('profile_', 'auto_search_')) or job_id == ADAPTIVE_TICK_JOB_ID
     
-    async def _send_batch_notification(self, jobs: list):
-        """Envia notificação consolidada"""
-        if len(jobs) >= 5:  # Só enviar se tiver vagas suficientes
-            message = f"🎯 **BUSCA AUTOMATIZADA - {len(jobs)} VAGAS SELECIONADAS**\n\n"
-            
-            for i, job in enumerate(jobs[:5], 1):
-                message += f"{i}. **{job['title']}**\n"
-                message += f"📍 {job.get('location', 'N/A')} | 🏢 {job.get('company', 'N/A')}\n"
-                message += f"⭐ Score: {job.get('quality_score', 0)} | 🌐 {job['source']}\n"
-                message += f"🔗 {job['link']}\n\n"
-            
-            self.notifier._send_message(message)
+    async def _execute_batch_search(self, searches: list):
+        """Executa lote de buscas respeitando a capacidade do grid"""
+        logger.info(f"Executando {len(searches)} buscas automatizadas")
+        return await self.service.dispatch(searches)
     
-    def start(self):
-        """Inicia scheduler inteligente"""
-        self.setup_automated_searches()
-        self.scheduler.start()
+    async def start(self):
+        """Inicia scheduler inteligente (a reconciliação lê o banco e o job store fora do loop)"""
+        self.service.start()
+        await asyncio.to_thread(self.setup_automated_searches)
         logger.info("Smart Scheduler iniciado")
     
     def get_next_searches(self) -> list:
         """Próximas buscas agendadas"""
-        jobs = self.scheduler.get_jobs()
         return [
             {
                 'id': job.id,
                 'next_run': job.next_run_time,
-                'searches_count': len(job.args[0]) if job.args else 0
+                'searches_count': len(job.kwargs.get('searches', []))
             }
-            for job in jobs
-        ]
\ No newline at end of file
+            for job in self.service.get_jobs()
+            if self._is_managed(job.id)
+        ]
+    
+    def get_learned_schedule(self) -> dict:
+        """Intervalo aprendido por (palavra-chave, região, site)"""
+        return self.adaptive.get_schedule(self.search_manager.get_search_matrix())
@@ -1,15 +1,16 @@
 import os
-from telegram import Bot
-from telegram.error import TelegramError
 from loguru import logger
+from .telegram_queue import telegram_queue
+from .notification_digest import notification_digest
 
 class TelegramNotifier:
     def __init__(self):
         self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.chat_id = os.getenv('TELEGRAM_CHAT_ID')
-        self.bot = Bot(token=self.bot_token) if self.bot_token else None
+        self.bot = bool(self.bot_token)  # envio real fica com a fila de entrega
         
     def send_jobs(self, jobs: list, keyword: str = ""):
+        """Coloca as vagas no resumo periódico (agrupado, sem repetições)"""
         if not self.bot or not self.chat_id:
             logger.warning("Telegram not configured")
             return False
@@ -17,20 +18,10 @@ class TelegramNotifier:
         if not jobs:
             return False  # Não enviar se não há vagas
             
-        # Filtrar apenas vagas relevantes (máximo 5)
-        filtered_jobs = self._filter_relevant_jobs(jobs, keyword)[:5]
+        # Só as relevantes à palavra-chave (ou todas, se nenhuma for)
+        relevant_jobs = self._filter_relevant_jobs(jobs, keyword)
         
-        if not filtered_jobs:
-            return False
-            
-        message = f"🚀 **{len(filtered_jobs)} NOVAS VAGAS - {keyword.upper()}**\n\n"
-        
-        for i, job in enumerate(filtered_jobs, 1):
-            message += f"{i}. **{job['title']}**\n"
-            message += f"📅 {job['date']} | 🌐 {job['source']}\n"
-            message += f"🔗 {job['link']}\n\n"
-            
-        return self._send_message(message)
+        return notification_digest.add(relevant_jobs, keyword, chat_id=self.chat_id)
     
     def _filter_relevant_jobs(self, jobs: list, keyword: str) -> list:
         """Filtra vagas mais relevantes para evitar spam"""
@@ -51,15 +42,5 @@ class TelegramNotifier:
         return False
     
     def _send_message(self, message: str):
-        try:
-            self.bot.send_message(
-                chat_id=self.chat_id,
-                text=message,
-                parse_mode='Markdown',
-                disable_web_page_preview=True
-            )
-            logger.info("Message sent to Telegram")
-            return True
-        except TelegramError as e:
-            logger.error(f"Telegram error: {e}")
-            return False
\ No newline at end of file
+        """Enfileira a mensagem para o worker de entrega; não espera a rede"""
+        return telegram_queue.enqueue(self.bot_token, self.chat_id, message, parse_mode='Markdown')
@@ -0,0 +1,204 @@
+from typing import Dict, List, Optional
+from loguru import logger
+from .metrics import TELEGRAM_SEND_SECONDS, TELEGRAM_MESSAGES, TELEGRAM_QUEUE_DEPTH
+from datetime import timedelta
+import asyncio
+import atexit
+import os
+import threading
+import time
+
+MAX_MESSAGE_LENGTH = 4096
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Divide a mensagem no limite do Telegram, preferindo quebras de parágrafo/linha"""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind('\n\n', 0, limit)
+        if cut <= 0:
+            cut = text.rfind('\n', 0, limit)
+        if cut <= 0:
+            cut = text.rfind(' ', 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut].rstrip())
+        text = text[cut:].lstrip('\n')
+    if text.strip():
+        chunks.append(text)
+    return chunks
+
+class TokenBucket:
+    """Limitador token bucket (assíncrono, usado só dentro do loop do worker)"""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+    
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+    
+    def block(self, seconds: float):
+        """Pausa o bucket (ex.: retry_after devolvido pelo Telegram)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+class TelegramDeliveryQueue:
+    """Fila única de envio ao Telegram
+    
+    Um worker assíncrono numa thread própria consome a fila, respeitando
+    limites por chat e globais e o retry_after do Telegram. Quem chama só
+    enfileira e retorna na hora.
+    """
+    
+    def __init__(self):
+        self.max_size = int(os.getenv('TELEGRAM_QUEUE_SIZE', '1000'))
+        self.chat_rate = float(os.getenv('TELEGRAM_CHAT_RATE', '1'))  # mensagens/s por chat
+        self.chat_burst = float(os.getenv('TELEGRAM_CHAT_BURST', '3'))
+        self.global_rate = float(os.getenv('TELEGRAM_GLOBAL_RATE', '25'))  # mensagens/s no total
+        self.max_retries = int(os.getenv('TELEGRAM_MAX_RETRIES', '5'))
+        self.flush_timeout = float(os.getenv('TELEGRAM_FLUSH_TIMEOUT', '10'))
+        self.api_base_url = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')  # mock nos testes de carga
+        
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._bots: Dict = {}  # token -> telegram.Bot
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._global_bucket = TokenBucket(self.global_rate, self.global_rate)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self.stats = {'enqueued': 0, 'sent': 0, 'failed': 0, 'dropped': 0, 'retried': 0}
+        TELEGRAM_QUEUE_DEPTH.set_function(lambda: self._pending)
+    
+    def enqueue(self, bot_token: str, chat_id: str, text: str, parse_mode: Optional[str] = 'Markdown') -> bool:
+        """Enfileira a mensagem (dividida em partes de até 4096 caracteres)"""
+        self._ensure_started()
+        chunks = split_message(text)
+        
+        with self._pending_lock:
+            if self._pending + len(chunks) > self.max_size:
+                self.stats['dropped'] += len(chunks)
+                TELEGRAM_MESSAGES.labels('dropped').inc(len(chunks))
+                logger.warning(f"Fila do Telegram cheia ({self._pending}); mensagem descartada")
+                return False
+            self._pending += len(chunks)
+            self._idle.clear()
+            self.stats['enqueued'] += len(chunks)
+        
+        for chunk in chunks:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, (bot_token, str(chat_id), chunk, parse_mode))
+        return True
+    
+    def flush(self, timeout: float = None) -> bool:
+        """Aguarda a fila esvaziar (usado no encerramento do processo)"""
+        if self._thread is None:
+            return True
+        return self._idle.wait(self.flush_timeout if timeout is None else timeout)
+    
+    def get_stats(self) -> Dict:
+        with self._pending_lock:
+            return {**self.stats, 'queued': self._pending}
+    
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run_loop, name='telegram-delivery', daemon=True)
+            self._thread.start()
+            self._ready.wait()
+            atexit.register(self.flush)
+    
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._ready.set()
+        self._loop.run_until_complete(self._worker())
+    
+    async def _worker(self):
+        while True:
+            bot_token, chat_id, text, parse_mode = await self._queue.get()
+            try:
+                await self._deliver(bot_token, chat_id, text, parse_mode)
+            except Exception as e:
+                self.stats['failed'] += 1
+                TELEGRAM_MESSAGES.labels('failed').inc()
+                logger.error(f"Telegram error: {e}")
+            finally:
+                with self._pending_lock:
+                    self._pending -= 1
+                    if self._pending == 0:
+                        self._idle.set()
+    
+    async def _deliver(self, bot_token: str, chat_id: str, text: str, parse_mode: Optional[str]):
+        # python-telegram-bot (e httpx) só é carregado no primeiro envio, fora do import da API
+        from telegram import Bot
+        from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
+        
+        bot = self._bots.get(bot_token)
+        if bot is None:
+            bot = self._bots[bot_token] = Bot(token=bot_token, base_url=self.api_base_url)
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            await self._global_bucket.acquire()
+            started = time.perf_counter()
+            try:
+                await bot.send_message(
+                    chat_id=chat_id,
+                    text=text,
+                    parse_mode=parse_mode,
+                    disable_web_page_preview=True
+                )
+                TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - started)
+                self.stats['sent'] += 1
+                TELEGRAM_MESSAGES.labels('sent').inc()
+                logger.info("Message sent to Telegram")
+                return
+            except RetryAfter as e:
+                TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - started)
+                retry_after = e.retry_after
+                seconds = retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+                logger.warning(f"Telegram rate limit: aguardando {seconds:.0f}s (chat {chat_id})")
+                bucket.block(seconds)
+                self._global_bucket.block(seconds)
+            except BadRequest as e:
+                # Markdown quebrado (ex.: entidade cortada na divisão): reenvia como texto puro
+                if parse_mode and "parse entities" in str(e).lower():
+                    parse_mode = None
+                else:
+                    raise
+            except NetworkError as e:
+                # Inclui TimedOut; BadRequest já foi tratado acima
+                logger.warning(f"Telegram network error (tentativa {attempt + 1}): {e}")
+                await asyncio.sleep(min(30, 2 ** attempt))
+            self.stats['retried'] += 1
+            TELEGRAM_MESSAGES.labels('retried').inc()
+        
+        raise TelegramError(f"mensagem descartada após {self.max_retries} tentativas")
+
+# Instância global
+telegram_queue = TelegramDeliveryQueue()
@@ -0,0 +1,139 @@
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from .database import SessionLocal, ScrapingRun
+from .metrics import SCRAPE_PHASE_SECONDS
+import heapq
+import json
+import threading
+import time
+
+_local = threading.local()
+
+class RunTrace:
+    """Spans de uma execução, na ordem em que terminaram
+    
+    Cada span guarda nome, site, início relativo e duração (ms) e os
+    atributos informados (contagens, bytes, engine...). Serializado como JSON
+    compacto na coluna `trace` de ScrapingRun.
+    """
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict] = []
+    
+    def add(self, name: str, started: float, seconds: float, site: str = None, **attrs):
+        span = {'name': name, 'start_ms': round((started - self.started) * 1000), 'ms': round(seconds * 1000)}
+        if site:
+            span['site'] = site
+        span.update({key: value for key, value in attrs.items() if value is not None})
+        self.spans.append(span)
+    
+    def to_json(self) -> str:
+        total_ms = round((time.perf_counter() - self.started) * 1000)
+        return json.dumps({'total_ms': total_ms, 'spans': self.spans}, separators=(',', ':'), default=str)
+
+class Span:
+    """Handle do span aberto: `set` acrescenta atributos antes de fechar"""
+    
+    def __init__(self, active: bool, attrs: Dict):
+        self.active = active
+        self.attrs = dict(attrs)
+        self.seconds = 0.0
+    
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+@contextmanager
+def tracing():
+    """Abre o trace da execução corrente desta thread durante o bloco"""
+    previous = getattr(_local, 'trace', None)
+    trace = _local.trace = RunTrace()
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+@contextmanager
+def span(name: str, site: str = None, **attrs):
+    """Mede o bloco como um span do trace corrente (sem trace ativo, só mede)"""
+    trace = getattr(_local, 'trace', None)
+    handle = Span(trace is not None, attrs)
+    started = time.perf_counter()
+    try:
+        yield handle
+    except Exception as e:
+        handle.set(error=type(e).__name__)
+        raise
+    finally:
+        handle.seconds = time.perf_counter() - started
+        if trace is not None:
+            trace.add(name, started, handle.seconds, site, **handle.attrs)
+
+@contextmanager
+def phase(site: str, name: str, **attrs):
+    """Span de uma fase do scraping, também observado em vagas_scrape_phase_seconds"""
+    handle = None
+    try:
+        with span(name, site, **attrs) as handle:
+            yield handle
+    finally:
+        if handle is not None:
+            SCRAPE_PHASE_SECONDS.labels(site, name).observe(handle.seconds)
+
+def record(name: str, seconds: float, site: str = None, **attrs):
+    """Registra um span já medido (ex.: espera na fila antes da execução começar)"""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.add(name, time.perf_counter() - seconds, seconds, site, **attrs)
+
+def page_bytes(driver) -> Optional[int]:
+    """Tamanho (UTF-8) do HTML carregado; None se o navegador não responder"""
+    try:
+        return driver.execute_script("return new Blob([document.documentElement.outerHTML]).size")
+    except Exception:
+        return None
+
+def load_trace(run: ScrapingRun) -> Optional[Dict]:
+    return json.loads(run.trace) if run.trace else None
+
+def slowest_phases(hours: int = 24, limit: int = 10, max_runs: int = 5000) -> Dict:
+    """Fases (site, fase) ordenadas pelo p95 e os spans mais lentos, nas execuções recentes"""
+    import numpy as np
+    
+    since = datetime.utcnow() - timedelta(hours=hours)
+    db = SessionLocal()
+    try:
+        rows = db.query(ScrapingRun.id, ScrapingRun.keyword, ScrapingRun.trace).filter(
+            ScrapingRun.created_at >= since,
+            ScrapingRun.trace.isnot(None)
+        ).order_by(ScrapingRun.id.desc()).limit(max_runs).all()
+    finally:
+        db.close()
+    
+    durations: Dict[tuple, List[int]] = {}
+    spans = []
+    for run_id, keyword, trace in rows:
+        for item in json.loads(trace).get('spans', []):
+            durations.setdefault((item.get('site'), item['name']), []).append(item['ms'])
+            spans.append({'run_id': run_id, 'keyword': keyword, **item})
+    
+    phases = []
+    for (site, name), values in durations.items():
+        values = np.asarray(values)
+        phases.append({
+            'site': site,
+            'phase': name,
+            'count': int(values.size),
+            'avg_ms': round(float(values.mean())),
+            'p95_ms': round(float(np.percentile(values, 95))),
+            'max_ms': int(values.max())
+        })
+    phases.sort(key=lambda phase: phase['p95_ms'], reverse=True)
+    
+    return {
+        'hours': hours,
+        'runs': len(rows),
+        'phases': phases[:limit],
+        'slowest_spans': heapq.nlargest(limit, spans, key=lambda item: item['ms'])
+    }
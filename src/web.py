@@ -1,23 +1,22 @@
-from fastapi import Request, Depends, Form
-from fastapi.responses import HTMLResponse, Response
+from fastapi import Request, Depends, Form, HTTPException
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from .database import get_db, ScrapingRun, ScrapedJob
-from .scraper import JobScraper
-from .telegram_bot import TelegramNotifier
-from datetime import datetime, timedelta
-import csv
-import io
+from .scrape_jobs import scrape_job_runner, SUPPORTED_SITES
+from .exports import FORMATS, iter_jobs
+from .profiling import profiler
+from datetime import date, datetime, timedelta
+import asyncio
 import json
-from concurrent.futures import ThreadPoolExecutor
 
 templates = Jinja2Templates(directory="templates")
 
 def add_web_routes(app):
     
     @app.get("/", response_class=HTMLResponse)
-    async def dashboard(request: Request, db: Session = Depends(get_db)):
+    async def dashboard(request: Request, run_id: int = None, db: Session = Depends(get_db)):
         recent_runs = db.query(ScrapingRun).order_by(ScrapingRun.created_at.desc()).limit(10).all()
         recent_jobs = db.query(ScrapedJob).order_by(ScrapedJob.scraped_at.desc()).limit(20).all()
         
@@ -49,10 +48,12 @@ def add_web_routes(app):
             "stats": stats,
             "recent_runs": recent_runs,
             "recent_jobs": recent_jobs,
-            "chart_data": json.dumps(chart_data)
+            "chart_data": json.dumps(chart_data),
+            "run_id": run_id,
+            "message": f"✅ Busca #{run_id} enfileirada" if run_id else None
         })
     
-    @app.post("/scrape", response_class=HTMLResponse)
+    @app.post("/scrape")
     async def web_scrape(
         request: Request,
         keyword: str = Form(...),
@@ -61,91 +62,36 @@ def add_web_routes(app):
         location: str = Form(""),
         min_salary: str = Form(""),
         contract_type: str = Form(""),
-        send_telegram: bool = Form(False),
-        db: Session = Depends(get_db)
+        send_telegram: bool = Form(False)
     ):
-        scraper = JobScraper()
-        notifier = TelegramNotifier()
-        
-        run = ScrapingRun(keyword=keyword, source=site, status="running")
-        db.add(run)
-        db.commit()
-        db.refresh(run)
-        
-        try:
-            jobs = scraper.scrape_infojobs(keyword, days)
-            
-            new_jobs = []
-            for job in jobs:
-                existing = db.query(ScrapedJob).filter(ScrapedJob.link == job['link']).first()
-                if not existing:
-                    scraped_job = ScrapedJob(
-                        title=job['title'],
-                        link=job['link'],
-                        source=job['source']
-                    )
-                    db.add(scraped_job)
-                    new_jobs.append(job)
-            
-            db.commit()
-            
-            run.jobs_found = len(new_jobs)
-            run.status = "completed"
-            run.completed_at = datetime.utcnow()
-            db.commit()
-            
-            if send_telegram and new_jobs:
-                notifier.send_jobs(new_jobs, keyword)
-                
-            message = f"✅ Encontradas {len(new_jobs)} vagas novas para '{keyword}'"
-            
-        except Exception as e:
-            run.status = "failed"
-            run.error_message = str(e)
-            run.completed_at = datetime.utcnow()
-            db.commit()
-            message = f"❌ Erro: {str(e)}"
-        
-        recent_runs = db.query(ScrapingRun).order_by(ScrapingRun.created_at.desc()).limit(10).all()
-        recent_jobs = db.query(ScrapedJob).order_by(ScrapedJob.scraped_at.desc()).limit(20).all()
-        
-        stats = {
-            'total_jobs': db.query(ScrapedJob).count(),
-            'total_runs': db.query(ScrapingRun).count(),
-            'successful_runs': db.query(ScrapingRun).filter(ScrapingRun.status == 'completed').count()
-        }
-        
-        return templates.TemplateResponse("dashboard.html", {
-            "request": request,
-            "stats": stats,
-            "recent_runs": recent_runs,
-            "recent_jobs": recent_jobs,
-            "message": message
-        })
+        # A busca roda em segundo plano; o dashboard acompanha pelo SSE da execução
+        sites = [site] if site in SUPPORTED_SITES else ['infojobs']
+        run_id = await asyncio.to_thread(scrape_job_runner.submit, keyword, sites, days, send_telegram,
+                                         profiler.requested(request.headers))
+        return RedirectResponse(url=f"/?run_id={run_id}", status_code=303)
     
-    @app.get("/export/csv")
-    async def export_csv(db: Session = Depends(get_db)):
-        jobs = db.query(ScrapedJob).order_by(ScrapedJob.scraped_at.desc()).all()
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['Título', 'Link', 'Fonte', 'Data Coleta'])
-        
-        for job in jobs:
-            writer.writerow([
-                job.title,
-                job.link,
-                job.source,
-                job.scraped_at.strftime('%d/%m/%Y %H:%M')
-            ])
+    @app.get("/export/{fmt}")
+    async def export_jobs(
+        fmt: str,
+        date_from: date = None,
+        date_to: date = None,
+        source: str = None
+    ):
+        """Exporta as vagas em streaming (csv, ndjson, json, xlsx/excel)
         
-        csv_content = output.getvalue()
-        output.close()
+        `source` aceita várias fontes separadas por vírgula; as datas são inclusivas.
+        """
+        if fmt not in FORMATS:
+            raise HTTPException(status_code=404, detail=f"Formato não suportado: {fmt}")
+        if date_from and date_to and date_from > date_to:
+            raise HTTPException(status_code=400, detail="date_from posterior a date_to")
         
-        return Response(
-            content=csv_content,
-            media_type='text/csv',
-            headers={'Content-Disposition': 'attachment; filename=vagas.csv'}
+        media_type, extension, stream = FORMATS[fmt]
+        sources = [item.strip() for item in source.split(',') if item.strip()] if source else None
+        return StreamingResponse(
+            stream(iter_jobs(date_from, date_to, sources)),
+            media_type=media_type,
+            headers={'Content-Disposition': f'attachment; filename=vagas.{extension}'}
         )
     
     @app.get("/approval-dashboard", response_class=HTMLResponse)
@@ -0,0 +1,252 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, func, or_, and_
+from .database import Base, SessionLocal
+from typing import Dict, List
+from datetime import datetime, timedelta
+from loguru import logger
+import importlib
+import json
+import os
+
+class SearchTask(Base):
+    """Busca (palavra-chave, região, site) publicada para os workers"""
+    __tablename__ = "search_tasks"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    keyword = Column(String, nullable=False)
+    region = Column(String)
+    site = Column(String, nullable=False)
+    filters = Column(Text)  # JSON
+    priority = Column(Integer, default=3)
+    status = Column(String, default="queued", index=True)  # queued, leased, done, failed
+    attempts = Column(Integer, default=0)
+    available_at = Column(DateTime, default=datetime.utcnow)
+    leased_by = Column(String)
+    lease_expires_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    jobs_found = Column(Integer)
+    error = Column(Text)
+    run_id = Column(Integer)  # ScrapingRun gravado pelo worker (o despacho publica o run_completed)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class WorkQueueBroker:
+    """Interface de broker da fila de buscas
+    
+    Tarefas são dicts com keyword, region, site, filters e priority. Um worker
+    reivindica tarefas por um lease (visibility timeout) e o renova com
+    heartbeats; tarefa com lease expirado volta a ficar visível para outro
+    worker. Os ids devolvidos por `publish` são opacos para quem publica.
+    """
+    
+    def publish(self, tasks: List[Dict]) -> List:
+        raise NotImplementedError
+    
+    def claim(self, worker_id: str, limit: int = 1) -> List[Dict]:
+        raise NotImplementedError
+    
+    def heartbeat(self, task_id, worker_id: str) -> bool:
+        """Renova o lease; False se o worker não é mais dono da tarefa"""
+        raise NotImplementedError
+    
+    def complete(self, task_id, worker_id: str, jobs_found: int, run_id: int = None) -> bool:
+        raise NotImplementedError
+    
+    def fail(self, task_id, worker_id: str, error: str, run_id: int = None) -> bool:
+        raise NotImplementedError
+    
+    def cancel(self, task_id, error: str) -> bool:
+        """Encerra como falha uma tarefa ainda não concluída (quem publicou desistiu de esperar)"""
+        raise NotImplementedError
+    
+    def get_results(self, task_ids: List) -> Dict:
+        """Estado de cada tarefa: status, jobs_found, error, started_at, finished_at, run_id"""
+        raise NotImplementedError
+    
+    def get_stats(self) -> Dict:
+        raise NotImplementedError
+
+class DatabaseBroker(WorkQueueBroker):
+    """Broker padrão: tabela search_tasks, reivindicada por UPDATE condicional"""
+    
+    def __init__(self):
+        self.visibility_timeout = int(os.getenv('WORK_QUEUE_VISIBILITY_TIMEOUT', '120'))  # segundos
+        self.max_attempts = int(os.getenv('WORK_QUEUE_MAX_ATTEMPTS', '3'))
+        self.retry_delay = float(os.getenv('WORK_QUEUE_RETRY_DELAY', '30'))  # segundos
+    
+    def publish(self, tasks: List[Dict]) -> List[int]:
+        db = SessionLocal()
+        try:
+            rows = [SearchTask(
+                keyword=task['keyword'],
+                region=task.get('region'),
+                site=task['site'],
+                filters=json.dumps(task['filters']) if task.get('filters') else None,
+                priority=task.get('priority', 3)
+            ) for task in tasks]
+            db.add_all(rows)
+            db.commit()
+            return [row.id for row in rows]
+        finally:
+            db.close()
+    
+    def claim(self, worker_id: str, limit: int = 1) -> List[Dict]:
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            # Lease expirado sem tentativas restantes: worker morreu várias vezes nessa busca
+            db.query(SearchTask).filter(
+                SearchTask.status == "leased",
+                SearchTask.lease_expires_at < now,
+                SearchTask.attempts >= self.max_attempts
+            ).update({"status": "failed", "error": "lease expirado", "finished_at": now}, synchronize_session=False)
+            db.commit()
+            
+            visible = or_(
+                and_(SearchTask.status == "queued", SearchTask.available_at <= now),
+                and_(SearchTask.status == "leased", SearchTask.lease_expires_at < now)
+            )
+            candidates = [row.id for row in db.query(SearchTask.id).filter(visible).order_by(
+                SearchTask.priority.desc(), SearchTask.id
+            ).limit(limit)]
+            if not candidates:
+                return []
+            
+            # O filtro é reavaliado no UPDATE: tarefas levadas por outro worker ficam de fora
+            lease_expires_at = now + timedelta(seconds=self.visibility_timeout)
+            db.query(SearchTask).filter(SearchTask.id.in_(candidates), visible).update({
+                "status": "leased",
+                "leased_by": worker_id,
+                "lease_expires_at": lease_expires_at,
+                "heartbeat_at": now,
+                "started_at": now,
+                "attempts": SearchTask.attempts + 1
+            }, synchronize_session=False)
+            db.commit()
+            
+            rows = db.query(SearchTask).filter(
+                SearchTask.id.in_(candidates),
+                SearchTask.leased_by == worker_id,
+                SearchTask.lease_expires_at == lease_expires_at
+            ).all()
+            return [{
+                'id': row.id,
+                'keyword': row.keyword,
+                'region': row.region,
+                'site': row.site,
+                'filters': json.loads(row.filters) if row.filters else None,
+                'priority': row.priority,
+                'attempts': row.attempts
+            } for row in rows]
+        finally:
+            db.close()
+    
+    def heartbeat(self, task_id: int, worker_id: str) -> bool:
+        now = datetime.utcnow()
+        return self._update_owned(task_id, worker_id, {
+            "lease_expires_at": now + timedelta(seconds=self.visibility_timeout),
+            "heartbeat_at": now
+        })
+    
+    def complete(self, task_id: int, worker_id: str, jobs_found: int, run_id: int = None) -> bool:
+        return self._update_owned(task_id, worker_id, {
+            "status": "done",
+            "jobs_found": jobs_found,
+            "run_id": run_id,
+            "error": None,
+            "finished_at": datetime.utcnow(),
+            "lease_expires_at": None
+        })
+    
+    def fail(self, task_id: int, worker_id: str, error: str, run_id: int = None) -> bool:
+        db = SessionLocal()
+        try:
+            task = db.query(SearchTask).filter(SearchTask.id == task_id).first()
+            attempts = task.attempts if task else self.max_attempts
+        finally:
+            db.close()
+        
+        now = datetime.utcnow()
+        if attempts >= self.max_attempts:
+            values = {"status": "failed", "finished_at": now}
+        else:
+            values = {"status": "queued", "available_at": now + timedelta(seconds=self.retry_delay * 2 ** (attempts - 1))}
+        return self._update_owned(task_id, worker_id, {**values, "error": str(error)[:1000], "run_id": run_id,
+                                                        "lease_expires_at": None})
+    
+    def cancel(self, task_id: int, error: str) -> bool:
+        db = SessionLocal()
+        try:
+            updated = db.query(SearchTask).filter(
+                SearchTask.id == task_id,
+                SearchTask.status.in_(("queued", "leased"))
+            ).update({"status": "failed", "error": str(error)[:1000], "finished_at": datetime.utcnow(),
+                      "lease_expires_at": None}, synchronize_session=False)
+            db.commit()
+            return bool(updated)
+        finally:
+            db.close()
+    
+    def get_results(self, task_ids: List[int]) -> Dict[int, Dict]:
+        db = SessionLocal()
+        try:
+            return {row.id: {
+                'status': row.status,
+                'jobs_found': row.jobs_found,
+                'error': row.error,
+                'started_at': row.started_at,
+                'finished_at': row.finished_at,
+                'run_id': row.run_id
+            } for row in db.query(SearchTask).filter(SearchTask.id.in_(task_ids))}
+        finally:
+            db.close()
+    
+    def get_stats(self) -> Dict:
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            counts = dict(db.query(SearchTask.status, func.count(SearchTask.id)).group_by(SearchTask.status).all())
+            oldest = db.query(func.min(SearchTask.created_at)).filter(SearchTask.status == "queued").scalar()
+            workers = [row.leased_by for row in db.query(SearchTask.leased_by).filter(
+                SearchTask.status == "leased",
+                SearchTask.heartbeat_at >= now - timedelta(seconds=self.visibility_timeout)
+            ).distinct()]
+        finally:
+            db.close()
+        return {
+            "broker": "database",
+            "queued": counts.get("queued", 0),
+            "leased": counts.get("leased", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_queued_seconds": round((now - oldest).total_seconds(), 1) if oldest else None,
+            "active_workers": workers
+        }
+    
+    def _update_owned(self, task_id: int, worker_id: str, values: Dict) -> bool:
+        """UPDATE só se o worker ainda detém o lease da tarefa"""
+        db = SessionLocal()
+        try:
+            updated = db.query(SearchTask).filter(
+                SearchTask.id == task_id,
+                SearchTask.status == "leased",
+                SearchTask.leased_by == worker_id
+            ).update(values, synchronize_session=False)
+            db.commit()
+            return bool(updated)
+        finally:
+            db.close()
+
+def get_broker() -> WorkQueueBroker:
+    """Broker configurado em WORK_QUEUE_BROKER: 'database' ou 'modulo:Classe'"""
+    name = os.getenv('WORK_QUEUE_BROKER', 'database')
+    if name == 'database':
+        return DatabaseBroker()
+    
+    module_name, _, class_name = name.partition(':')
+    broker = getattr(importlib.import_module(module_name), class_name)()
+    logger.info(f"Fila de buscas usando o broker {name}")
+    return broker
+
+# Instância global
+work_queue = get_broker()
@@ -0,0 +1,23 @@
+"""`import src.api` dentro do orçamento e sem as dependências adiadas
+
+Usa a sonda de benchmarks/import_budget.py (um processo novo por rodada,
+cache de módulos frio). Vale a menor de algumas rodadas, para que um pico
+da máquina não derrube o teste; o orçamento é IMPORT_BUDGET_SECONDS.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.import_budget import DEFERRED_MODULES, probe
+
+BUDGET = float(os.getenv('IMPORT_BUDGET_SECONDS', '1.2'))
+
+def test_import_within_budget_without_deferred_modules():
+    probe()  # aquece o bytecode (.pyc) para não contar compilação
+    results = [probe() for _ in range(3)]
+
+    loaded = sorted({name for result in results for name in result['loaded']})
+    assert not loaded, f"dependências carregadas no import ({', '.join(DEFERRED_MODULES)}): {', '.join(loaded)}"
+    import_s = min(result['import_s'] for result in results)
+    assert import_s <= BUDGET, f"import src.api em {import_s:.3f}s (orçamento {BUDGET:.2f}s)"
@@ -0,0 +1,31 @@
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.search_worker import SearchWorker
+from src.database import init_db
+from src.metrics import start_metrics_server
+from loguru import logger
+import argparse
+import asyncio
+import signal
+
+async def main(concurrency: int = None):
+    """Worker da fila de buscas: rode quantos processos/containers forem necessários"""
+    init_db()
+    start_metrics_server()
+    
+    worker = SearchWorker(concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    
+    await worker.run()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consome buscas da fila (SCRAPE_EXECUTION=queue)")
+    parser.add_argument('--concurrency', type=int, help='buscas simultâneas (padrão: WORKER_CONCURRENCY)')
+    args = parser.parse_args()
+    
+    logger.info("Starting search worker")
+    asyncio.run(main(args.concurrency))